@@ -0,0 +1,208 @@
+"""
+Admission Control
+Cost model and limits for /bfhl operations, plus a bounded lane that runs
+expensive requests in their own worker processes. Requests over a hard
+limit are rejected before any work; expensive requests are rejected early
+when the lane is saturated, so one abusive payload cannot stall the cheap
+traffic sharing the worker.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import fibonacci
+import reduction
+import tables
+
+# Configuration
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', 16 * 1024 * 1024))
+# fibonacci: cost = n, or for a window of terms the n whose prefix is as large
+FIB_MAX_N = int(os.environ.get('ADMISSION_FIB_MAX_N', 20000))
+FIB_EXPENSIVE_N = int(os.environ.get('ADMISSION_FIB_EXPENSIVE_N', 5000))
+# Highest term a {"index": k} or {"offset": k, "limit": n} request may reach
+FIB_MAX_INDEX = int(os.environ.get('ADMISSION_FIB_MAX_INDEX', 100_000))
+# prime / lcm / hcf: cost = array length x bit length of the largest magnitude
+ARRAY_MAX_LENGTH = int(os.environ.get('ADMISSION_ARRAY_MAX_LENGTH', 200_000))
+ARRAY_MAX_COST = int(os.environ.get('ADMISSION_ARRAY_MAX_COST', 10_000_000))
+ARRAY_EXPENSIVE_COST = int(os.environ.get('ADMISSION_ARRAY_EXPENSIVE_COST', 200_000))
+# lcm: longest result, in decimal digits; inputs that could exceed it are rejected
+LCM_MAX_DIGITS = int(os.environ.get('ADMISSION_LCM_MAX_DIGITS', 20_000))
+# Most operations in one /bfhl/batch request
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 100))
+# Expensive lane: running processes, plus requests allowed to wait for one
+EXPENSIVE_WORKERS = int(os.environ.get('EXPENSIVE_WORKERS', 2))
+EXPENSIVE_QUEUE = int(os.environ.get('EXPENSIVE_QUEUE', 4))
+
+
+# Bits of the largest LCM allowed: 2^bits has at most LCM_MAX_DIGITS digits
+LCM_MAX_BITS = int((LCM_MAX_DIGITS - 1) / math.log10(2))
+# Distinct values reduced together between checks of the running LCM's size
+_LCM_FOLD_CHUNK = 4096
+
+# F(k) has about 0.209k digits; Python refuses to print longer ints by default
+_MAX_DIGITS = max(int(max(FIB_MAX_N, FIB_MAX_INDEX + 1) * 0.209), LCM_MAX_DIGITS) + 16
+if hasattr(sys, 'set_int_max_str_digits') and 0 < sys.get_int_max_str_digits() < _MAX_DIGITS:
+    sys.set_int_max_str_digits(_MAX_DIGITS)
+
+
+class LimitExceeded(ValueError):
+    """Input is larger than the configured limits allow"""
+
+
+class AdmissionRejected(RuntimeError):
+    """The expensive lane is saturated; retry later"""
+
+
+def estimate_cost(operation, input_value):
+    """Work estimate: n for fibonacci, length x max bit length for arrays, 0 for AI"""
+    if operation == 'fibonacci':
+        # The first n terms hold about n^2 / 2 digits; a window is costed as
+        # the prefix with as many digits, so {"offset": 0, "limit": n} costs n
+        offset, limit, _ = fibonacci.parse_query(input_value)
+        return math.isqrt(limit * (2 * offset + limit))
+    if operation in ('prime', 'lcm', 'hcf'):
+        if len(input_value) == 0:
+            return 0
+        if hasattr(input_value, 'dtype'):
+            # NumPy int64 input: reduced in C, then widened so -min cannot overflow
+            high, low = int(input_value.max()), int(input_value.min())
+        else:
+            high, low = max(input_value), min(input_value)
+        magnitude = max(high, -low)
+        return len(input_value) * max(1, magnitude.bit_length())
+    return 0
+
+
+def lcm_exceeds(values, max_bits=LCM_MAX_BITS):
+    """Whether the LCM of values has more than max_bits bits
+
+    The summed bit lengths of the distinct magnitudes bound it from above and
+    settle most inputs. Otherwise the LCM is folded a chunk at a time, each
+    chunk reduced as a tree, and the fold stops once it passes max_bits.
+    """
+    if hasattr(values, 'dtype'):
+        values = values.tolist()
+    distinct = set(map(abs, values))
+    if 0 in distinct or sum(magnitude.bit_length() for magnitude in distinct) <= max_bits:
+        return False
+    distinct = sorted(distinct)
+    running = 1
+    for start in range(0, len(distinct), _LCM_FOLD_CHUNK):
+        running = math.lcm(running, reduction.lcm(distinct[start:start + _LCM_FOLD_CHUNK]))
+        if running.bit_length() > max_bits:
+            return True
+    return False
+
+
+def check(operation, input_value):
+    """Cost of a validated input; raises LimitExceeded past the hard limits"""
+    cost = estimate_cost(operation, input_value)
+    if operation == 'fibonacci':
+        if cost > FIB_MAX_N:
+            raise LimitExceeded(f"fibonacci n={cost} exceeds {FIB_MAX_N}")
+        if isinstance(input_value, dict):
+            offset, limit, _ = fibonacci.parse_query(input_value)
+            if offset + limit - 1 > FIB_MAX_INDEX:
+                raise LimitExceeded(f"fibonacci index {offset + limit - 1} exceeds {FIB_MAX_INDEX}")
+    elif operation in ('prime', 'lcm', 'hcf'):
+        if len(input_value) > ARRAY_MAX_LENGTH:
+            raise LimitExceeded(f"{operation} length {len(input_value)} exceeds {ARRAY_MAX_LENGTH}")
+        if cost > ARRAY_MAX_COST:
+            raise LimitExceeded(f"{operation} cost {cost} exceeds {ARRAY_MAX_COST}")
+        # The cost already bounds the summed bits, so most inputs skip the exact sum
+        if operation == 'lcm' and cost > LCM_MAX_BITS and lcm_exceeds(input_value):
+            raise LimitExceeded(f"lcm result may exceed {LCM_MAX_DIGITS} digits")
+    return cost
+
+
+def is_expensive(operation, cost):
+    """Whether a request of this cost belongs in the expensive lane"""
+    if operation == 'fibonacci':
+        return cost >= FIB_EXPENSIVE_N
+    if operation in ('prime', 'lcm', 'hcf'):
+        return cost >= ARRAY_EXPENSIVE_COST
+    return False
+
+
+class BatchBudget:
+    """Summed cost of one batch per operation, each held to that operation's request limit"""
+
+    def __init__(self):
+        self.spent = {}
+
+    def charge(self, operation, cost):
+        """Add an item's cost; raises LimitExceeded once its operation is over budget"""
+        if operation == 'fibonacci':
+            # Work grows with n^2: the batch may do as much as one request of FIB_MAX_N
+            spent = self.spent[operation] = self.spent.get(operation, 0) + cost * cost
+            if spent > FIB_MAX_N * FIB_MAX_N:
+                raise LimitExceeded(f"Batch fibonacci cost exceeds n={FIB_MAX_N}")
+        elif operation in ('prime', 'lcm', 'hcf'):
+            spent = self.spent[operation] = self.spent.get(operation, 0) + cost
+            if spent > ARRAY_MAX_COST:
+                raise LimitExceeded(f"Batch {operation} cost exceeds {ARRAY_MAX_COST}")
+
+
+class ExpensiveLane:
+    """Bounded admission for expensive work, with its own process pool"""
+
+    def __init__(self, workers=EXPENSIVE_WORKERS, queue_size=EXPENSIVE_QUEUE):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a slot or raise AdmissionRejected; pair with release()"""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise AdmissionRejected(f"{self.in_flight} expensive requests already admitted")
+            self.in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def get_pool(self):
+        """The lane's process pool, created lazily so each gunicorn worker gets its own"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=tables.load
+                )
+            return self._pool
+
+    def reset_pool(self, broken):
+        """Forget a pool that lost a process (OOM kill, crash); the next get_pool() starts anew"""
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args):
+        """Run fn(*args) in the lane's processes; raises AdmissionRejected when full"""
+        self.acquire()
+        try:
+            pool = self.get_pool()
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self.reset_pool(pool)
+                future = self.get_pool().submit(fn, *args)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(lambda f: self.release())
+        return future
+
+
+expensive_lane = ExpensiveLane()
@@ -0,0 +1,143 @@
+"""
+AI Answers
+Single-word answers from Google Gemini, served through the answer cache and
+the bounded AI client. The backend is pluggable (see ai_backends.py):
+AI_BACKEND=fake answers in process, AI_BACKEND=http calls the stand-in
+server, AI_BACKEND=replay plays back a recording that AI_RECORD_PATH made of
+real answers, and set_model_factory swaps in any model, so the AI path can
+be load-tested offline.
+"""
+
+import os
+import threading
+import ai_backends
+from ai_backends import AI_MODEL_NAME, FakeModel  # noqa: F401
+from ai_cache import AnswerCache
+from ai_client import AIClient, AIError
+from structured_logging import get_logger
+
+logger = get_logger('ai')
+
+# Configuration
+# 'gemini', 'fake', 'http' or 'replay'
+AI_BACKEND = os.environ.get('AI_BACKEND', 'gemini')
+
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+
+# google.generativeai takes most of the app's import time, so it is imported
+# and configured by the first AI request rather than at startup
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """The configured google.generativeai module, imported on first use"""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                try:
+                    genai.configure(api_key=GEMINI_API_KEY)
+                except Exception as e:
+                    logger.warning("Gemini API configuration failed", extra={"error": str(e)})
+                _genai = genai
+    return _genai
+
+
+def build_prompt(question):
+    """Prompt asking the model for exactly one word"""
+    return f"""Answer the following question with EXACTLY ONE WORD only.
+No explanations, no punctuation, no additional text. Just one single word.
+
+Question: {question}
+
+Answer (one word only):"""
+
+
+def extract_answer(text):
+    """First word of the model output, alphanumeric characters only"""
+    answer = text.strip()
+    answer = answer.split()[0] if answer else "Unknown"
+    return ''.join(char for char in answer if char.isalnum())
+
+
+# ==================== MODELS ====================
+
+def gemini_model():
+    """Gemini model, or None when no API key is configured"""
+    if not GEMINI_API_KEY:
+        return None
+    return get_genai().GenerativeModel(AI_MODEL_NAME)
+
+
+BACKENDS = {
+    'gemini': gemini_model,
+    'fake': ai_backends.fake_model,
+    'http': ai_backends.http_model,
+    'replay': ai_backends.replay_model,
+}
+
+
+def model_factory(backend=AI_BACKEND, record_path=ai_backends.AI_RECORD_PATH):
+    """Factory for the named backend, recording its answers to record_path if set"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown AI_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
+    factory = BACKENDS[backend]
+    if not record_path:
+        return factory
+
+    def recording():
+        model = factory()
+        return None if model is None else ai_backends.RecordingModel(model, record_path)
+    return recording
+
+
+client = AIClient(model_factory())
+
+
+def set_model_factory(factory):
+    """Swap the model factory, e.g. set_model_factory(lambda: fake)"""
+    client.set_model_factory(factory)
+
+
+# ==================== ANSWERS ====================
+
+# "Error" means upstream failed, so it is never cached
+answer_cache = AnswerCache(should_cache=lambda answer: answer != "Error")
+
+
+def ask_model(question):
+    """Uncached single-word answer from the current model"""
+    try:
+        return extract_answer(client.generate(build_prompt(question)))
+
+    except AIError as e:
+        logger.warning("AI call failed", extra={"error_type": type(e).__name__, "error": str(e)})
+        return "Error"
+    except Exception:
+        logger.exception("AI call failed")
+        return "Error"
+
+
+async def ask_model_async(question):
+    """ask_model for async front ends; awaits upstream without holding a thread"""
+    try:
+        return extract_answer(await client.generate_async(build_prompt(question)))
+
+    except AIError as e:
+        logger.warning("AI call failed", extra={"error_type": type(e).__name__, "error": str(e)})
+        return "Error"
+    except Exception:
+        logger.exception("AI call failed")
+        return "Error"
+
+
+def get_ai_response(question):
+    """Get single-word answer from Google Gemini API"""
+    return answer_cache.get_or_compute(question, ask_model)
+
+
+async def get_ai_response_async(question):
+    """Awaitable get_ai_response"""
+    return await answer_cache.get_or_compute_async(question, ask_model_async)
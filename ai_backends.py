@@ -0,0 +1,312 @@
+"""
+AI Backends
+Offline and instrumented stand-ins for the Gemini model. Every backend has
+the google.generativeai model interface the AI client uses: a
+generate_content(prompt) method returning an object with a .text attribute.
+FakeModel answers in process, HTTPModel calls the stand-in server
+(ai_standin.py), RecordingModel saves what another backend answers and
+ReplayModel plays such a recording back with its timing.
+"""
+
+from types import SimpleNamespace
+import http.client
+import json
+import math
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from ai_cache import normalize_question
+
+# Configuration
+AI_MODEL_NAME = 'gemini-pro'
+# Stand-in latency: AI_FAKE_LATENCY_DIST if set, else uniform over [L, 2L]
+AI_FAKE_LATENCY = float(os.environ.get('AI_FAKE_LATENCY', 0.05))
+AI_FAKE_LATENCY_DIST = os.environ.get('AI_FAKE_LATENCY_DIST', '')
+AI_FAKE_ERROR_RATE = float(os.environ.get('AI_FAKE_ERROR_RATE', 0))
+# Calls per second before the stand-in answers "rate limited" (0 = unlimited)
+AI_FAKE_RATE_LIMIT = float(os.environ.get('AI_FAKE_RATE_LIMIT', 0))
+AI_FAKE_BURST = int(os.environ.get('AI_FAKE_BURST', 10))
+# JSON object of question -> answer, or a recording, for the stand-in's answers
+AI_FAKE_ANSWERS = os.environ.get('AI_FAKE_ANSWERS', '')
+AI_STANDIN_URL = os.environ.get('AI_STANDIN_URL', 'http://127.0.0.1:8765')
+# AI_BACKEND=replay reads AI_REPLAY_PATH; AI_RECORD_PATH records any backend
+AI_REPLAY_PATH = os.environ.get('AI_REPLAY_PATH', '')
+AI_REPLAY_TIMING = os.environ.get('AI_REPLAY_TIMING', '1') == '1'
+AI_RECORD_PATH = os.environ.get('AI_RECORD_PATH', '')
+
+
+class RateLimited(RuntimeError):
+    """The stand-in refused a call over its rate limit (HTTP 429 upstream)"""
+
+
+def question_from_prompt(prompt):
+    """The question inside a prompt built by ai.build_prompt"""
+    return prompt.split('Question:', 1)[-1].split('\n\n', 1)[0].strip()
+
+
+# ==================== LATENCY & RATE LIMITS ====================
+
+class Latency:
+    """Delay distribution, from a spec such as 'lognormal:0.2,0.5'
+
+    fixed:S, uniform:LOW,HIGH, normal:MEAN,STDDEV, lognormal:MEDIAN,SIGMA,
+    exponential:MEAN and pareto:MINIMUM,ALPHA, all in seconds; samples are
+    never negative.
+    """
+
+    KINDS = {
+        'fixed': lambda rng, s: s,
+        'uniform': lambda rng, low, high: rng.uniform(low, high),
+        'normal': lambda rng, mean, stddev: rng.gauss(mean, stddev),
+        'lognormal': lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma),
+        'exponential': lambda rng, mean: rng.expovariate(1 / mean),
+        'pareto': lambda rng, minimum, alpha: minimum * rng.paretovariate(alpha),
+    }
+
+    def __init__(self, kind, *params):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind!r}")
+        self.kind = kind
+        self.params = params
+        self._sample = self.KINDS[kind]
+
+    @classmethod
+    def parse(cls, spec):
+        kind, _, params = spec.partition(':')
+        return cls(kind.strip(), *(float(p) for p in params.split(',') if p.strip()))
+
+    def sample(self, rng):
+        return max(0.0, self._sample(rng, *self.params))
+
+    def __repr__(self):
+        return f"{self.kind}:{','.join(map(str, self.params))}"
+
+
+class EmpiricalLatency:
+    """Delays drawn from recorded samples"""
+
+    def __init__(self, samples):
+        self.samples = sorted(samples) or [0.0]
+
+    def sample(self, rng):
+        return rng.choice(self.samples)
+
+    def __repr__(self):
+        return f"empirical:{len(self.samples)} samples"
+
+
+class RateLimiter:
+    """Token bucket: rate calls per second with bursts of up to burst calls"""
+
+    def __init__(self, rate, burst=AI_FAKE_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token if one is available"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def default_latency():
+    """Latency configured by AI_FAKE_LATENCY_DIST or AI_FAKE_LATENCY"""
+    if AI_FAKE_LATENCY_DIST:
+        return Latency.parse(AI_FAKE_LATENCY_DIST)
+    return Latency('uniform', AI_FAKE_LATENCY, 2 * AI_FAKE_LATENCY)
+
+
+# ==================== IN-PROCESS ====================
+
+class FakeModel:
+    """Offline stand-in for genai.GenerativeModel with canned answers
+
+    The delay is latency.sample() when a Latency is given, else uniform over
+    [delay, delay + jitter]. Calls past rate_limit per second raise
+    RateLimited; a fraction error_rate of the others fail.
+    """
+
+    def __init__(self, answers=None, default="Unknown", delay=0.0, jitter=0.0,
+                 error_rate=0.0, seed=None, latency=None, rate_limit=0.0, burst=AI_FAKE_BURST):
+        self.answers = {normalize_question(q): a for q, a in (answers or {}).items()}
+        self.default = default
+        self.latency = latency or Latency('uniform', delay, delay + jitter)
+        self.error_rate = error_rate
+        self.rate_limiter = RateLimiter(rate_limit, burst)
+        self.calls = 0
+        self.rate_limited = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _choose(self, key):
+        """(delay, answer or None) for a normalized question; called with the lock held"""
+        return self.latency.sample(self._rng), self.answers.get(key, self.default)
+
+    def generate_content(self, prompt):
+        key = normalize_question(question_from_prompt(prompt))
+        with self._lock:
+            self.calls += 1
+            if not self.rate_limiter.acquire():
+                self.rate_limited += 1
+                raise RateLimited("Fake upstream rate limit exceeded")
+            delay, text = self._choose(key)
+            fail = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError("Fake upstream error")
+        if text is None:
+            raise RuntimeError("No answer for this question")
+        return SimpleNamespace(text=text)
+
+
+def fake_model():
+    """FakeModel configured from AI_FAKE_* settings"""
+    if AI_FAKE_ANSWERS.endswith('.jsonl'):
+        return ReplayModel(AI_FAKE_ANSWERS, default="Unknown", timing=False,
+                           latency=default_latency(), error_rate=AI_FAKE_ERROR_RATE,
+                           rate_limit=AI_FAKE_RATE_LIMIT)
+    return FakeModel(answers=load_answers(AI_FAKE_ANSWERS), latency=default_latency(),
+                     error_rate=AI_FAKE_ERROR_RATE, rate_limit=AI_FAKE_RATE_LIMIT)
+
+
+def load_answers(path):
+    """question -> answer from a JSON object file; {} without a path"""
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+# ==================== RECORD & REPLAY ====================
+
+def read_recording(path):
+    """Entries of a recording, one JSON object per line"""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries
+
+
+class RecordingModel:
+    """Passes calls to another model and appends each answer and its latency to path"""
+
+    def __init__(self, model, path=AI_RECORD_PATH):
+        self.model = model
+        self.path = path
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        start = time.perf_counter()
+        response = self.model.generate_content(prompt)
+        entry = {
+            "question": question_from_prompt(prompt),
+            "text": response.text,
+            "latency": round(time.perf_counter() - start, 6),
+            "ts": round(time.time(), 3),
+        }
+        with self._lock, open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        return response
+
+
+class ReplayModel(FakeModel):
+    """Answers from a recording, taking as long as the recorded call did
+
+    Questions that were recorded more than once cycle through their
+    answers. Unrecorded questions get default (or fail when it is None)
+    after a delay drawn from all recorded latencies. With timing=False the
+    latency argument (none by default) is used instead.
+    """
+
+    def __init__(self, path=AI_REPLAY_PATH, default=None, timing=AI_REPLAY_TIMING, **kwargs):
+        self.recorded = {}
+        for entry in read_recording(path):
+            key = normalize_question(entry["question"])
+            self.recorded.setdefault(key, []).append((entry["text"], entry.get("latency", 0.0)))
+        self.timing = timing
+        self.recorded_latency = EmpiricalLatency(
+            [latency for entries in self.recorded.values() for _, latency in entries]
+        )
+        self._turns = {}
+        super().__init__(default=default, **kwargs)
+
+    def _choose(self, key):
+        entries = self.recorded.get(key)
+        if entries is None:
+            latency = self.recorded_latency if self.timing else self.latency
+            return latency.sample(self._rng), self.default
+        turn = self._turns.get(key, 0)
+        self._turns[key] = turn + 1
+        text, latency = entries[turn % len(entries)]
+        return (latency if self.timing else self.latency.sample(self._rng)), text
+
+
+def replay_model():
+    """ReplayModel of AI_REPLAY_PATH"""
+    return ReplayModel(AI_REPLAY_PATH, timing=AI_REPLAY_TIMING)
+
+
+# ==================== STAND-IN SERVER CLIENT ====================
+
+class HTTPModel:
+    """Client for a server speaking Gemini's generateContent REST call, such as ai_standin.py
+
+    Each calling thread keeps its own keep-alive connection.
+    """
+
+    def __init__(self, url=AI_STANDIN_URL, model_name=AI_MODEL_NAME, timeout=30.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = f"{parts.path.rstrip('/')}/v1beta/models/{model_name}:generateContent"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _post(self, body):
+        connection = self._connection()
+        try:
+            connection.request('POST', self.path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            # Stale or broken keep-alive connection: the next call reconnects
+            connection.close()
+            self._local.connection = None
+            raise
+
+    def generate_content(self, prompt):
+        body = json.dumps({"contents": [{"parts": [{"text": prompt}]}]})
+        status, data = self._post(body)
+        if status == 429:
+            raise RateLimited("Stand-in rate limit exceeded")
+        if status != 200:
+            raise RuntimeError(f"Stand-in answered {status}")
+        document = json.loads(data)
+        return SimpleNamespace(text=document["candidates"][0]["content"]["parts"][0]["text"])
+
+
+def http_model():
+    """HTTPModel for AI_STANDIN_URL"""
+    return HTTPModel(AI_STANDIN_URL)
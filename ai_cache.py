@@ -0,0 +1,234 @@
+"""
+AI Answer Cache
+Normalized-question cache for AI answers with a TTL, LRU eviction and a size
+cap, optionally backed by SQLite so answers survive restarts. Concurrent
+misses for the same question are coalesced into one upstream call.
+"""
+
+from collections import OrderedDict
+import asyncio
+from concurrent.futures import Future
+import os
+import sqlite3
+import threading
+import time
+import metrics
+
+# Configuration
+AI_CACHE_TTL = float(os.environ.get('AI_CACHE_TTL', 3600))
+AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 1024))
+# SQLite file for answers that outlive the process ('' = memory only)
+AI_CACHE_PATH = os.environ.get('AI_CACHE_PATH', '')
+
+
+def normalize_question(question):
+    """Cache key: case-folded, whitespace-collapsed, trailing punctuation dropped"""
+    return ' '.join(question.casefold().split()).rstrip('?!. ')
+
+
+class DiskStore:
+    """SQLite table of key -> (answer, expiry), shareable between processes"""
+
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS answers '
+            '(key TEXT PRIMARY KEY, answer TEXT NOT NULL, expires REAL NOT NULL)'
+        )
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT answer, expires FROM answers WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return row
+
+    def set(self, key, answer, expires):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO answers (key, answer, expires) VALUES (?, ?, ?)',
+                (key, answer, expires)
+            )
+            # Drop expired rows, then the soonest-to-expire beyond the cap
+            self._conn.execute('DELETE FROM answers WHERE expires <= ?', (time.time(),))
+            self._conn.execute(
+                'DELETE FROM answers WHERE key IN (SELECT key FROM answers '
+                'ORDER BY expires DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM answers')
+
+
+class AnswerCache:
+    """TTL + LRU cache of answers with single-flight misses"""
+
+    def __init__(self, ttl=AI_CACHE_TTL, max_entries=AI_CACHE_MAX_ENTRIES,
+                 path=AI_CACHE_PATH, should_cache=None, name='ai'):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.should_cache = should_cache or (lambda answer: True)
+        self.path = path
+        self._disk = None
+        self._disk_pid = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _get_disk(self):
+        # One connection per process: with --preload the cache is created before forking
+        if not self.path:
+            return None
+        pid = os.getpid()
+        with self._lock:
+            if self._disk_pid != pid:
+                self._disk = DiskStore(self.path, self.max_entries)
+                self._disk_pid = pid
+            return self._disk
+
+    def _get_memory(self, key, now):
+        """Memory lookup; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        answer, expires = entry
+        if expires <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def _set_memory(self, key, answer, expires):
+        """Memory insert with LRU eviction; caller holds the lock"""
+        self._entries[key] = (answer, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, question):
+        """Cached answer for question, or None"""
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            answer = self._get_memory(key, now)
+        disk = self._get_disk() if answer is None else None
+        if disk is not None:
+            row = disk.get(key, now)
+            if row is not None:
+                answer = row[0]
+                with self._lock:
+                    self._set_memory(key, answer, row[1])
+        return answer
+
+    def set(self, question, answer):
+        key = normalize_question(question)
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._set_memory(key, answer, expires)
+        disk = self._get_disk()
+        if disk is not None:
+            disk.set(key, answer, expires)
+
+    def _lookup_or_claim(self, question):
+        """(answer, future, leader): a cached answer, or the in-flight future to
+        wait on, or a new future this caller must resolve as leader"""
+        answer = self.get(question)
+        if answer is not None:
+            self.hits += 1
+            metrics.count_cache(self.name, 'hit')
+            return answer, None, False
+
+        key = normalize_question(question)
+        future = None
+        leader = False
+        with self._lock:
+            # The previous leader may have finished since the lookup above
+            answer = self._get_memory(key, time.time())
+            if answer is not None:
+                self.hits += 1
+                result = 'hit'
+            else:
+                future = self._in_flight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._in_flight[key] = Future()
+                    self.misses += 1
+                    result = 'miss'
+                else:
+                    self.coalesced += 1
+                    result = 'coalesced'
+        metrics.count_cache(self.name, result)
+        return answer, future, leader
+
+    def _resolve(self, question, future, answer=None, error=None):
+        """Leader's exit: cache the answer, wake followers, leave the in-flight table"""
+        try:
+            if error is not None:
+                future.set_exception(error)
+                return
+            if self.should_cache(answer):
+                self.set(question, answer)
+            future.set_result(answer)
+        finally:
+            with self._lock:
+                self._in_flight.pop(normalize_question(question), None)
+
+    def get_or_compute(self, question, compute):
+        """Cached answer, or compute(question) once for all concurrent callers"""
+        answer, future, leader = self._lookup_or_claim(question)
+        if future is None:
+            return answer
+        if not leader:
+            return future.result()
+
+        try:
+            answer = compute(question)
+        except BaseException as e:
+            self._resolve(question, future, error=e)
+            raise
+        self._resolve(question, future, answer)
+        return answer
+
+    async def get_or_compute_async(self, question, compute):
+        """get_or_compute for async front ends; compute is a coroutine function"""
+        answer, future, leader = self._lookup_or_claim(question)
+        if future is None:
+            return answer
+        if not leader:
+            # Sync and async callers coalesce onto the same future
+            return await asyncio.wrap_future(future)
+
+        try:
+            answer = await compute(question)
+        except BaseException as e:
+            self._resolve(question, future, error=e)
+            raise
+        self._resolve(question, future, answer)
+        return answer
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        disk = self._get_disk()
+        if disk is not None:
+            disk.clear()
+
+    def stats(self):
+        """Counters for tuning and metrics"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
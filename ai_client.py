@@ -0,0 +1,169 @@
+"""
+AI Client
+Runs upstream model calls on a dedicated thread pool with one reused model
+client, a per-call deadline, a max-in-flight limit and a circuit breaker
+that fails fast while upstream is degraded.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import asyncio
+import os
+import threading
+import time
+import metrics
+
+# Configuration
+AI_TIMEOUT = float(os.environ.get('AI_TIMEOUT', 10))
+AI_MAX_IN_FLIGHT = int(os.environ.get('AI_MAX_IN_FLIGHT', 16))
+# How long a synchronous caller may wait for a free slot before failing fast
+AI_QUEUE_WAIT = float(os.environ.get('AI_QUEUE_WAIT', 1))
+AI_BREAKER_FAILURES = int(os.environ.get('AI_BREAKER_FAILURES', 5))
+AI_BREAKER_RESET = float(os.environ.get('AI_BREAKER_RESET', 30))
+
+
+class AIError(Exception):
+    """Base class for AI call failures"""
+
+
+class AIUnavailable(AIError):
+    """Call rejected without reaching upstream (no key, breaker open, saturated)"""
+
+
+class AITimeout(AIError):
+    """Upstream did not answer within the deadline"""
+
+
+class AIUpstreamError(AIError):
+    """Upstream raised an error"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial call through per reset period"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=AI_BREAKER_FAILURES, reset_timeout=AI_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Exactly one caller gets the trial; the rest keep failing fast
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class AIClient:
+    """Shared, bounded, deadline-enforcing executor for one model client"""
+
+    def __init__(self, model_factory, timeout=AI_TIMEOUT, max_in_flight=AI_MAX_IN_FLIGHT,
+                 queue_wait=AI_QUEUE_WAIT, breaker=None):
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.queue_wait = queue_wait
+        self.breaker = breaker or CircuitBreaker()
+        self._model_factory = model_factory
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='ai')
+
+    def set_model_factory(self, model_factory):
+        """Replace the model factory; the next call builds a fresh client"""
+        with self._model_lock:
+            self._model_factory = model_factory
+            self._model = None
+
+    def model(self):
+        """The reused model client, built on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._model_factory()
+        return self._model
+
+    def _start(self, prompt, wait):
+        """Admit a call and submit it; returns the upstream future"""
+        model = self.model()
+        if model is None:
+            metrics.observe_ai_call('rejected')
+            raise AIUnavailable("No model configured")
+        if wait > 0:
+            acquired = self._slots.acquire(timeout=wait)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            metrics.observe_ai_call('rejected')
+            raise AIUnavailable(f"{self.max_in_flight} AI calls already in flight")
+        # Asked only once a slot is held, so a half-open trial always runs
+        if not self.breaker.allow():
+            self._slots.release()
+            metrics.observe_ai_call('rejected')
+            raise AIUnavailable("Circuit breaker open")
+        try:
+            future = self._executor.submit(lambda: model.generate_content(prompt).text)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until upstream really returns, even after a timeout
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def _failed(self, error, start):
+        """Record a failure and translate it into an AIError"""
+        self.breaker.record_failure()
+        if isinstance(error, (FuturesTimeout, asyncio.TimeoutError)):
+            metrics.observe_ai_call('timeout', time.perf_counter() - start)
+            return AITimeout(f"No answer within {self.timeout}s")
+        metrics.observe_ai_call('error', time.perf_counter() - start)
+        return AIUpstreamError(str(error))
+
+    def _succeeded(self, start):
+        self.breaker.record_success()
+        metrics.observe_ai_call('ok', time.perf_counter() - start)
+
+    def generate(self, prompt):
+        """Model output text for prompt, raising AIError on failure"""
+        future = self._start(prompt, self.queue_wait)
+        start = time.perf_counter()
+        try:
+            text = future.result(timeout=self.timeout)
+        except Exception as e:
+            raise self._failed(e, start) from e
+        self._succeeded(start)
+        return text
+
+    async def generate_async(self, prompt):
+        """Awaitable variant of generate for async front ends"""
+        # Never block the event loop waiting for a slot
+        future = self._start(prompt, 0)
+        start = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except Exception as e:
+            raise self._failed(e, start) from e
+        self._succeeded(start)
+        return text
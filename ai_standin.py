@@ -0,0 +1,137 @@
+"""
+AI Stand-in Server
+Local HTTP server answering Gemini's generateContent REST call
+(POST /v1beta/models/<model>:generateContent) from canned answers or a
+recording, with a configurable latency distribution, error rate and rate
+limit (HTTP 429). Point the app at it with AI_BACKEND=http and
+AI_STANDIN_URL to load-test the AI path offline over real sockets.
+GET /stats returns call counts.
+
+Usage: python ai_standin.py [--port 8765] [--latency lognormal:0.3,0.5]
+       [--error-rate 0.01] [--rate-limit 50 --burst 10]
+       [--answers answers.json | --replay recording.jsonl [--recorded-timing]]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import sys
+import threading
+import ai_backends
+from ai_backends import FakeModel, Latency, RateLimited, ReplayModel
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """generateContent, /health and /stats over keep-alive HTTP/1.1"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status, document):
+        body = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {"status": "ok"})
+        elif self.path == '/stats':
+            self._send(200, self.server.stats())
+        else:
+            self._send(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.endswith(':generateContent'):
+            self._send(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+        try:
+            prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._send(400, {"error": {"code": 400, "message": "Invalid request"}})
+            return
+        try:
+            text = self.server.model.generate_content(prompt).text
+        except RateLimited as e:
+            self.server.count('rate_limited')
+            self._send(429, {"error": {"code": 429, "message": str(e)}})
+            return
+        except Exception as e:
+            self.server.count('error')
+            self._send(500, {"error": {"code": 500, "message": str(e)}})
+            return
+        self.server.count('ok')
+        self._send(200, {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]})
+
+    def log_message(self, format, *args):
+        # One line per call would dominate the cost of a load test
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded server answering with one shared model"""
+
+    daemon_threads = True
+
+    def __init__(self, address, model):
+        super().__init__(address, StandInHandler)
+        self.model = model
+        self._counts = {"ok": 0, "error": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+
+    def count(self, outcome):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, latency=repr(self.model.latency))
+
+
+def build_model(args):
+    """Model behind the server, from the command line"""
+    latency = Latency.parse(args.latency) if args.latency else ai_backends.default_latency()
+    options = dict(latency=latency, error_rate=args.error_rate, rate_limit=args.rate_limit,
+                   burst=args.burst, seed=args.seed)
+    if args.replay:
+        return ReplayModel(args.replay, default=args.default, timing=args.recorded_timing, **options)
+    return FakeModel(answers=ai_backends.load_answers(args.answers), default=args.default, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Gemini stand-in server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', help="e.g. fixed:0.1, uniform:0.05,0.2, lognormal:0.3,0.5 "
+                        "(default: AI_FAKE_LATENCY_DIST or AI_FAKE_LATENCY)")
+    parser.add_argument('--error-rate', type=float, default=ai_backends.AI_FAKE_ERROR_RATE)
+    parser.add_argument('--rate-limit', type=float, default=ai_backends.AI_FAKE_RATE_LIMIT,
+                        help='calls per second before answering 429 (0 = unlimited)')
+    parser.add_argument('--burst', type=int, default=ai_backends.AI_FAKE_BURST)
+    parser.add_argument('--answers', default=ai_backends.AI_FAKE_ANSWERS,
+                        help='JSON object of question -> answer')
+    parser.add_argument('--replay', help='recording made with AI_RECORD_PATH')
+    parser.add_argument('--recorded-timing', action='store_true',
+                        help='with --replay, take as long as each recorded call did')
+    parser.add_argument('--default', default='Unknown',
+                        help='answer to unknown questions')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server = StandInServer((args.host, args.port), build_model(args))
+    print(f"AI stand-in on http://{args.host}:{server.server_port} "
+          f"(latency {server.model.latency!r}, error rate {args.error_rate}, "
+          f"rate limit {args.rate_limit or 'none'})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
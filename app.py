@@ -3,118 +3,129 @@ Flask Backend API - Production Ready (Fixed JSON Handling)
 Handles health check and BFHL endpoints with multiple operations
 """
 
-from flask import Flask, request, jsonify
-from functools import reduce
-import math
+from flask import Flask, Response, g, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from concurrent.futures import ThreadPoolExecutor
 import os
-import google.generativeai as genai
+import threading
+import time
+import admission
+import binary_format
+import execution
+import http_encoding
+import incremental
+import metrics
+import profiling
+import response_cache
+import tables
+from ai import get_ai_response
+from fibonacci import iter_fibonacci_range, parse_query
+from json_provider import FastJSONProvider
+from responses import OFFICIAL_EMAIL, batch_body, stream_data_list, wants_stream
+from structured_logging import RequestCapture, configure_logging, get_logger, should_capture
+from operations import InvalidInput, compute, extract_operation, validate_input
+# Math helpers re-exported so `from app import ...` keeps working
+from operations import (  # noqa: F401
+    calculate_gcd,
+    calculate_hcf,
+    calculate_lcm,
+    calculate_lcm_two,
+    filter_primes,
+    generate_fibonacci,
+    is_prime,
+)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+configure_logging()
+logger = get_logger('app')
+tables.load()
+metrics.init_app(app)
+profiling.init_app(app)
+http_encoding.init_app(app)
+app.config['MAX_CONTENT_LENGTH'] = admission.MAX_BODY_BYTES
 
 # Configuration
-OFFICIAL_EMAIL = "saksham2200.be23@chitkara.edu.in"
-
-# Configure Google Gemini API
-try:
-    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-    if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
-except Exception as e:
-    print(f"Warning: Gemini API configuration failed - {e}")
-
-
-# ==================== UTILITY FUNCTIONS ====================
-
-def generate_fibonacci(n):
-    """Generate first N fibonacci numbers"""
-    if n <= 0:
-        return []
-    elif n == 1:
-        return [0]
-    elif n == 2:
-        return [0, 1]
-    
-    fib_sequence = [0, 1]
-    for i in range(2, n):
-        fib_sequence.append(fib_sequence[i-1] + fib_sequence[i-2])
-    
-    return fib_sequence
+BATCH_AI_THREADS = int(os.environ.get('BATCH_AI_THREADS', 8))
 
 
-def is_prime(num):
-    """Check if a number is prime"""
-    if num < 2:
-        return False
-    if num == 2:
-        return True
-    if num % 2 == 0:
-        return False
-    
-    for i in range(3, int(math.sqrt(num)) + 1, 2):
-        if num % i == 0:
-            return False
-    
-    return True
-
+# ==================== WORKER POOLS ====================
 
-def filter_primes(numbers):
-    """Filter prime numbers from an array"""
-    return [num for num in numbers if is_prime(num)]
+# CPU work goes through execution.cpu_executor. The AI pool is created
+# lazily so each gunicorn worker gets its own after forking
+_ai_pool = None
+_pool_lock = threading.Lock()
 
 
-def calculate_gcd(a, b):
-    """Calculate GCD using Euclidean algorithm"""
-    while b:
-        a, b = b, a % b
-    return abs(a)
+def _get_ai_pool():
+    """Thread pool for concurrent AI batch items"""
+    global _ai_pool
+    with _pool_lock:
+        if _ai_pool is None:
+            _ai_pool = ThreadPoolExecutor(max_workers=BATCH_AI_THREADS)
+        return _ai_pool
 
 
-def calculate_hcf(numbers):
-    """Calculate HCF of multiple numbers"""
-    if not numbers:
-        return 0
-    return reduce(calculate_gcd, numbers)
+# ==================== RESPONSES ====================
 
+def _reject(capture, status, reason):
+    """Failure response; the reason is logged, never returned"""
+    if capture:
+        capture.add(reason=reason)
+        capture.emit(status)
+    else:
+        logger.debug("rejected", extra={"status": status, "reason": reason})
+    return jsonify({"is_success": False}), status
 
-def calculate_lcm_two(a, b):
-    """Calculate LCM of two numbers"""
-    if a == 0 or b == 0:
-        return 0
-    return abs(a * b) // calculate_gcd(a, b)
 
+def _reject_busy(capture, reason):
+    """503 with Retry-After when the expensive lane is saturated"""
+    response, status = _reject(capture, 503, reason)
+    response.headers['Retry-After'] = '1'
+    return response, status
 
-def calculate_lcm(numbers):
-    """Calculate LCM of multiple numbers"""
-    if not numbers:
-        return 0
-    return reduce(calculate_lcm_two, numbers)
 
+# ==================== INCREMENTAL PARSING ====================
 
-def get_ai_response(question):
-    """Get single-word answer from Google Gemini API"""
+def _bfhl_incremental():
+    """(response, None) for a large prime/lcm/hcf body, or (None, body) to parse it normally"""
+    start = time.perf_counter()
+    keys = response_cache.InputKeys()
     try:
-        if not GEMINI_API_KEY:
-            return "Error"
-        
-        model = genai.GenerativeModel('gemini-pro')
-        enhanced_prompt = f"""Answer the following question with EXACTLY ONE WORD only. 
-No explanations, no punctuation, no additional text. Just one single word.
-
-Question: {question}
-
-Answer (one word only):"""
-        
-        response = model.generate_content(enhanced_prompt)
-        answer = response.text.strip()
-        answer = answer.split()[0] if answer else "Unknown"
-        answer = ''.join(char for char in answer if char.isalnum())
-        
-        return answer
+        # Each batch takes an expensive-lane slot only while it computes
+        operation, result, length, _ = incremental.parse_stream(
+            request.stream, admission.expensive_lane, keys
+        )
+    except incremental.NotStreamable as e:
+        return None, e.body
+    except RequestEntityTooLarge:
+        return _reject(None, 413, f"Body exceeds {admission.MAX_BODY_BYTES} bytes"), None
+    except InvalidInput as e:
+        return _reject(None, 400, str(e)), None
+    except admission.LimitExceeded as e:
+        return _reject(None, 413, str(e)), None
+    except admission.AdmissionRejected as e:
+        return _reject_busy(None, str(e)), None
+    # Includes the upload time, which parsing overlaps with
+    metrics.observe_operation(operation, None, time.perf_counter() - start, size=length)
     
-    except Exception as e:
-        print(f"AI Error: {e}")
-        return "Error"
+    # Answered like the buffered path: negotiated format, ETag and cache entry
+    response_format = binary_format.response_format(
+        request.headers.get('Accept', ''), binary_format.JSON, operation,
+        operation != 'prime' or keys.fits_int64
+    )
+    key = keys.request_key(response_format, operation) if http_encoding.HTTP_ETAGS else None
+    etag = http_encoding.etag(operation, key)
+    held = http_encoding.not_modified(request.headers.get('If-None-Match'), etag)
+    if held is not None:
+        return Response(status=304, headers={'ETag': held}), None
+    g.etag = etag
+    body, content_type = response_cache.response_body(response_format, operation, result)
+    cache_key = keys.cache_key(response_format, operation)
+    if cache_key is not None:
+        response_cache.cache.set(cache_key, operation, body, content_type)
+    return Response(body, status=200, mimetype=content_type), None
 
 
 # ==================== API ENDPOINTS ====================
@@ -131,91 +142,226 @@ def health_check():
 @app.route('/bfhl', methods=['POST'])
 def bfhl_handler():
     """Main BFHL endpoint handler"""
+    capture = RequestCapture(logger, '/bfhl') if should_capture(logger) else None
     try:
-        # Debug logging
-        print(f"\n{'='*60}")
-        print(f"Content-Type: {request.content_type}")
-        print(f"Raw Data: {request.get_data(as_text=True)}")
+        # Check content type: JSON, MessagePack or packed int64
+        request_format = binary_format.request_format(request.content_type)
+        if request_format is None:
+            return _reject(capture, 400, f"Unsupported Content-Type: {request.content_type}")
         
-        # Check content type
-        if not request.content_type or 'application/json' not in request.content_type:
-            print("Error: Content-Type must be application/json")
-            return jsonify({"is_success": False}), 400
+        # Large JSON array bodies are parsed and computed as they arrive
+        body = None
+        if (request_format == binary_format.JSON and capture is None
+                and (request.content_length or 0) >= incremental.INCREMENTAL_MIN_BYTES):
+            response, body = _bfhl_incremental()
+            if response is not None:
+                return response
         
-        # Parse JSON
+        # Parse body
         try:
-            data = request.get_json(force=True)
+            if request_format != binary_format.JSON:
+                data = binary_format.decode_request(request_format, request.get_data())
+            elif body is None:
+                data = request.get_json(force=True)
+            else:
+                data = app.json.loads(body)
+        except RequestEntityTooLarge:
+            return _reject(capture, 413, f"Body exceeds {admission.MAX_BODY_BYTES} bytes")
+        except InvalidInput as e:
+            return _reject(capture, 400, str(e))
         except Exception as e:
-            print(f"JSON Parse Error: {e}")
-            return jsonify({"is_success": False}), 400
+            return _reject(capture, 400, f"JSON parse error: {e}")
         
-        print(f"Parsed Data: {data}")
+        if capture:
+            capture.add(content_type=request.content_type, body=request.get_data(as_text=True))
+        profiling.mark('parse')
         
-        # Validate not empty
-        if not data:
-            print("Error: Empty data")
-            return jsonify({"is_success": False}), 400
+        # Validate body and operation input
+        try:
+            operation, input_value = extract_operation(data)
+            validate_input(operation, input_value)
+        except InvalidInput as e:
+            return _reject(capture, 400, str(e))
         
-        # Check for exactly one valid key
-        valid_keys = ['fibonacci', 'prime', 'lcm', 'hcf', 'AI']
-        provided_keys = [key for key in valid_keys if key in data]
+        # Reject oversized work before doing any of it
+        try:
+            cost = admission.check(operation, input_value)
+        except admission.LimitExceeded as e:
+            return _reject(capture, 413, str(e))
+        expensive = admission.is_expensive(operation, cost)
+        response_format = binary_format.response_format(
+            request.headers.get('Accept', ''), request_format, operation,
+            operation != 'prime' or binary_format.fits_int64(input_value)
+        )
+        profiling.mark('validate', operation=operation, cost=cost)
         
-        if len(provided_keys) != 1:
-            print(f"Error: Expected 1 key, got {len(provided_keys)}")
-            return jsonify({"is_success": False}), 400
+        # Deterministic results are named by their request: a client that has one gets 304
+        key = None
+        if http_encoding.HTTP_ETAGS and operation in http_encoding.ETAG_OPERATIONS:
+            key = response_cache.request_key(response_format, operation, input_value)
+        etag = http_encoding.etag(operation, key)
+        held = http_encoding.not_modified(request.headers.get('If-None-Match'), etag)
+        if held is not None:
+            if capture:
+                capture.add(operation=operation, result="<not modified>")
+                capture.emit(304)
+            return Response(status=304, headers={'ETag': held})
+        g.etag = etag
         
-        operation = provided_keys[0]
-        input_value = data[operation]
+        if (operation == 'fibonacci' and response_format == binary_format.JSON
+                and wants_stream(input_value, request.args.get('stream', ''))):
+            metrics.observe_operation(operation, input_value)
+            if expensive:
+                try:
+                    admission.expensive_lane.acquire()
+                except admission.AdmissionRejected as e:
+                    return _reject_busy(capture, str(e))
+            offset, limit, _ = parse_query(input_value)
+            if capture:
+                capture.add(operation=operation, result=f"<stream of {limit} terms>")
+                capture.emit(200)
+            response = Response(stream_data_list(iter_fibonacci_range(offset, limit)),
+                                status=200, mimetype='application/json')
+            if expensive:
+                # Runs when the server closes the response, even on client disconnect
+                response.call_on_close(admission.expensive_lane.release)
+            return response
         
-        print(f"Operation: {operation}, Input: {input_value}")
+        # Identical requests answered by any worker are served as stored
+        cache_key = None if capture else response_cache.cache.key(response_format, operation, input_value)
+        if cache_key is not None:
+            cached = response_cache.cache.get(cache_key)
+            if cached is not None:
+                metrics.observe_operation(operation, input_value)
+                profiling.mark('compute', cache='hit')
+                body, content_type = cached
+                return Response(body, status=200, mimetype=content_type)
         
         # Process operation
-        result = None
-        
-        if operation == 'fibonacci':
-            if not isinstance(input_value, int) or input_value < 0:
-                return jsonify({"is_success": False}), 400
-            result = generate_fibonacci(input_value)
-        
-        elif operation == 'prime':
-            if not isinstance(input_value, list):
-                return jsonify({"is_success": False}), 400
-            if not all(isinstance(x, int) for x in input_value):
-                return jsonify({"is_success": False}), 400
-            result = filter_primes(input_value)
-        
-        elif operation == 'lcm':
-            if not isinstance(input_value, list) or len(input_value) == 0:
-                return jsonify({"is_success": False}), 400
-            if not all(isinstance(x, int) for x in input_value):
-                return jsonify({"is_success": False}), 400
-            result = calculate_lcm(input_value)
-        
-        elif operation == 'hcf':
-            if not isinstance(input_value, list) or len(input_value) == 0:
-                return jsonify({"is_success": False}), 400
-            if not all(isinstance(x, int) for x in input_value):
-                return jsonify({"is_success": False}), 400
-            result = calculate_hcf(input_value)
-        
-        elif operation == 'AI':
-            if not isinstance(input_value, str) or len(input_value.strip()) == 0:
-                return jsonify({"is_success": False}), 400
+        start = time.perf_counter()
+        if operation == 'AI':
             result = get_ai_response(input_value)
+        elif expensive:
+            try:
+                admission.expensive_lane.acquire()
+            except admission.AdmissionRejected as e:
+                return _reject_busy(capture, str(e))
+            try:
+                result = execution.expensive_executor.run(operation, input_value, cost)
+            finally:
+                admission.expensive_lane.release()
+        else:
+            # Inline below the cost threshold, otherwise on the process pool
+            result = execution.cpu_executor.run(operation, input_value, cost)
+        metrics.observe_operation(operation, input_value, time.perf_counter() - start)
+        profiling.mark('compute')
         
         # Success response
-        print(f"✅ Success! Result: {result}")
-        print(f"{'='*60}\n")
+        if capture:
+            capture.add(operation=operation, result=result)
+            capture.emit(200)
+        if cache_key is not None:
+            body, content_type = response_cache.response_body(response_format, operation, result)
+            if response_cache.cacheable(operation, result):
+                response_cache.cache.set(cache_key, operation, body, content_type)
+            return Response(body, status=200, mimetype=content_type)
+        if response_format != binary_format.JSON:
+            return Response(binary_format.encode_response(response_format, operation, result),
+                            status=200, mimetype=response_format)
         return jsonify({
             "is_success": True,
             "official_email": OFFICIAL_EMAIL,
             "data": result
         }), 200
     
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Unhandled error in /bfhl")
+        if capture:
+            capture.emit(500)
+        return jsonify({"is_success": False}), 500
+
+
+@app.route('/bfhl/batch', methods=['POST'])
+def bfhl_batch_handler():
+    """Run many BFHL operations in one request, results returned in order"""
+    capture = RequestCapture(logger, '/bfhl/batch') if should_capture(logger) else None
+    try:
+        if not request.content_type or 'application/json' not in request.content_type:
+            return _reject(capture, 400, "Content-Type must be application/json")
+        
+        try:
+            data = request.get_json(force=True)
+        except RequestEntityTooLarge:
+            return _reject(capture, 413, f"Body exceeds {admission.MAX_BODY_BYTES} bytes")
+        except Exception as e:
+            return _reject(capture, 400, f"JSON parse error: {e}")
+        
+        if capture:
+            capture.add(body=request.get_data(as_text=True))
+        profiling.mark('parse')
+        
+        operations = data.get('operations') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or len(operations) == 0:
+            return _reject(capture, 400, "operations must be a non-empty array")
+        if len(operations) > admission.BATCH_MAX_OPERATIONS:
+            return _reject(capture, 400, f"Batch of {len(operations)} exceeds {admission.BATCH_MAX_OPERATIONS}")
+        
+        # Submit every valid item first so CPU and AI work overlap
+        futures = []
+        budget = admission.BatchBudget()
+        for item in operations:
+            try:
+                if not isinstance(item, dict):
+                    raise InvalidInput("Batch item must be an object")
+                operation, input_value = extract_operation(item)
+                validate_input(operation, input_value)
+            except InvalidInput:
+                futures.append(None)
+                continue
+            
+            try:
+                cost = admission.check(operation, input_value)
+            except admission.LimitExceeded:
+                futures.append(None)
+                continue
+            try:
+                budget.charge(operation, cost)
+            except admission.LimitExceeded as e:
+                return _reject(capture, 413, str(e))
+            
+            metrics.observe_operation(operation, input_value)
+            if operation == 'AI':
+                futures.append(_get_ai_pool().submit(get_ai_response, input_value))
+            elif admission.is_expensive(operation, cost):
+                try:
+                    futures.append(admission.expensive_lane.submit(compute, operation, input_value))
+                except admission.AdmissionRejected:
+                    futures.append(None)
+            else:
+                futures.append(execution.cpu_executor.submit(operation, input_value, cost))
+        
+        results = []
+        for future in futures:
+            if future is None:
+                results.append({"is_success": False})
+                continue
+            try:
+                results.append({"is_success": True, "data": future.result()})
+            except Exception:
+                logger.exception("Batch item failed")
+                results.append({"is_success": False})
+        # Items are validated as they are submitted, so this covers both
+        profiling.mark('compute', operations=len(operations))
+        
+        if capture:
+            capture.add(result=results)
+            capture.emit(200)
+        return app.response_class(batch_body(results), mimetype=app.json.mimetype), 200
+    
+    except Exception:
+        logger.exception("Unhandled error in /bfhl/batch")
+        if capture:
+            capture.emit(500)
         return jsonify({"is_success": False}), 500
 
 
@@ -229,6 +375,11 @@ def method_not_allowed(error):
     return jsonify({"is_success": False}), 405
 
 
+@app.errorhandler(413)
+def payload_too_large(error):
+    return jsonify({"is_success": False}), 413
+
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({"is_success": False}), 500
@@ -0,0 +1,511 @@
+"""
+ASGI Entry Point
+Async variant of the BFHL API for high-concurrency deployments, e.g.
+`uvicorn asgi:app --workers 2`. Serves the same /health, /bfhl, /bfhl/batch
+and /metrics contract as app.py with identical validation and status codes,
+plus the same /debug/profiles endpoints when profiling is configured. AI questions
+are awaited on the event loop and CPU work runs on the execution layer's
+process pools, so one process can hold thousands of open connections.
+"""
+
+import asyncio
+import time
+from urllib.parse import parse_qs
+import admission
+import binary_format
+import execution
+import http_encoding
+import incremental
+import metrics
+import profiling
+import response_cache
+import tables
+from ai import get_ai_response_async
+from fibonacci import iter_fibonacci_range, parse_query
+from json_provider import decode, encode
+from operations import InvalidInput, compute, extract_operation, validate_input
+from responses import batch_body, failure, stream_data_list, success, wants_stream
+from structured_logging import configure_logging, get_logger
+
+configure_logging()
+logger = get_logger('asgi')
+tables.load()
+
+JSON_HEADERS = [(b'content-type', b'application/json')]
+
+
+class HTTPError(Exception):
+    """Ends a request with a failure envelope and this status"""
+
+    def __init__(self, status, reason, headers=()):
+        super().__init__(reason)
+        self.status = status
+        self.headers = list(headers)
+
+
+# ==================== HTTP HELPERS ====================
+
+async def send_json(send, status, body, headers=()):
+    payload = encode(body) + b'\n'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': JSON_HEADERS + [(b'content-length', str(len(payload)).encode())] + list(headers),
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def send_bytes(send, status, payload, content_type, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()),
+                    (b'content-length', str(len(payload)).encode())] + list(headers),
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def read_body(receive, limit=admission.MAX_BODY_BYTES):
+    """Whole request body, or HTTPError(413) once it grows past limit"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError("Client disconnected")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            raise HTTPError(413, f"Body exceeds {limit} bytes")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+def header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+
+# ==================== API ENDPOINTS ====================
+
+async def health_check(scope, receive, send):
+    await send_json(send, 200, success())
+    return 200
+
+
+async def metrics_endpoint(scope, receive, send):
+    body, content_type = metrics.render()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', content_type.encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+    return 200
+
+
+async def stream_fibonacci(send, query, expensive, headers=()):
+    """Write the fibonacci envelope in chunks; string building runs off the loop"""
+    loop = asyncio.get_running_loop()
+    offset, limit, _ = parse_query(query)
+    chunks = stream_data_list(iter_fibonacci_range(offset, limit))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': JSON_HEADERS + list(headers)})
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if expensive:
+            admission.expensive_lane.release()
+
+
+async def bfhl_incremental(scope, receive, send, limit=admission.MAX_BODY_BYTES):
+    """Parse and compute a large prime/lcm/hcf body as it arrives and respond;
+    returns the status sent, or the whole body when it has to take the normal path"""
+    loop = asyncio.get_running_loop()
+    keys = response_cache.InputKeys()
+    # Each batch takes an expensive-lane slot only while it computes
+    parser = incremental.IncrementalParser(admission.expensive_lane, keys=keys)
+    start = time.perf_counter()
+    try:
+        try:
+            size = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    raise ConnectionResetError("Client disconnected")
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPError(413, f"Body exceeds {limit} bytes")
+                await loop.run_in_executor(None, parser.feed, chunk)
+                if not message.get('more_body', False):
+                    break
+            operation, result, length, _ = await loop.run_in_executor(None, parser.close)
+        except BaseException:
+            parser.abort()
+            raise
+    except incremental.NotStreamable as e:
+        return e.body
+    except InvalidInput as e:
+        raise HTTPError(400, str(e))
+    except admission.LimitExceeded as e:
+        raise HTTPError(413, str(e))
+    except admission.AdmissionRejected as e:
+        raise HTTPError(503, str(e), [(b'retry-after', b'1')])
+    metrics.observe_operation(operation, None, time.perf_counter() - start, size=length)
+
+    # Answered like the buffered path: negotiated format, ETag and cache entry
+    response_format = binary_format.response_format(
+        header(scope, b'accept'), binary_format.JSON, operation,
+        operation != 'prime' or keys.fits_int64
+    )
+    key = keys.request_key(response_format, operation) if http_encoding.HTTP_ETAGS else None
+    etag = http_encoding.etag(operation, key)
+    held = http_encoding.not_modified(header(scope, b'if-none-match'), etag)
+    if held is not None:
+        await send({'type': 'http.response.start', 'status': 304,
+                    'headers': [(b'etag', held.encode())]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return 304
+    payload, content_type = response_cache.response_body(response_format, operation, result)
+    cache_key = keys.cache_key(response_format, operation)
+    if cache_key is not None:
+        response_cache.cache.set(cache_key, operation, payload, content_type)
+    await send_bytes(send, 200, payload, content_type, [(b'etag', etag.encode())] if etag else [])
+    return 200
+
+
+async def bfhl_handler(scope, receive, send):
+    """Main BFHL endpoint handler, same contract as app.bfhl_handler"""
+    content_type = header(scope, b'content-type')
+    request_format = binary_format.request_format(content_type)
+    if request_format is None:
+        raise HTTPError(400, f"Unsupported Content-Type: {content_type}")
+
+    length = header(scope, b'content-length')
+    if (request_format == binary_format.JSON and length.isdigit()
+            and int(length) >= incremental.INCREMENTAL_MIN_BYTES):
+        body = await bfhl_incremental(scope, receive, send)
+        if isinstance(body, int):
+            return body
+    else:
+        body = await read_body(receive)
+    try:
+        if request_format == binary_format.JSON:
+            data = decode(body)
+        else:
+            data = binary_format.decode_request(request_format, body)
+    except InvalidInput as e:
+        raise HTTPError(400, str(e))
+    except Exception as e:
+        raise HTTPError(400, f"JSON parse error: {e}")
+    profiling.mark('parse')
+
+    try:
+        operation, input_value = extract_operation(data)
+        validate_input(operation, input_value)
+    except InvalidInput as e:
+        raise HTTPError(400, str(e))
+
+    try:
+        cost = admission.check(operation, input_value)
+    except admission.LimitExceeded as e:
+        raise HTTPError(413, str(e))
+    expensive = admission.is_expensive(operation, cost)
+    response_format = binary_format.response_format(
+        header(scope, b'accept'), request_format, operation,
+        operation != 'prime' or binary_format.fits_int64(input_value)
+    )
+    profiling.mark('validate', operation=operation, cost=cost)
+
+    # Deterministic results are named by their request: a client that has one gets 304
+    key = None
+    if http_encoding.HTTP_ETAGS and operation in http_encoding.ETAG_OPERATIONS:
+        key = response_cache.request_key(response_format, operation, input_value)
+    etag = http_encoding.etag(operation, key)
+    held = http_encoding.not_modified(header(scope, b'if-none-match'), etag)
+    if held is not None:
+        await send({'type': 'http.response.start', 'status': 304,
+                    'headers': [(b'etag', held.encode())]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return 304
+    etag_headers = [(b'etag', etag.encode())] if etag else []
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if (operation == 'fibonacci' and response_format == binary_format.JSON
+            and wants_stream(input_value, query.get('stream', [''])[0])):
+        metrics.observe_operation(operation, input_value)
+        if expensive:
+            try:
+                admission.expensive_lane.acquire()
+            except admission.AdmissionRejected as e:
+                raise HTTPError(503, str(e), [(b'retry-after', b'1')])
+        await stream_fibonacci(send, input_value, expensive, etag_headers)
+        return 200
+
+    cache_key = response_cache.cache.key(response_format, operation, input_value)
+    if cache_key is not None:
+        cached = response_cache.cache.get(cache_key)
+        if cached is not None:
+            metrics.observe_operation(operation, input_value)
+            profiling.mark('compute', cache='hit')
+            await send_bytes(send, 200, *cached, etag_headers)
+            return 200
+
+    start = time.perf_counter()
+    if operation == 'AI':
+        result = await get_ai_response_async(input_value)
+    elif expensive:
+        try:
+            admission.expensive_lane.acquire()
+        except admission.AdmissionRejected as e:
+            raise HTTPError(503, str(e), [(b'retry-after', b'1')])
+        try:
+            # run() may reduce on the calling thread, so keep it off the loop
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, execution.expensive_executor.run, operation, input_value, cost
+            )
+        finally:
+            admission.expensive_lane.release()
+    else:
+        # Inline below the cost threshold, otherwise awaited on the process pool
+        result = await asyncio.wrap_future(
+            execution.cpu_executor.submit(operation, input_value, cost)
+        )
+    metrics.observe_operation(operation, input_value, time.perf_counter() - start)
+    profiling.mark('compute')
+
+    if cache_key is not None:
+        payload, content_type = response_cache.response_body(response_format, operation, result)
+        if response_cache.cacheable(operation, result):
+            response_cache.cache.set(cache_key, operation, payload, content_type)
+        await send_bytes(send, 200, payload, content_type, etag_headers)
+        return 200
+    if response_format != binary_format.JSON:
+        payload = binary_format.encode_response(response_format, operation, result)
+        await send_bytes(send, 200, payload, response_format, etag_headers)
+        return 200
+    await send_json(send, 200, success(result), etag_headers)
+    return 200
+
+
+async def batch_handler(scope, receive, send):
+    """Many BFHL operations in one request, same contract as app.bfhl_batch_handler"""
+    if 'application/json' not in header(scope, b'content-type'):
+        raise HTTPError(400, "Content-Type must be application/json")
+    body = await read_body(receive)
+    try:
+        data = decode(body)
+    except Exception as e:
+        raise HTTPError(400, f"JSON parse error: {e}")
+    profiling.mark('parse')
+
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or len(operations) == 0:
+        raise HTTPError(400, "operations must be a non-empty array")
+    if len(operations) > admission.BATCH_MAX_OPERATIONS:
+        raise HTTPError(400, f"Batch of {len(operations)} exceeds {admission.BATCH_MAX_OPERATIONS}")
+
+    # Start every valid item first so CPU and AI work overlap
+    futures = []
+    ai_calls = set()
+    budget = admission.BatchBudget()
+    for item in operations:
+        try:
+            if not isinstance(item, dict):
+                raise InvalidInput("Batch item must be an object")
+            operation, input_value = extract_operation(item)
+            validate_input(operation, input_value)
+            cost = admission.check(operation, input_value)
+        except (InvalidInput, admission.LimitExceeded):
+            futures.append(None)
+            continue
+        try:
+            budget.charge(operation, cost)
+        except admission.LimitExceeded as e:
+            # AI calls run on: one may be the leader other requests coalesce onto,
+            # and its answer still fills the cache
+            for future in futures:
+                if future is not None and future not in ai_calls:
+                    future.cancel()
+            raise HTTPError(413, str(e))
+
+        metrics.observe_operation(operation, input_value)
+        if operation == 'AI':
+            task = asyncio.ensure_future(get_ai_response_async(input_value))
+            ai_calls.add(task)
+            futures.append(task)
+        elif admission.is_expensive(operation, cost):
+            try:
+                futures.append(asyncio.wrap_future(
+                    admission.expensive_lane.submit(compute, operation, input_value)
+                ))
+            except admission.AdmissionRejected:
+                futures.append(None)
+        else:
+            futures.append(asyncio.wrap_future(
+                execution.cpu_executor.submit(operation, input_value, cost)
+            ))
+
+    results = []
+    for future in futures:
+        if future is None:
+            results.append(failure())
+            continue
+        try:
+            results.append({"is_success": True, "data": await future})
+        except Exception:
+            logger.exception("Batch item failed")
+            results.append(failure())
+    # Items are validated as they are submitted, so this covers both
+    profiling.mark('compute', operations=len(operations))
+    await send_bytes(send, 200, batch_body(results), 'application/json')
+    return 200
+
+
+# ==================== PROFILING ====================
+
+def require_profile_token(scope):
+    if not profiling.authorized(header(scope, b'x-profile-token')):
+        raise HTTPError(404, "Not found")
+
+
+async def list_profiles(scope, receive, send):
+    """Recent profile summaries with phase timings"""
+    require_profile_token(scope)
+    await send_json(send, 200, {"sample_rate": profiling.PROFILE_SAMPLE_RATE,
+                                "profiles": profiling.store.list()})
+    return 200
+
+
+async def download_profile(scope, receive, send):
+    """Collapsed stacks or pstats dump of one profile"""
+    require_profile_token(scope)
+    profile_id = scope['path'][len('/debug/profiles/'):]
+    entry = profiling.store.get(profile_id)
+    if entry is None:
+        raise HTTPError(404, "No such profile")
+    summary, data = entry
+    extension, mimetype = profiling.file_type(summary)
+    disposition = f'attachment; filename="{profile_id}.{extension}"'
+    await send_bytes(send, 200, data, mimetype, [(b'content-disposition', disposition.encode())])
+    return 200
+
+
+async def set_sample_rate(scope, receive, send):
+    """Change this process's sample rate: {"sample_rate": 0.01}"""
+    require_profile_token(scope)
+    body = await read_body(receive)
+    try:
+        data = decode(body)
+    except Exception:
+        data = None
+    rate = data.get('sample_rate') if isinstance(data, dict) else None
+    if not profiling.update_sample_rate(rate):
+        raise HTTPError(400, f"Invalid sample_rate: {rate!r}")
+    await send_json(send, 200, {"is_success": True, "sample_rate": profiling.PROFILE_SAMPLE_RATE})
+    return 200
+
+
+ROUTES = {
+    '/health': ('GET', health_check),
+    '/bfhl': ('POST', bfhl_handler),
+    '/bfhl/batch': ('POST', batch_handler),
+    '/metrics': ('GET', metrics_endpoint),
+}
+# Only routed while profiling is configured, as profiling.init_app does for Flask
+PROFILING_ROUTES = {
+    '/debug/profiles': ('GET', list_profiles),
+    '/debug/profiling': ('POST', set_sample_rate),
+}
+
+
+def resolve(path):
+    """(endpoint label, route) of a request path; the label is the route pattern"""
+    route = ROUTES.get(path)
+    if route is not None:
+        return path, route
+    if profiling.enabled():
+        if path in PROFILING_ROUTES:
+            return path, PROFILING_ROUTES[path]
+        if path.startswith('/debug/profiles/'):
+            return '/debug/profiles/<profile_id>', ('GET', download_profile)
+    return 'unmatched', None
+
+
+# ==================== APPLICATION ====================
+
+async def lifespan(receive, send):
+    """Warm the CPU pool at startup, like gunicorn's post_worker_init hook"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await asyncio.get_running_loop().run_in_executor(None, execution.cpu_executor.warm)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def serve(scope, receive, send):
+    """Route one HTTP request and answer errors with the failure envelope; returns the status sent"""
+    start = time.perf_counter()
+    endpoint, route = resolve(scope['path'])
+    started = False
+
+    async def tracked_send(message):
+        nonlocal started
+        started = started or message['type'] == 'http.response.start'
+        await send(message)
+
+    try:
+        if route is None:
+            raise HTTPError(404, "Not found")
+        method, handler = route
+        if scope['method'] != method:
+            raise HTTPError(405, "Method not allowed")
+        handler_send = tracked_send
+        if scope['path'] in http_encoding.ENCODED_ENDPOINTS:
+            handler_send = http_encoding.asgi_send(tracked_send, header(scope, b'accept-encoding'))
+        status = await handler(scope, receive, handler_send)
+    except HTTPError as e:
+        logger.debug("rejected", extra={"status": e.status, "reason": str(e)})
+        status = e.status
+        await send_json(send, status, failure(), e.headers)
+    except ConnectionResetError:
+        return None
+    except Exception:
+        logger.exception(f"Unhandled error in {endpoint}")
+        if started:
+            # Mid-stream: the status line is gone, so the server just drops the connection
+            raise
+        status = 500
+        await send_json(send, status, failure())
+    metrics.observe_request(endpoint, status, time.perf_counter() - start)
+    return status
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    profile = profiling.asgi_start(scope)
+    if profile is None:
+        await serve(scope, receive, send)
+        return
+    status = None
+    try:
+        status = await serve(scope, receive, profiling.asgi_send(send, profile))
+    finally:
+        profiling.asgi_finish(profile, status)
@@ -0,0 +1,115 @@
+"""
+AI Client Load Test (offline)
+Drives the AI path with many concurrent callers against FakeModel and reports
+latency, timeouts, fast failures and circuit breaker state. The answer cache
+is bypassed so every call reaches the fake upstream. --backend http runs the
+same load through the stand-in server (ai_standin.py) over real sockets, and
+--backend replay plays back a recording made with AI_RECORD_PATH.
+
+Usage: python benchmarks/bench_ai_client.py [--callers 64] [--calls 1000]
+       [--latency 0.05] [--jitter 0.2] [--latency-dist lognormal:0.05,0.8]
+       [--error-rate 0.05] [--rate-limit 0] [--timeout 0.2]
+       [--max-in-flight 16] [--queue-wait 1.0]
+       [--backend fake|http|replay] [--replay recording.jsonl]
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import argparse
+import json
+import sys
+import time
+from urllib.request import urlopen
+
+import common  # also puts the project root on sys.path
+import ai
+import ai_backends
+from ai_client import AIClient, AIError, CircuitBreaker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--callers', type=int, default=64)
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.2)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--timeout', type=float, default=0.2)
+    parser.add_argument('--max-in-flight', type=int, default=16)
+    parser.add_argument('--queue-wait', type=float, default=1.0)
+    parser.add_argument('--latency-dist', help='e.g. lognormal:0.05,0.8; overrides --latency/--jitter')
+    parser.add_argument('--rate-limit', type=float, default=0, help='upstream calls per second')
+    parser.add_argument('--burst', type=int, default=ai_backends.AI_FAKE_BURST)
+    parser.add_argument('--backend', choices=('fake', 'http', 'replay'), default='fake')
+    parser.add_argument('--replay', help='recording for --backend replay')
+    parser.add_argument('--port', type=int, default=8765, help='stand-in port for --backend http')
+    args = parser.parse_args()
+
+    latency = (ai_backends.Latency.parse(args.latency_dist) if args.latency_dist
+               else ai_backends.Latency('uniform', args.latency, args.latency + args.jitter))
+    server = None
+    if args.backend == 'http':
+        command = [sys.executable, 'ai_standin.py', '--port', str(args.port), '--seed', '42',
+                   '--latency', repr(latency), '--error-rate', str(args.error_rate),
+                   '--rate-limit', str(args.rate_limit), '--burst', str(args.burst)]
+        server, url = common.start_server(command, args.port)
+        model = ai_backends.HTTPModel(url)
+    elif args.backend == 'replay':
+        model = ai_backends.ReplayModel(args.replay, default="Unknown", error_rate=args.error_rate,
+                                        rate_limit=args.rate_limit, burst=args.burst, seed=42)
+    else:
+        model = ai.FakeModel(latency=latency, error_rate=args.error_rate,
+                             rate_limit=args.rate_limit, burst=args.burst, seed=42)
+    client = AIClient(lambda: model, timeout=args.timeout, max_in_flight=args.max_in_flight,
+                      queue_wait=args.queue_wait,
+                      breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1.0))
+    outcomes = Counter()
+    latencies = []
+
+    def call(i):
+        start = time.perf_counter()
+        try:
+            client.generate(ai.build_prompt(f"question {i}"))
+            outcome = 'ok'
+        except AIError as e:
+            outcome = type(e).__name__
+        elapsed = time.perf_counter() - start
+        return outcome, elapsed
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.callers) as pool:
+            for outcome, elapsed in pool.map(call, range(args.calls)):
+                outcomes[outcome] += 1
+                latencies.append(elapsed)
+        wall = time.perf_counter() - start
+        if server is not None:
+            with urlopen(f"{url}/stats") as response:
+                stats = json.load(response)
+            upstream_calls = stats["ok"] + stats["error"] + stats["rate_limited"]
+            rate_limited = stats["rate_limited"]
+        else:
+            upstream_calls, rate_limited = model.calls, model.rate_limited
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    latencies.sort()
+
+    print("\n" + "="*60)
+    print(f"AI client ({args.backend}): {args.calls} calls, {args.callers} callers, "
+          f"max_in_flight={args.max_in_flight}, timeout={args.timeout}s")
+    print("="*60)
+    for outcome, count in sorted(outcomes.items()):
+        print(f"{outcome:<20}{count:>8}")
+    print(f"{'upstream calls':<20}{upstream_calls:>8}")
+    print(f"{'rate limited':<20}{rate_limited:>8}")
+    print(f"{'throughput':<20}{args.calls / wall:>8.1f} calls/s")
+    for label, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+        print(f"{label:<20}{common.percentile(latencies, fraction) * 1000:>8.1f} ms")
+    print(f"{'breaker state':<20}{client.breaker.state:>8}")
+    print("="*60 + "\n")
+
+
+if __name__ == '__main__':
+    main()
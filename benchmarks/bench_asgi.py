@@ -0,0 +1,191 @@
+"""
+WSGI vs ASGI Benchmark at High Connection Counts
+Starts the WSGI deployment (gunicorn gthread, app:app) and the ASGI one
+(uvicorn, asgi:app) with the fake AI backend, then holds --connections
+keep-alive connections open against each and reports throughput, latency
+percentiles and failures per workload. The client is a small asyncio
+HTTP/1.1 client, so a single process can drive thousands of connections.
+
+Usage: python benchmarks/bench_asgi.py [--connections 1000] [--requests 10000]
+       [--workloads AI,fibonacci,mixed] [--workers 2] [--ai-latency 0.1] [--timeout 30]
+Needs gunicorn and uvicorn installed; raise `ulimit -n` above 2x connections.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import common  # also puts the project root on sys.path
+
+
+def make_bodies(workload, count, rng):
+    """Request bodies; AI questions are unique so every one reaches the fake upstream"""
+    bodies = []
+    for i in range(count):
+        kind = ('AI', 'fibonacci', 'prime')[i % 3] if workload == 'mixed' else workload
+        if kind == 'AI':
+            body = {"AI": f"Benchmark question {i} {rng.random()}?"}
+        elif kind == 'fibonacci':
+            body = {"fibonacci": 50}
+        else:
+            body = {"prime": [rng.randrange(1, 10 ** 6) for _ in range(100)]}
+        bodies.append(json.dumps(body).encode())
+    return bodies
+
+
+# ==================== CLIENT ====================
+
+async def read_response(reader):
+    """(status, body, close) of one HTTP/1.1 response with a Content-Length"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    status = int(status_line.split()[1])
+    length = 0
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip().lower() == 'close':
+            close = True
+    body = await reader.readexactly(length)
+    return status, body, close
+
+
+async def connection_worker(host, port, queue, latencies, failures, timeout):
+    """One keep-alive connection sending bodies from queue until it is empty"""
+    reader = writer = None
+    while True:
+        try:
+            body = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        request = (b'POST /bfhl HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n'
+                   b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            writer.write(request)
+            await writer.drain()
+            status, _, close = await asyncio.wait_for(read_response(reader), timeout)
+            if status != 200:
+                failures[f"http {status}"] = failures.get(f"http {status}", 0) + 1
+            if close:
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError,
+                ValueError) as e:
+            failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, bodies, connections, timeout):
+    host, port = url.rsplit('/', 1)[-1].split(':')
+    queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+    latencies = []
+    failures = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        connection_worker(host, int(port), queue, latencies, failures, timeout)
+        for _ in range(connections)
+    ])
+    wall = time.perf_counter() - start
+    return {
+        "requests": len(bodies),
+        "ok": len(latencies) - sum(v for k, v in failures.items() if k.startswith('http')),
+        "failures": failures,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        **common.latency_summary(latencies),
+    }
+
+
+# ==================== SERVERS ====================
+
+def server_commands(port, workers, threads, connections):
+    # gthread stops accepting at worker_connections (default 1000) and stalls
+    # when a client holds exactly that many, so leave headroom
+    worker_connections = max(1000, connections + 100)
+    return {
+        'wsgi': [sys.executable, '-m', 'gunicorn', 'app:app', '-b', f'127.0.0.1:{port}',
+                 '-w', str(workers), '--worker-class', 'gthread', '--threads', str(threads),
+                 '--worker-connections', str(worker_connections), '--backlog', '4096'],
+        'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+                 '--port', str(port), '--workers', str(workers), '--backlog', '4096',
+                 '--log-level', 'warning'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--workloads', default='AI,fibonacci,mixed')
+    parser.add_argument('--servers', default='wsgi,asgi')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help='gthread threads per WSGI worker')
+    parser.add_argument('--ai-latency', type=float, default=0.1)
+    parser.add_argument('--timeout', type=float, default=30, help='per-request client timeout (s)')
+    parser.add_argument('--port', type=int, default=8098)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    # Same fake upstream for both; enough AI slots that the client limit is the server
+    env = {
+        'AI_BACKEND': 'fake',
+        'AI_FAKE_LATENCY': str(args.ai_latency),
+        'AI_MAX_IN_FLIGHT': str(args.connections),
+        'AI_QUEUE_WAIT': '5',
+        'AI_TIMEOUT': '30',
+    }
+    commands = server_commands(args.port, args.workers, args.threads, args.connections)
+    rng = random.Random(args.seed)
+
+    results = []
+    print("\n" + "="*84)
+    print(f"WSGI vs ASGI: {args.connections} connections, {args.requests} requests/workload, "
+          f"{args.workers} workers")
+    print("="*84)
+    print(f"{'server':<8}{'workload':<12}{'rps':>10}{'p50 ms':>11}{'p95 ms':>11}"
+          f"{'p99 ms':>11}{'failures':>21}")
+    for name in args.servers.split(','):
+        server, url = common.start_server(commands[name], args.port, env=env)
+        try:
+            for workload in args.workloads.split(','):
+                bodies = make_bodies(workload, args.requests, rng)
+                result = asyncio.run(run_load(url, bodies, args.connections, args.timeout))
+                results.append({"server": name, "workload": workload,
+                                "connections": args.connections, **result})
+                failed = sum(result['failures'].values())
+                print(f"{name:<8}{workload:<12}{result['throughput_rps']:>10}{result['p50_ms']:>11}"
+                      f"{result['p95_ms']:>11}{result['p99_ms']:>11}{failed:>21}")
+        finally:
+            server.terminate()
+            server.wait()
+    print("="*84)
+
+    path = common.save_results('asgi', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
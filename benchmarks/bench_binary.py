@@ -0,0 +1,83 @@
+"""
+Wire Format Benchmark: JSON vs MessagePack vs packed int64 for /bfhl
+Times one /bfhl request end to end through the Flask test client (decode,
+validate, compute, encode) for large prime/hcf/lcm arrays in each request
+format, with the response in the same format.
+
+Usage: python benchmarks/bench_binary.py [--length 100000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import sys
+
+import common  # also puts the project root on sys.path
+
+import binary_format
+from app import app
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def make_cases(length, rng):
+    """(name, operation, numbers) with int64 values"""
+    return [
+        ('prime 9-digit', 'prime', [rng.randrange(1, 10 ** 9) for _ in range(length)]),
+        ('hcf 12-digit', 'hcf', [rng.randrange(1, 10 ** 6) * 123456 for _ in range(length)]),
+        ('lcm 2-digit', 'lcm', [rng.randrange(1, 100) for _ in range(length)]),
+    ]
+
+
+def encodings(operation, numbers):
+    """(format, body) pairs for one request"""
+    bodies = [(binary_format.JSON, json.dumps({operation: numbers}).encode()),
+              (binary_format.PACKED, binary_format.pack_request(operation, numbers))]
+    if binary_format.msgpack is not None:
+        bodies.insert(1, (binary_format.MSGPACK, msgpack.packb({operation: numbers})))
+    return bodies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--length', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    # Same limits for every format; the point is the per-request overhead
+    import admission
+    admission.ARRAY_MAX_LENGTH = max(admission.ARRAY_MAX_LENGTH, args.length)
+    admission.ARRAY_MAX_COST = max(admission.ARRAY_MAX_COST, args.length * 64)
+
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    results = []
+    print("\n" + "="*78)
+    print(f"{'case':<16}{'format':<28}{'request KB':>12}{'ms':>10}{'vs JSON':>10}")
+    print("="*78)
+    for name, operation, numbers in make_cases(args.length, rng):
+        baseline = None
+        for fmt, body in encodings(operation, numbers):
+            def post():
+                response = client.post('/bfhl', data=body, content_type=fmt, headers={'Accept': fmt})
+                assert response.status_code == 200, response.status_code
+            timing = common.time_call(post, min_time=0.2, repeat=args.repeat)
+            baseline = baseline or timing['best_s']
+            results.append({"case": name, "format": fmt, "body_bytes": len(body),
+                            "best_ms": round(timing['best_s'] * 1000, 3)})
+            print(f"{name:<16}{fmt:<28}{len(body) / 1024:>12.0f}{timing['best_s']*1000:>10.2f}"
+                  f"{baseline / timing['best_s']:>9.1f}x")
+    print("="*78)
+
+    path = common.save_results('binary', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Compression Benchmark: bytes on the wire and latency per content coding
+Starts gunicorn with gunicorn.conf.py and posts large /bfhl requests with
+each Accept-Encoding the server offers, over one keep-alive connection.
+Reports response bytes (headers plus body as sent, before chunked framing),
+loopback latency and the time the same bytes would take on a slower link.
+Then measures If-None-Match revalidation (304) against a full response and
+keep-alive against a new connection per request.
+
+Usage: python benchmarks/bench_compression.py [--repeat 5] [--link-mbps 10]
+Needs gunicorn installed; br and zstd need the brotli and zstandard packages.
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import time
+
+import common  # also puts the project root on sys.path
+
+import http_encoding
+
+
+def make_cases():
+    """(name, body, query string) triples"""
+    return [
+        ('fibonacci 5000 (stream)', {"fibonacci": 5000}, '?stream=1'),
+        ('fibonacci 10000+300', {"fibonacci": {"offset": 10000, "limit": 300}}, ''),
+        ('prime 2..30000', {"prime": list(range(2, 30000))}, ''),
+        ('lcm 20 (small body)', {"lcm": list(range(1, 21))}, ''),
+    ]
+
+
+def request(connection, body, query='', headers=None):
+    """(status, response headers, bytes received, seconds) for one POST /bfhl"""
+    payload = json.dumps(body).encode()
+    start = time.perf_counter()
+    connection.request('POST', f'/bfhl{query}', payload,
+                       {'Content-Type': 'application/json', **(headers or {})})
+    response = connection.getresponse()
+    data = response.read()
+    elapsed = time.perf_counter() - start
+    header_bytes = sum(len(name) + len(value) + 4 for name, value in response.getheaders())
+    return response.status, dict(response.getheaders()), header_bytes + len(data), elapsed
+
+
+def median_request(connection, repeat, *args, **kwargs):
+    """request() repeated; the last headers and size, the median seconds"""
+    samples = []
+    for _ in range(repeat):
+        status, headers, size, elapsed = request(connection, *args, **kwargs)
+        assert status in (200, 304), status
+        samples.append(elapsed)
+    return status, headers, size, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8098)
+    parser.add_argument('--link-mbps', type=float, default=10.0,
+                        help='link speed for the estimated transfer column')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    codings = [None] + list(http_encoding.available_encodings())
+    process, _ = common.start_server(
+        ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{args.port}', '--workers', '1'],
+        args.port
+    )
+    results = []
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', args.port, timeout=120)
+        print("\n" + "="*84)
+        print(f"{'case':<26}{'coding':<10}{'bytes':>12}{'ratio':>8}{'loopback ms':>14}"
+              f"{f'@{args.link_mbps:g}Mbit ms':>14}")
+        print("="*84)
+        for name, body, query in make_cases():
+            identity = None
+            for coding in codings:
+                headers = {'Accept-Encoding': coding or 'identity'}
+                _, response_headers, size, seconds = median_request(
+                    connection, args.repeat, body, query, headers
+                )
+                sent = response_headers.get('Content-Encoding', 'identity')
+                identity = identity or size
+                link_ms = size * 8 / (args.link_mbps * 1e6) * 1000
+                results.append({"case": name, "coding": sent, "bytes": size,
+                                "ms": round(seconds * 1000, 3), "link_ms": round(link_ms, 3)})
+                print(f"{name:<26}{sent:<10}{size:>12,}{identity / size:>7.1f}x"
+                      f"{seconds * 1000:>14.2f}{link_ms + seconds * 1000:>14.1f}")
+        print("="*84)
+
+        # Revalidation: the client already holds the response
+        name, body, query = make_cases()[1]
+        coding = codings[-1]
+        headers = {'Accept-Encoding': coding or 'identity'}
+        _, full_headers, full_size, full_seconds = median_request(
+            connection, args.repeat, body, query, headers
+        )
+        status, _, held_size, held_seconds = median_request(
+            connection, args.repeat, body, query, dict(headers, **{'If-None-Match': full_headers['ETag']})
+        )
+        print(f"Revalidate {name}: {status}, {held_size} bytes in {held_seconds * 1000:.2f}ms "
+              f"(full response {full_size:,} bytes in {full_seconds * 1000:.2f}ms)")
+        results.append({"case": f"revalidate {name}", "status": status, "bytes": held_size,
+                        "ms": round(held_seconds * 1000, 3), "full_bytes": full_size,
+                        "full_ms": round(full_seconds * 1000, 3)})
+
+        # Keep-alive: one connection for every request, or a new one each time
+        small = {"hcf": [12, 18, 24]}
+        rounds = 50 * args.repeat
+        start = time.perf_counter()
+        for _ in range(rounds):
+            request(connection, small)
+        kept = (time.perf_counter() - start) / rounds
+        connection.close()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fresh = http.client.HTTPConnection('127.0.0.1', args.port, timeout=30)
+            request(fresh, small)
+            fresh.close()
+        new = (time.perf_counter() - start) / rounds
+        print(f"Small request: {kept * 1000:.2f}ms kept alive, {new * 1000:.2f}ms with a new connection")
+        results.append({"case": "keep-alive", "kept_ms": round(kept * 1000, 3),
+                        "new_connection_ms": round(new * 1000, 3)})
+    finally:
+        process.terminate()
+        process.wait()
+
+    path = common.save_results('compression', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Engine Benchmark: pure Python vs NumPy
+Times filter_primes, calculate_hcf and calculate_lcm on both engines across
+input sizes and checks that the results are identical.
+
+Usage: python benchmarks/bench_engines.py [--sizes 100,1000,10000,100000]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import common  # noqa: F401  (puts the project root on sys.path)
+import operations
+import vectorized
+
+# LCM inputs are divisors of this so results stay inside int64
+LCM_BASE = 2 ** 4 * 3 ** 2 * 5 * 7 * 11 * 13 * 17 * 19 * 23
+
+
+def make_inputs(size, rng):
+    """Inputs per operation for one size"""
+    divisors = [d for d in range(1, 10000) if LCM_BASE % d == 0]
+    return {
+        'prime': [rng.randrange(1, 10 ** 7) for _ in range(size)],
+        'hcf': [rng.randrange(1, 10 ** 12) * 6 for _ in range(size)],
+        'lcm': [rng.choice(divisors) for _ in range(size)],
+    }
+
+
+def python_engine(operation, numbers):
+    if operation == 'prime':
+        return operations.filter_primes(numbers)
+    elif operation == 'hcf':
+        return operations.calculate_hcf(numbers)
+    return operations.calculate_lcm(numbers)
+
+
+def numpy_engine(operation, numbers):
+    values = vectorized.as_int64(numbers, min_size=0)
+    if operation == 'prime':
+        return vectorized.filter_primes(values)
+    elif operation == 'hcf':
+        return vectorized.calculate_hcf(values)
+    return vectorized.calculate_lcm(values)
+
+
+def best_of(fn, repeat):
+    """Best wall time of repeat runs, plus the last result"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    if vectorized.np is None:
+        print("NumPy is not installed - nothing to compare")
+        return 1
+
+    rng = random.Random(args.seed)
+    # Build the shared sieve up front so neither engine pays for it
+    operations.filter_primes([10 ** 7])
+
+    print("\n" + "="*70)
+    print(f"{'operation':<10}{'size':>10}{'python ms':>14}{'numpy ms':>14}{'speedup':>12}")
+    print("="*70)
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        for operation, numbers in make_inputs(size, rng).items():
+            py_time, py_result = best_of(lambda: python_engine(operation, numbers), args.repeat)
+            np_time, np_result = best_of(lambda: numpy_engine(operation, numbers), args.repeat)
+            if py_result != np_result:
+                print(f"❌ MISMATCH: {operation} size={size}")
+                return 1
+            print(f"{operation:<10}{size:>10}{py_time*1000:>14.3f}{np_time*1000:>14.3f}"
+                  f"{py_time/np_time:>11.1f}x")
+
+    print("="*70 + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Gunicorn Configuration Benchmark: server settings compared on one machine
+Starts gunicorn with gunicorn.conf.py once per configuration (environment
+overrides of its settings) and drives the same mixed /bfhl workload through
+each: fibonacci, prime, lcm, hcf and AI against the in-process fake model.
+Reports the time until /health answers, throughput, p50/p99 latency, errors,
+how many of the starting workers were recycled during the run and the
+memory (PSS) of the process tree.
+
+Usage: python benchmarks/bench_gunicorn.py [--requests 1000] [--concurrency 32]
+       [--only "auto mixed,auto io"] [--config "name:KEY=VALUE,KEY=VALUE" ...]
+Needs gunicorn installed; PSS is read from /proc (Linux only).
+"""
+
+import argparse
+import os
+import random
+import runpy
+import sys
+import time
+
+import common  # also puts the project root on sys.path
+
+from bench_startup import tree_pss_kb
+from load import http_sender, make_payloads, run_load
+
+CONFIGS = [
+    # gunicorn's own defaults: one sync worker, app imported in the worker
+    ('sync x1', {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_WORKERS': '1', 'GUNICORN_PRELOAD': '0',
+                 'GUNICORN_MAX_REQUESTS': '0'}),
+    ('sync auto', {'GUNICORN_WORKER_CLASS': 'sync'}),
+    ('gthread 1x8 no preload', {'GUNICORN_WORKERS': '1', 'GUNICORN_THREADS': '8',
+                                'GUNICORN_PRELOAD': '0', 'GUNICORN_MAX_REQUESTS': '0'}),
+    ('auto cpu', {'GUNICORN_WORKLOAD': 'cpu'}),
+    ('auto mixed', {}),
+    ('auto mixed, 2 per CPU', {'GUNICORN_WORKERS': str(2 * (os.cpu_count() or 1))}),
+    ('auto io', {'GUNICORN_WORKLOAD': 'io'}),
+    ('auto mixed, recycle 100', {'GUNICORN_MAX_REQUESTS': '100', 'GUNICORN_MAX_REQUESTS_JITTER': '10'}),
+]
+
+
+def parse_config(spec):
+    """('name', env) from 'name:KEY=VALUE,KEY=VALUE'"""
+    name, _, assignments = spec.partition(':')
+    env = dict(item.split('=', 1) for item in assignments.split(',') if item)
+    return name, env
+
+
+def settings(env):
+    """(worker class, workers, threads, preload) gunicorn.conf.py picks under env"""
+    saved = dict(os.environ)
+    os.environ.update(env)
+    try:
+        config = runpy.run_path(os.path.join(common.ROOT_DIR, 'gunicorn.conf.py'))
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    return config['worker_class'], config['workers'], config['threads'], config['preload_app']
+
+
+def worker_pids(pid):
+    """Direct children of the gunicorn master"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return set(int(child) for child in f.read().split())
+    except OSError:
+        return set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='mixed requests per configuration')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--fib-n', type=int, default=1000)
+    parser.add_argument('--ai-latency', type=float, default=0.05)
+    parser.add_argument('--only', help='comma-separated configuration names')
+    parser.add_argument('--config', action='append', default=[],
+                        help='extra configuration, "name:KEY=VALUE,KEY=VALUE"')
+    parser.add_argument('--port', type=int, default=8096)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    configs = CONFIGS + [parse_config(spec) for spec in args.config]
+    if args.only:
+        wanted = set(args.only.split(','))
+        configs = [(name, env) for name, env in configs if name in wanted]
+    payloads = make_payloads('mixed', args.requests, random.Random(args.seed), args.fib_n)
+    base_env = {'AI_BACKEND': 'fake', 'AI_FAKE_LATENCY': str(args.ai_latency)}
+
+    results = []
+    print("\n" + "="*104)
+    print(f"Mixed load: {args.requests} requests, concurrency {args.concurrency}, "
+          f"{os.cpu_count()} CPUs")
+    print("="*104)
+    print(f"{'config':<26}{'workers':>10}{'preload':>9}{'ready ms':>10}{'rps':>9}{'p50 ms':>9}"
+          f"{'p99 ms':>9}{'errors':>8}{'recycled':>10}{'PSS MB':>9}")
+    for name, env in configs:
+        env = dict(base_env, **env)
+        worker_class, workers, threads, preload = settings(env)
+        command = [sys.executable, '-m', 'gunicorn', 'app:app', '-b', f'127.0.0.1:{args.port}']
+        start = time.perf_counter()
+        server, url = common.start_server(command, args.port, env=env, timeout=120)
+        ready = time.perf_counter() - start
+        try:
+            send = http_sender(url)
+            # One pass to warm every worker's caches and pools, then the measured one
+            run_load(send, payloads[:args.concurrency * 2], args.concurrency)
+            before = worker_pids(server.pid)
+            result = run_load(send, payloads, args.concurrency)
+            recycled = len(before - worker_pids(server.pid))
+            pss = tree_pss_kb(server.pid) / 1024
+        finally:
+            server.terminate()
+            server.wait()
+        shape = f"{workers}x{threads if worker_class != 'sync' else 1}"
+        results.append({"config": name, "env": env, "worker_class": worker_class,
+                        "workers": workers, "threads": threads, "preload": preload,
+                        "ready_s": round(ready, 3), "recycled": recycled,
+                        "pss_mb": round(pss, 1), **result})
+        print(f"{name:<26}{shape:>10}{'on' if preload else 'off':>9}{ready * 1000:>10.0f}"
+              f"{result['throughput_rps']:>9}{result['p50_ms']:>9}{result['p99_ms']:>9}"
+              f"{result['errors']:>8}{recycled:>10}{pss:>9.1f}")
+    print("="*104)
+
+    path = common.save_results('gunicorn', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Incremental Parsing Benchmark: buffered vs incremental large /bfhl bodies
+Runs large prime/lcm/hcf bodies through the normal path (read the whole
+body, decode, compute) and through incremental.IncrementalParser fed in
+request-sized reads, reporting time and peak Python memory for each.
+
+Usage: python benchmarks/bench_incremental.py [--length 200000] [--repeat 3]
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import common  # also puts the project root on sys.path
+
+import incremental
+from json_provider import decode
+from operations import compute, validate_input
+
+
+def make_bodies(length, rng):
+    """(name, request document) pairs; prime and hcf bodies are over the 1MB threshold"""
+    return [
+        ('prime 9-digit', {"prime": [rng.randrange(1, 10 ** 9) for _ in range(length)]}),
+        ('hcf 12-digit', {"hcf": [rng.randrange(1, 10 ** 6) * 123456 for _ in range(length)]}),
+        ('lcm 3-digit', {"lcm": [rng.randrange(1, 1000) for _ in range(length)]}),
+    ]
+
+
+def buffered(body):
+    data = decode(io.BytesIO(body).read())
+    operation, = data
+    validate_input(operation, data[operation])
+    return compute(operation, data[operation])
+
+
+def streamed(body):
+    return incremental.parse_stream(io.BytesIO(body))[1]
+
+
+def measure(fn, body, repeat):
+    """(best seconds, peak traced bytes, result)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(body)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--length', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    print("\n" + "="*86)
+    print(f"{'case':<16}{'body MB':>9}{'buffered ms':>14}{'streamed ms':>14}"
+          f"{'buffered MB':>14}{'streamed MB':>14}{'saved':>7}")
+    print("="*86)
+    for name, document in make_bodies(args.length, rng):
+        body = json.dumps(document).encode()
+        old_s, old_peak, old = measure(buffered, body, args.repeat)
+        new_s, new_peak, new = measure(streamed, body, args.repeat)
+        assert old == new, name
+        results.append({"case": name, "body_bytes": len(body),
+                        "buffered_ms": round(old_s * 1000, 2), "streamed_ms": round(new_s * 1000, 2),
+                        "buffered_peak_bytes": old_peak, "streamed_peak_bytes": new_peak})
+        print(f"{name:<16}{len(body) / 2**20:>9.1f}{old_s*1000:>14.1f}{new_s*1000:>14.1f}"
+              f"{old_peak / 2**20:>14.1f}{new_peak / 2**20:>14.1f}{old_peak / max(1, new_peak):>6.1f}x")
+    print("="*86)
+
+    path = common.save_results('incremental', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
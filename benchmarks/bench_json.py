@@ -0,0 +1,81 @@
+"""
+JSON Benchmark: Flask's stdlib provider vs FastJSONProvider (orjson)
+Times response encoding and request decoding for typical /bfhl payloads,
+including big-int fibonacci results that take the stdlib fallback.
+
+Usage: python benchmarks/bench_json.py [--repeat 5]
+"""
+
+import argparse
+import random
+import sys
+
+import common
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import fibonacci
+import json_provider
+
+
+def make_documents(rng):
+    """(name, response object) pairs shaped like /bfhl responses"""
+    envelope = {"is_success": True, "official_email": "someone@example.com"}
+    return [
+        ('prime 1k', {**envelope, "data": [rng.randrange(1, 10 ** 9) for _ in range(1000)]}),
+        ('prime 100k', {**envelope, "data": [rng.randrange(1, 10 ** 9) for _ in range(100_000)]}),
+        ('hcf scalar', {**envelope, "data": 6}),
+        ('fibonacci 90 (int64)', {**envelope, "data": fibonacci.generate_fibonacci(90)}),
+        ('fibonacci 2k (big-int)', {**envelope, "data": fibonacci.generate_fibonacci(2000)}),
+    ]
+
+
+def make_bodies(rng):
+    """(name, request body bytes) pairs"""
+    default = DefaultJSONProvider(Flask(__name__))
+    return [
+        ('prime 1k', default.dumps({"prime": [rng.randrange(1, 10 ** 9) for _ in range(1000)]}).encode()),
+        ('prime 100k', default.dumps({"prime": [rng.randrange(1, 10 ** 9) for _ in range(100_000)]}).encode()),
+        ('lcm 10k 20-digit', default.dumps({"lcm": [rng.randrange(10 ** 19, 10 ** 20) for _ in range(10_000)]}).encode()),
+        ('AI', default.dumps({"AI": "What is the capital of France?"}).encode()),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    if json_provider.orjson is None:
+        print("orjson is not installed - FastJSONProvider falls back to the stdlib")
+
+    rng = random.Random(args.seed)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = json_provider.FastJSONProvider(app)
+
+    print("\n" + "="*72)
+    print(f"{'case':<30}{'stdlib ms':>14}{'fast ms':>14}{'speedup':>12}")
+    print("="*72)
+    with app.app_context():
+        for name, document in make_documents(rng):
+            old = common.time_call(lambda: stdlib.response(document), min_time=0.05, repeat=args.repeat)
+            new = common.time_call(lambda: fast.response(document), min_time=0.05, repeat=args.repeat)
+            assert stdlib.loads(stdlib.response(document).get_data()) == \
+                stdlib.loads(fast.response(document).get_data())
+            print(f"{'encode ' + name:<30}{old['best_s']*1000:>14.4f}{new['best_s']*1000:>14.4f}"
+                  f"{old['best_s']/new['best_s']:>11.1f}x")
+
+        for name, body in make_bodies(rng):
+            old = common.time_call(lambda: stdlib.loads(body), min_time=0.05, repeat=args.repeat)
+            new = common.time_call(lambda: fast.loads(body), min_time=0.05, repeat=args.repeat)
+            assert stdlib.loads(body) == fast.loads(body)
+            print(f"{'decode ' + name:<30}{old['best_s']*1000:>14.4f}{new['best_s']*1000:>14.4f}"
+                  f"{old['best_s']/new['best_s']:>11.1f}x")
+    print("="*72 + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Response Cache Benchmark: /bfhl with and without the shared response cache
+Times repeated identical /bfhl requests through the Flask test client with
+the cache off, on a miss (compute + store) and on a hit (served from the
+SQLite file). A second process then asks for the same payloads to show that
+entries are shared between workers.
+
+Usage: python benchmarks/bench_response_cache.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import common  # also puts the project root on sys.path
+
+import ai
+import fibonacci
+import memo
+import response_cache
+from app import app
+
+
+def make_cases(rng):
+    """(name, body) pairs"""
+    return [
+        ('fibonacci 2000', {"fibonacci": 2000}),
+        ('prime 2000 x 18-digit', {"prime": [rng.randrange(10 ** 17, 10 ** 18) for _ in range(2000)]}),
+        ('lcm 500 x 6-digit', {"lcm": [rng.randrange(1, 10 ** 6) for _ in range(500)]}),
+        ('AI (50ms upstream)', {"AI": "What is the capital of France?"}),
+    ]
+
+
+def clear_process_caches():
+    """Drop the caches below the response cache, so a miss really computes"""
+    fibonacci.get_cache().clear()
+    memo.get_memo().clear()
+    ai.answer_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    fake = ai.FakeModel(answers={"What is the capital of France?": "Paris"}, delay=0.05)
+    ai.set_model_factory(lambda: fake)
+    client = app.test_client()
+    cases = make_cases(random.Random(args.seed))
+    cache = response_cache.cache
+
+    def post(body):
+        response = client.post('/bfhl', json=body)
+        assert response.status_code == 200, response.status_code
+        return response.data
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'responses.sqlite3')
+        print("\n" + "="*72)
+        print(f"{'case':<26}{'off ms':>10}{'miss ms':>10}{'hit ms':>10}{'speedup':>10}")
+        print("="*72)
+        for name, body in cases:
+            cache.path = ''
+            off = common.time_call(lambda: post(body), setup=clear_process_caches,
+                                   min_time=0.1, repeat=args.repeat)['best_s']
+            cache.path = path
+            miss_samples = []
+            for _ in range(args.repeat):
+                cache.clear()
+                clear_process_caches()
+                start = time.perf_counter()
+                post(body)
+                miss_samples.append(time.perf_counter() - start)
+            miss = min(miss_samples)
+            hit = common.time_call(lambda: post(body), min_time=0.1, repeat=args.repeat)['best_s']
+            results.append({"case": name, "off_ms": round(off * 1000, 3),
+                            "miss_ms": round(miss * 1000, 3), "hit_ms": round(hit * 1000, 3)})
+            print(f"{name:<26}{off * 1000:>10.2f}{miss * 1000:>10.2f}{hit * 1000:>10.3f}"
+                  f"{off / hit:>9.0f}x")
+        print("="*72)
+        for _, body in cases:
+            post(body)
+
+        # Another process, as another gunicorn worker would, finds every entry
+        code = (
+            "import json, sys\n"
+            "from app import app\n"
+            "import response_cache\n"
+            "client = app.test_client()\n"
+            "for body in json.loads(sys.stdin.read()):\n"
+            "    client.post('/bfhl', json=body)\n"
+            "print(json.dumps(response_cache.cache.stats()))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=common.ROOT_DIR, capture_output=True, text=True,
+            input=json.dumps([body for _, body in cases]),
+            env=dict(os.environ, RESPONSE_CACHE_PATH=path), check=True
+        ).stdout.strip().splitlines()[-1]
+        shared = json.loads(output)
+        print(f"Second process: {shared['hits']} hits, {shared['misses']} misses, "
+              f"{shared['entries']} entries ({shared['size_bytes'] / 1024:.0f} KB)")
+        results.append({"case": "second process", **shared})
+
+    path = common.save_results('response_cache', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Startup Benchmark: cold start vs precomputed tables vs --preload
+Measures the app's import time with google.generativeai imported eagerly
+(as before) and lazily, then starts gunicorn cold, with the tables
+artifact, and with the artifact plus --preload. For each it reports the
+time until /health answers, the latency of the first prime and fibonacci
+requests, and the proportional memory (PSS) of the whole process tree.
+Each server gets an empty sieve directory so nothing carries over.
+
+Usage: python benchmarks/bench_startup.py [--workers 2] [--repeat 5]
+Needs gunicorn installed; PSS is read from /proc (Linux only).
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.request import Request, urlopen
+
+import common  # also puts the project root on sys.path
+
+import tables
+
+
+def import_seconds(statement, repeat):
+    """Median wall time of a fresh interpreter running statement"""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    samples = [
+        float(subprocess.check_output([sys.executable, '-c', code], cwd=common.ROOT_DIR,
+                                      stderr=subprocess.DEVNULL, text=True))
+        for _ in range(repeat)
+    ]
+    return statistics.median(samples)
+
+
+def post(url, body):
+    """Seconds for one /bfhl request"""
+    request = Request(f"{url}/bfhl", data=json.dumps(body).encode(),
+                      headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urlopen(request, timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def tree_pss_kb(pid):
+    """PSS of pid and all its descendants, in kB"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+        # Every thread's children, not just the main thread's: pools start from request threads
+        try:
+            tasks = os.listdir(f'/proc/{current}/task')
+        except OSError:
+            continue
+        for task in tasks:
+            try:
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5, help='interpreter runs per import timing')
+    parser.add_argument('--port', type=int, default=8097)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    results = []
+    print("\n" + "="*72)
+    print("Import time (median of fresh interpreters)")
+    print("="*72)
+    for name, statement in (('eager genai', 'import google.generativeai, app'), ('lazy genai', 'import app')):
+        seconds = import_seconds(statement, args.repeat)
+        results.append({"case": f"import {name}", "seconds": round(seconds, 4)})
+        print(f"{name:<20}{seconds * 1000:>10.0f} ms")
+
+    rng = random.Random(args.seed)
+    prime_body = {"prime": [rng.randrange(1, tables.TABLES_SIEVE_LIMIT) for _ in range(1000)]}
+    fib_body = {"fibonacci": min(tables.TABLES_FIB_TERMS, 4999)}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        artifact = os.path.join(workdir, 'tables.bin')
+        start = time.perf_counter()
+        size = tables.build(artifact)
+        print(f"\nBuilt {size / 2**20:.1f} MB artifact in {time.perf_counter() - start:.2f}s")
+
+        scenarios = [
+            ('cold', {'TABLES_PATH': os.path.join(workdir, 'missing.bin'), 'GUNICORN_PRELOAD': '0'}),
+            ('tables', {'TABLES_PATH': artifact, 'GUNICORN_PRELOAD': '0'}),
+            ('tables+preload', {'TABLES_PATH': artifact, 'GUNICORN_PRELOAD': '1'}),
+        ]
+        print("\n" + "="*72)
+        print(f"{'scenario':<18}{'ready ms':>10}{'1st prime ms':>15}{'1st fib ms':>13}{'PSS MB':>10}")
+        print("="*72)
+        for index, (name, env) in enumerate(scenarios):
+            env = dict(env, PRIME_SIEVE_PATH=os.path.join(workdir, f'sieve-{index}'))
+            command = [sys.executable, '-m', 'gunicorn', 'app:app', '-b', f'127.0.0.1:{args.port}',
+                       '-w', str(args.workers), '--worker-class', 'gthread', '--threads', '4']
+            start = time.perf_counter()
+            server, url = common.start_server(command, args.port, env=env, timeout=120)
+            ready = time.perf_counter() - start
+            try:
+                prime = post(url, prime_body)
+                fib = post(url, fib_body)
+                pss = tree_pss_kb(server.pid) / 1024
+            finally:
+                server.terminate()
+                server.wait()
+            results.append({"case": name, "ready_s": round(ready, 3), "first_prime_s": round(prime, 4),
+                            "first_fibonacci_s": round(fib, 4), "pss_mb": round(pss, 1)})
+            print(f"{name:<18}{ready * 1000:>10.0f}{prime * 1000:>15.1f}{fib * 1000:>13.1f}{pss:>10.1f}")
+        print("="*72)
+
+    path = common.save_results('startup', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
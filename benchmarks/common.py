@@ -0,0 +1,117 @@
+"""
+Shared helpers for the benchmark scripts: timing, percentiles and JSON
+result files tagged with the git commit so runs can be compared.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def latency_summary(latencies):
+    """p50/p95/p99/max in milliseconds"""
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 3),
+    }
+
+
+def time_call(fn, setup=None, min_time=0.2, repeat=5):
+    """Best and mean seconds per call, looping until each sample lasts min_time"""
+    if setup:
+        setup()
+    start = time.perf_counter()
+    fn()
+    single = time.perf_counter() - start
+    number = max(1, int(min_time / single)) if single > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(number):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            total += time.perf_counter() - start
+        samples.append(total / number)
+    return {
+        "best_s": min(samples),
+        "mean_s": sum(samples) / len(samples),
+        "loops": number,
+    }
+
+
+def start_server(command, port, env=None, timeout=30):
+    """Run a server command from the project root and wait for /health; returns (process, url)"""
+    from urllib.error import URLError
+    from urllib.request import urlopen
+
+    process = subprocess.Popen(
+        command, cwd=ROOT_DIR, env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urlopen(f"{url}/health", timeout=1) as response:
+                if response.status == 200:
+                    return process, url
+        except (URLError, OSError):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not become healthy within {timeout}s")
+
+
+def git_commit():
+    """Short commit hash of the working tree, or 'unknown'"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(kind, results, output=None):
+    """Write results with run metadata; returns the file path"""
+    commit = git_commit()
+    document = {
+        "kind": kind,
+        "commit": commit,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{kind}-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    return output
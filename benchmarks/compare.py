@@ -0,0 +1,60 @@
+"""
+Compare two benchmark result files (micro or load) and flag regressions.
+
+Usage: python benchmarks/compare.py OLD.json NEW.json [--threshold 0.10]
+Exits with status 1 when any case is slower than the threshold allows.
+"""
+
+import argparse
+import json
+import sys
+
+
+def index_results(document):
+    """Map a stable case key to the metric compared (lower is better)"""
+    indexed = {}
+    for entry in document["results"]:
+        if "case" in entry:
+            indexed[f"{entry['case']} size={entry['size']}"] = entry["best_s"] * 1000
+        else:
+            indexed[f"{entry['operation']} c={entry['concurrency']} p95"] = entry["p95_ms"]
+    return indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='allowed relative slowdown (default 10%%)')
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old["kind"] != new["kind"]:
+        print(f"❌ Cannot compare {old['kind']} with {new['kind']}")
+        return 2
+
+    old_results, new_results = index_results(old), index_results(new)
+    regressions = 0
+    print("\n" + "="*86)
+    print(f"{old['kind']}: {old['commit']} -> {new['commit']}")
+    print("="*86)
+    print(f"{'case':<46}{'old ms':>12}{'new ms':>12}{'change':>12}")
+    for key in sorted(old_results.keys() & new_results.keys()):
+        before, after = old_results[key], new_results[key]
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  ❌'
+            regressions += 1
+        print(f"{key:<46}{before:>12.4f}{after:>12.4f}{change:>+11.1%}{flag}")
+    print("="*86)
+    print(f"{regressions} regression(s) above {args.threshold:.0%}\n")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
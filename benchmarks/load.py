@@ -0,0 +1,183 @@
+"""
+Load Generator for /bfhl
+Fires concurrent requests per operation, either in-process through the Flask
+test client or over HTTP against a running server, and reports throughput
+and p50/p95/p99 latency. The AI backend is always a local stub.
+
+Usage:
+  python benchmarks/load.py --mode inprocess
+  python benchmarks/load.py --mode http --spawn            # starts gunicorn with AI_BACKEND=fake
+  python benchmarks/load.py --mode http --url http://localhost:5000
+Options: --concurrency 16 --requests 500 --operations fibonacci,prime,lcm,hcf,AI,mixed
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+import common  # also puts the project root on sys.path
+
+OPERATIONS = ('fibonacci', 'prime', 'lcm', 'hcf', 'AI')
+QUESTIONS = [f"What is the answer to question number {i}?" for i in range(20)]
+
+
+def make_payloads(operation, count, rng, fib_n):
+    """Request bodies for one operation ('mixed' rotates through all of them)"""
+    payloads = []
+    for i in range(count):
+        op = OPERATIONS[i % len(OPERATIONS)] if operation == 'mixed' else operation
+        if op == 'fibonacci':
+            body = {"fibonacci": fib_n}
+        elif op == 'prime':
+            body = {"prime": [rng.randrange(1, 10 ** 9) for _ in range(1000)]}
+        elif op == 'lcm':
+            body = {"lcm": [rng.randrange(1, 100) for _ in range(50)]}
+        elif op == 'hcf':
+            body = {"hcf": [rng.randrange(1, 10 ** 9) * 6 for _ in range(1000)]}
+        else:
+            body = {"AI": rng.choice(QUESTIONS)}
+        payloads.append(json.dumps(body))
+    return payloads
+
+
+# ==================== CLIENTS ====================
+
+def inprocess_sender(ai_latency):
+    """Send function backed by per-thread Flask test clients and a stubbed AI"""
+    import ai
+    import app as bfhl_app
+
+    fake = ai.FakeModel(delay=ai_latency)
+    ai.set_model_factory(lambda: fake)
+    local = threading.local()
+
+    def send(body):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = bfhl_app.app.test_client()
+        response = client.post('/bfhl', data=body, content_type='application/json')
+        response.get_data()
+        return response.status_code
+
+    return send
+
+
+def http_sender(url):
+    """Send function using one keep-alive session per thread"""
+    import requests
+
+    local = threading.local()
+
+    def send(body):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.post(f"{url}/bfhl", data=body,
+                                headers={"Content-Type": "application/json"})
+        response.content
+        return response.status_code
+
+    return send
+
+
+def spawn_server(port, ai_latency, workers):
+    """Start gunicorn with the fake AI backend and wait for /health"""
+    return common.start_server(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '-b', f'127.0.0.1:{port}',
+         '-w', str(workers), '--worker-class', 'gthread', '--threads', '8'],
+        port, env={'AI_BACKEND': 'fake', 'AI_FAKE_LATENCY': str(ai_latency)}
+    )
+
+
+# ==================== RUNNER ====================
+
+def run_load(send, payloads, concurrency):
+    """Send every payload with concurrency workers; returns a result dict"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(body):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = send(body) == 200
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, payloads))
+    wall = time.perf_counter() - start
+    return {
+        "requests": len(payloads),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(payloads) / wall, 1),
+        **common.latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=('inprocess', 'http'), default='inprocess')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--spawn', action='store_true', help='start a local gunicorn (http mode)')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--operations', default=','.join(OPERATIONS) + ',mixed')
+    parser.add_argument('--fib-n', type=int, default=1000)
+    parser.add_argument('--ai-latency', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    server = None
+    if args.mode == 'inprocess':
+        send = inprocess_sender(args.ai_latency)
+        target = 'inprocess'
+    else:
+        url = args.url
+        if args.spawn:
+            server, url = spawn_server(args.port, args.ai_latency, args.workers)
+        send = http_sender(url)
+        target = url
+
+    results = []
+    try:
+        print("\n" + "="*78)
+        print(f"Load: {target}, concurrency={args.concurrency}, {args.requests} requests/operation")
+        print("="*78)
+        print(f"{'operation':<12}{'rps':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'errors':>10}")
+        for operation in args.operations.split(','):
+            payloads = make_payloads(operation, args.requests, rng, args.fib_n)
+            result = run_load(send, payloads, args.concurrency)
+            results.append({"operation": operation, "mode": args.mode,
+                            "concurrency": args.concurrency, **result})
+            print(f"{operation:<12}{result['throughput_rps']:>10}{result['p50_ms']:>12}"
+                  f"{result['p95_ms']:>12}{result['p99_ms']:>12}{result['errors']:>10}")
+        print("="*78)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    path = common.save_results(f'load-{args.mode}', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
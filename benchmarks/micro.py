@@ -0,0 +1,99 @@
+"""
+Micro-benchmarks for the BFHL compute functions
+Times generate_fibonacci (cold and warm prefix cache), is_prime,
+filter_primes, calculate_hcf, calculate_lcm and compute (with and without
+the hcf/lcm memo) across input sizes and saves the numbers as JSON for
+comparison between commits.
+
+Usage: python benchmarks/micro.py [--quick] [--output FILE]
+Compare: python benchmarks/compare.py OLD.json NEW.json
+"""
+
+import argparse
+import random
+import sys
+
+import common  # also puts the project root on sys.path
+import fibonacci
+import memo
+import operations
+import primes
+
+
+def build_cases(quick, rng):
+    """(name, size, fn, setup) for every benchmark case"""
+    fib_sizes = (100, 1000, 5000) if quick else (100, 1000, 10000, 20000)
+    list_sizes = (100, 1000) if quick else (100, 1000, 10000, 100000)
+    prime_digits = (6, 12, 18, 40, 150)
+
+    cases = []
+    for n in fib_sizes:
+        cases.append(('generate_fibonacci[cold]', n,
+                      lambda n=n: fibonacci.generate_fibonacci(n), fibonacci.get_cache().clear))
+        cases.append(('generate_fibonacci[warm]', n,
+                      lambda n=n: fibonacci.generate_fibonacci(n), None))
+
+    for digits in prime_digits:
+        values = [rng.randrange(10 ** (digits - 1), 10 ** digits) | 1 for _ in range(100)]
+        cases.append(('is_prime[x100]', digits,
+                      lambda values=values: [primes.is_prime(v) for v in values], None))
+
+    for size in list_sizes:
+        small = [rng.randrange(1, 10 ** 6) for _ in range(size)]
+        large = [rng.randrange(10 ** 17, 10 ** 18) for _ in range(size)]
+        hcf_values = [rng.randrange(1, 10 ** 12) * 6 for _ in range(size)]
+        lcm_values = [rng.randrange(1, 200) for _ in range(size)]
+        cases.append(('filter_primes[small]', size,
+                      lambda v=small: operations.filter_primes(v), None))
+        cases.append(('filter_primes[18-digit]', size,
+                      lambda v=large: operations.filter_primes(v), None))
+        cases.append(('calculate_hcf', size,
+                      lambda v=hcf_values: operations.calculate_hcf(v), None))
+        cases.append(('calculate_lcm', size,
+                      lambda v=lcm_values: operations.calculate_lcm(v), None))
+        if size <= 10000:
+            # Big-int LCM: intermediates grow to tens of thousands of bits
+            wide = [rng.randrange(1, 10 ** 6) for _ in range(size)]
+            cases.append(('calculate_lcm[6-digit]', size,
+                          lambda v=wide: operations.calculate_lcm(v), None))
+        # compute[...] clears the hcf/lcm memo first; [memo] measures the hit path
+        cases.append(('compute[hcf]', size,
+                      lambda v=hcf_values: operations.compute('hcf', v), memo.get_memo().clear))
+        cases.append(('compute[lcm]', size,
+                      lambda v=lcm_values: operations.compute('lcm', v), memo.get_memo().clear))
+        cases.append(('compute[lcm][memo]', size,
+                      lambda v=lcm_values: operations.compute('lcm', v), None))
+        cases.append(('compute[prime]', size,
+                      lambda v=large: operations.compute('prime', v), None))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and fewer repeats')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Build the shared sieve first so no case pays for it
+    primes.filter_primes([primes.SIEVE_MAX_LIMIT - 1])
+
+    results = []
+    print("\n" + "="*70)
+    print(f"{'case':<28}{'size':>10}{'best ms':>14}{'mean ms':>14}")
+    print("="*70)
+    for name, size, fn, setup in build_cases(args.quick, rng):
+        timing = common.time_call(fn, setup=setup, min_time=0.05 if args.quick else 0.2,
+                                  repeat=3 if args.quick else 5)
+        results.append({"case": name, "size": size, **timing})
+        print(f"{name:<28}{size:>10}{timing['best_s']*1000:>14.4f}{timing['mean_s']*1000:>14.4f}")
+    print("="*70)
+
+    path = common.save_results('micro', results, args.output)
+    print(f"Saved: {path}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Binary Formats
+Compact alternatives to JSON for /bfhl, chosen by Content-Type and Accept:
+MessagePack, with the same document shape as JSON, and a packed array of
+little-endian int64 values behind a 16-byte header. Packed values (and
+MessagePack bin values) are read in place as a NumPy array, or an
+array('q') without NumPy, so no per-element Python objects are built.
+"""
+
+from array import array
+import struct
+import sys
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON and packed int64 still work
+    msgpack = None
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; packed values become array('q')
+    np = None
+
+from operations import InvalidInput
+from responses import success
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+PACKED = 'application/x-bfhl-int64'
+_MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack')
+
+# Packed layout: magic, version, operation, flags, count, then the payload
+HEADER = struct.Struct('<4sBBHQ')
+MAGIC = b'BFHL'
+VERSION = 1
+OPERATION_CODES = {'prime': 1, 'lcm': 2, 'hcf': 3}
+OPERATIONS = {code: operation for operation, code in OPERATION_CODES.items()}
+# Response flag: the payload is one signed little-endian integer of count bytes
+# (LCMs outgrow int64); without it the payload is count int64 values
+FLAG_BIG_INT = 1
+
+# MessagePack extension type for integers outside the 64-bit range
+BIG_INT_EXT = 1
+
+
+def _media_type(value):
+    return value.split(';', 1)[0].strip().lower()
+
+
+# ==================== NEGOTIATION ====================
+
+def request_format(content_type):
+    """Format of a request body, or None if the Content-Type is not supported"""
+    content_type = content_type or ''
+    if JSON in content_type:
+        return JSON
+    media_type = _media_type(content_type)
+    if media_type in _MSGPACK_TYPES and msgpack is not None:
+        return MSGPACK
+    if media_type == PACKED:
+        return PACKED
+    return None
+
+
+def fits_int64(values):
+    """Whether every value of a list (or int64 array) is an int64"""
+    if len(values) == 0 or hasattr(values, 'dtype') or isinstance(values, array):
+        return True
+    return max(values) < 2 ** 63 and min(values) >= -2 ** 63
+
+
+def response_format(accept, default, operation, packable=True):
+    """First supported format in Accept (packed only for prime/lcm/hcf), else default
+
+    packable=False rules out packed: a prime list with values beyond int64
+    has no packed form, unlike an LCM, which is sent as one big integer.
+    """
+    packable = packable and operation in OPERATION_CODES
+    for media_type in map(_media_type, (accept or '').split(',')):
+        if media_type == JSON:
+            return JSON
+        if media_type in _MSGPACK_TYPES and msgpack is not None:
+            return MSGPACK
+        if media_type == PACKED and packable:
+            return PACKED
+    if default == PACKED and not packable:
+        return JSON
+    return default
+
+
+# ==================== DECODING ====================
+
+def int_array(data):
+    """Little-endian int64 bytes as an array that shares their memory where it can"""
+    if len(data) % 8:
+        raise InvalidInput("Packed values must be 8-byte integers")
+    if np is not None:
+        # A view of data; only big-endian hosts pay for a byte-swapped copy
+        return np.frombuffer(data, dtype='<i8').astype(np.int64, copy=False)
+    values = array('q')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _ext_hook(code, data):
+    if code == BIG_INT_EXT:
+        return int.from_bytes(data, 'little', signed=True)
+    return msgpack.ExtType(code, data)
+
+
+def decode_request(fmt, body):
+    """Request document for a MessagePack or packed body; raises InvalidInput"""
+    if fmt == PACKED:
+        if len(body) < HEADER.size:
+            raise InvalidInput("Packed body is shorter than its header")
+        magic, version, code, flags, count = HEADER.unpack_from(body)
+        if magic != MAGIC or version != VERSION or flags:
+            raise InvalidInput("Unsupported packed header")
+        if code not in OPERATIONS:
+            raise InvalidInput(f"Unknown packed operation {code}")
+        if len(body) - HEADER.size != count * 8:
+            raise InvalidInput(f"Packed body does not hold {count} values")
+        return {OPERATIONS[code]: int_array(memoryview(body)[HEADER.size:])}
+
+    try:
+        data = msgpack.unpackb(body, ext_hook=_ext_hook)
+    except Exception as e:
+        raise InvalidInput(f"MessagePack parse error: {e}")
+    if isinstance(data, dict):
+        # bin values hold packed int64 arrays, like the packed format's payload
+        for operation in OPERATION_CODES:
+            if isinstance(data.get(operation), bytes):
+                data[operation] = int_array(data[operation])
+    return data
+
+
+# ==================== ENCODING ====================
+
+def _pack_default(obj):
+    if isinstance(obj, int):
+        return msgpack.ExtType(BIG_INT_EXT, _int_bytes(obj))
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _int_bytes(value):
+    return value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+
+
+def encode_response(fmt, operation, result):
+    """Success body for a MessagePack or packed response"""
+    if fmt == MSGPACK:
+        return msgpack.packb(success(result), default=_pack_default)
+
+    code = OPERATION_CODES[operation]
+    if isinstance(result, int):
+        if -2 ** 63 <= result < 2 ** 63:
+            return HEADER.pack(MAGIC, VERSION, code, 0, 1) + struct.pack('<q', result)
+        payload = _int_bytes(result)
+        return HEADER.pack(MAGIC, VERSION, code, FLAG_BIG_INT, len(payload)) + payload
+    values = array('q', result)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return HEADER.pack(MAGIC, VERSION, code, 0, len(values)) + values.tobytes()
+
+
+def pack_request(operation, numbers):
+    """Packed request body for numbers (all within int64), for clients and tests"""
+    values = array('q', numbers)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return HEADER.pack(MAGIC, VERSION, OPERATION_CODES[operation], 0, len(values)) + values.tobytes()
+
+
+def unpack_response(body):
+    """(operation, result) of a packed response body"""
+    _, _, code, flags, count = HEADER.unpack_from(body)
+    payload = memoryview(body)[HEADER.size:]
+    if flags & FLAG_BIG_INT:
+        return OPERATIONS[code], int.from_bytes(payload, 'little', signed=True)
+    values = int_array(payload)
+    result = values.tolist()
+    if OPERATIONS[code] != 'prime':
+        result = result[0]
+    return OPERATIONS[code], result
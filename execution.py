@@ -0,0 +1,162 @@
+"""
+CPU Execution Layer
+Decides where a validated CPU operation runs: cheap inputs stay on the
+request thread, heavier ones go to a warm spawn-context process pool, and
+long prime lists are split into chunks that run on several processes at
+once. A few threaded front-end workers can then use every core.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain
+import multiprocessing
+import os
+import threading
+import admission
+import reduction
+import tables
+from operations import compute
+
+# Configuration
+CPU_POOL_PROCESSES = int(os.environ.get('CPU_POOL_PROCESSES',
+                                        os.environ.get('BATCH_PROCESSES', os.cpu_count() or 1)))
+# prime/lcm/hcf inputs cheaper than this (admission cost units) run inline
+INLINE_MAX_COST = int(os.environ.get('INLINE_MAX_COST', 50_000))
+# fibonacci below this n runs inline, where the prefix cache is warm
+INLINE_MAX_FIB_N = int(os.environ.get('INLINE_MAX_FIB_N', admission.FIB_EXPENSIVE_N))
+# Long prime lists are split into chunks of this many values
+PRIME_CHUNK_SIZE = int(os.environ.get('PRIME_CHUNK_SIZE', 5000))
+
+
+def _gather(futures, combine):
+    """Future of combine(results) once every future has finished"""
+    gathered = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            gathered.set_result(combine([future.result() for future in futures]))
+        except BaseException as e:
+            gathered.set_exception(e)
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    return gathered
+
+
+class CPUExecutor:
+    """Runs CPU operations inline or on a process pool, chunking where it can"""
+
+    def __init__(self, workers=CPU_POOL_PROCESSES, pool_factory=None, pool_reset=None,
+                 inline_max_cost=INLINE_MAX_COST, inline_max_fib_n=INLINE_MAX_FIB_N):
+        self.workers = workers
+        self.inline_max_cost = inline_max_cost
+        self.inline_max_fib_n = inline_max_fib_n
+        self._pool_factory = pool_factory
+        self._pool_reset = pool_reset
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get_pool(self):
+        """The process pool, created lazily so each gunicorn worker gets its own"""
+        if self._pool_factory is not None:
+            return self._pool_factory()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=tables.load
+                )
+            return self._pool
+
+    def reset_pool(self, broken):
+        """Forget a pool that lost a process (OOM kill, crash); the next get_pool() starts anew"""
+        if self._pool_reset is not None:
+            return self._pool_reset(broken)
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def warm(self):
+        """Start the pool processes now rather than on the first heavy request"""
+        pool = self.get_pool()
+        for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def runs_inline(self, operation, cost):
+        if operation == 'fibonacci':
+            return cost < self.inline_max_fib_n
+        return cost < self.inline_max_cost
+
+    def submit(self, operation, input_value, cost=None):
+        """Future for compute(operation, input_value); already done if run inline
+
+        A pool found broken here is replaced once; futures of a pool that
+        breaks later fail with BrokenProcessPool.
+        """
+        if cost is None:
+            cost = admission.estimate_cost(operation, input_value)
+        if self.runs_inline(operation, cost):
+            future = Future()
+            try:
+                future.set_result(compute(operation, input_value))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        pool = self.get_pool()
+        try:
+            return self._submit_to(pool, operation, input_value)
+        except BrokenProcessPool:
+            self.reset_pool(pool)
+            return self._submit_to(self.get_pool(), operation, input_value)
+
+    def _submit_to(self, pool, operation, input_value):
+        if operation == 'prime' and len(input_value) >= 2 * PRIME_CHUNK_SIZE:
+            # Order is kept: chunks are concatenated in input order
+            futures = [
+                pool.submit(compute, 'prime', input_value[i:i + PRIME_CHUNK_SIZE])
+                for i in range(0, len(input_value), PRIME_CHUNK_SIZE)
+            ]
+            return _gather(futures, lambda parts: list(chain.from_iterable(parts)))
+        return pool.submit(compute, operation, input_value)
+
+    def run(self, operation, input_value, cost=None):
+        """compute(operation, input_value) wherever this executor would put it
+
+        If a pool process dies meanwhile (OOM kill, crash), the pool is
+        replaced and the work retried once.
+        """
+        if cost is None:
+            cost = admission.estimate_cost(operation, input_value)
+        if self.runs_inline(operation, cost):
+            return compute(operation, input_value)
+        for attempt in range(2):
+            pool = self.get_pool()
+            try:
+                if operation in ('lcm', 'hcf') and len(input_value) >= reduction.REDUCE_PARALLEL_MIN_LENGTH:
+                    # Reduced on this thread, sharing the memo, with chunks fanned out to the pool
+                    return compute(operation, input_value, executor=pool)
+                return self._submit_to(pool, operation, input_value).result()
+            except BrokenProcessPool:
+                self.reset_pool(pool)
+                if attempt:
+                    raise
+
+
+# General pool for work too heavy to run inline
+cpu_executor = CPUExecutor()
+# Expensive-lane work always leaves the request thread, on the lane's own processes
+expensive_executor = CPUExecutor(
+    workers=admission.EXPENSIVE_WORKERS,
+    pool_factory=admission.expensive_lane.get_pool,
+    pool_reset=admission.expensive_lane.reset_pool,
+    inline_max_cost=0,
+    inline_max_fib_n=0,
+)
@@ -0,0 +1,155 @@
+"""
+Fibonacci Engine
+Process-wide, size-bounded cache of the Fibonacci prefix that later requests
+extend instead of recomputing, plus fast doubling for single terms and
+windows of terms that start from the two seed terms at their offset.
+"""
+
+from itertools import islice
+import os
+import threading
+
+# Configuration
+# Approximate memory budget for cached big-int terms
+FIB_CACHE_MAX_BYTES = int(os.environ.get('FIB_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+class FibonacciCache:
+    """Shared prefix F(0), F(1), ... that only ever grows, up to max_bytes"""
+
+    def __init__(self, max_bytes=FIB_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._terms = [0, 1]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def extend(self, n):
+        """Grow the prefix towards n terms while the budget allows; return it"""
+        terms = self._terms
+        if len(terms) >= n or self.size_bytes >= self.max_bytes:
+            return terms
+        with self._lock:
+            size_bytes = self.size_bytes
+            a, b = terms[-2], terms[-1]
+            while len(terms) < n and size_bytes < self.max_bytes:
+                a, b = b, a + b
+                # Appending is atomic, so readers can slice the list meanwhile
+                terms.append(b)
+                size_bytes += b.bit_length() // 8 + 28
+            self.size_bytes = size_bytes
+        return terms
+
+    def seed(self, terms):
+        """Adopt a precomputed prefix F(0), F(1), ... if it is longer than the cached one"""
+        with self._lock:
+            if len(terms) > len(self._terms):
+                self._terms = list(terms)
+                self.size_bytes = sum(term.bit_length() // 8 + 28 for term in terms)
+
+    def clear(self):
+        with self._lock:
+            self._terms = [0, 1]
+            self.size_bytes = 0
+
+
+_cache = FibonacciCache()
+
+
+def get_cache():
+    """The process-wide prefix cache"""
+    return _cache
+
+
+# ==================== SEQUENCES ====================
+
+def iter_fibonacci(n):
+    """Yield the first N fibonacci numbers, reusing the shared prefix"""
+    if n <= 0:
+        return
+    terms = _cache.extend(n)
+    cached = min(n, len(terms))
+    yield from islice(terms, cached)
+
+    # Past the cache budget: continue from the last two cached terms
+    a, b = terms[cached - 2], terms[cached - 1]
+    for _ in range(n - cached):
+        a, b = b, a + b
+        yield b
+
+
+def iter_fibonacci_range(offset, limit):
+    """Yield F(offset) .. F(offset + limit - 1) without the terms before them"""
+    if offset == 0:
+        yield from iter_fibonacci(limit)
+        return
+    if limit <= 0:
+        return
+    terms = _cache._terms
+    if offset + limit <= len(terms):
+        yield from terms[offset:offset + limit]
+        return
+
+    a, b = fibonacci_pair(offset)
+    yield a
+    for _ in range(limit - 1):
+        a, b = b, a + b
+        yield a
+
+
+def generate_fibonacci(n):
+    """Generate first N fibonacci numbers"""
+    if n <= 0:
+        return []
+    terms = _cache.extend(n)
+    if len(terms) >= n:
+        return terms[:n]
+    return list(iter_fibonacci(n))
+
+
+# ==================== SINGLE TERMS ====================
+
+def fibonacci_pair(k):
+    """(F(k), F(k+1)) by fast doubling, O(log k) multiplications"""
+    terms = _cache._terms
+    if k + 1 < len(terms):
+        return terms[k], terms[k + 1]
+
+    a, b = 0, 1
+    for bit in bin(k)[2:]:
+        # F(2m) = F(m) * (2F(m+1) - F(m)),  F(2m+1) = F(m)^2 + F(m+1)^2
+        c = a * (2 * b - a)
+        d = a * a + b * b
+        if bit == '1':
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    return a, b
+
+
+def fibonacci_term(k):
+    """F(k), the k-th fibonacci number counting F(0) = 0"""
+    return fibonacci_pair(k)[0]
+
+
+# ==================== QUERIES ====================
+
+def parse_query(value):
+    """(offset, limit, single) of a validated input: n, {"index": k} or {"offset": k, "limit": n}"""
+    if isinstance(value, dict):
+        if 'index' in value:
+            return value['index'], 1, True
+        return value.get('offset', 0), value['limit'], False
+    return 0, value, False
+
+
+def answer_query(value):
+    """The first n terms, the single term F(k), or the requested window of terms"""
+    offset, limit, single = parse_query(value)
+    if single:
+        return fibonacci_term(offset)
+    if offset == 0:
+        return generate_fibonacci(limit)
+    return list(iter_fibonacci_range(offset, limit))
@@ -0,0 +1,225 @@
+"""
+Gunicorn Configuration
+Loaded automatically by `gunicorn app:app` from the project directory.
+Sizes workers and threads from the usable CPUs and GUNICORN_WORKLOAD,
+preloads the app so workers share its tables, recycles workers after
+GUNICORN_MAX_REQUESTS requests or past a memory ceiling, and sets up the
+shared directory that lets /metrics aggregate every worker.
+"""
+
+import gc
+import math
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+# Per-user directory for files this service keeps in /tmp (the prime sieve lives here too)
+PRIVATE_TMP = os.path.join(tempfile.gettempdir(), f'bfhl-{os.geteuid()}')
+
+
+def private_dir(directory):
+    """Create directory (0700) and insist it is a real directory only this user can write to"""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.geteuid() or info.st_mode & 0o022:
+        raise PermissionError(f"{directory} is writable by other users")
+    return directory
+
+
+# Per-worker Prometheus metric files live here; must be set before workers import the app.
+# By default each master gets its own directory under PRIVATE_TMP, so two instances
+# (or two users) never clear each other's metrics
+prometheus_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if not prometheus_dir:
+    prometheus_dir = tempfile.mkdtemp(prefix='prometheus-', dir=private_dir(PRIVATE_TMP))
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = prometheus_dir
+
+# Threads per worker for each workload mix. Heavy math runs on each worker's
+# process pool, so one worker per CPU is enough to parse and serialize (a
+# second worker on one CPU lost about 20% in bench_gunicorn.py); AI calls
+# wait on the network, so an AI-heavy mix wants more threads instead
+WORKLOAD_THREADS = {
+    'cpu': 2,
+    'mixed': 8,
+    'io': 32,
+}
+GUNICORN_WORKLOAD = os.environ.get('GUNICORN_WORKLOAD', 'mixed')
+
+
+def usable_cpus():
+    """CPUs this process may run on: the affinity mask, capped by a cgroup v2 quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def auto_size(cpus, workload=GUNICORN_WORKLOAD, worker_class='gthread'):
+    """(workers, threads) for a machine and workload mix"""
+    if workload not in WORKLOAD_THREADS:
+        raise ValueError(f"Unknown GUNICORN_WORKLOAD {workload!r}")
+    if worker_class == 'sync':
+        # One request per process: the classic 2 x cores + 1
+        return 2 * cpus + 1, 1
+    return cpus, WORKLOAD_THREADS[workload]
+
+
+cpus = usable_cpus()
+# Threads stream large responses without holding up a worker's other
+# connections, and unlike sync workers gthread honours keep-alive
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers, threads = auto_size(cpus, worker_class=worker_class)
+# Explicit settings win over the sizing
+workers = int(os.environ.get('GUNICORN_WORKERS', os.environ.get('WEB_CONCURRENCY', workers)))
+threads = int(os.environ.get('GUNICORN_THREADS', threads))
+# Each worker's CPU pool and expensive lane get its share of the cores rather
+# than all of them (explicit settings still apply per worker)
+os.environ.setdefault('CPU_POOL_PROCESSES', str(max(1, cpus // workers)))
+os.environ.setdefault('EXPENSIVE_WORKERS', str(max(1, cpus // workers)))
+
+# Seconds an idle client connection stays open for its next request
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# A worker silent this long is restarted. gthread workers check in between
+# requests, but a sync worker is silent for a whole request, AI calls included
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# Seconds in-flight requests get to finish on reload, recycling or shutdown
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# The app, and the precomputed tables, are imported once in the master and
+# forked workers share them copy-on-write. Pools, SQLite connections and
+# upstream clients are created lazily in each worker, never in the master.
+# GUNICORN_PRELOAD=0 imports the app in every worker instead
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Fibonacci prefixes, memos and big-int arenas only grow: restart each worker
+# after this many requests (jittered so they do not all restart at once)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+# A worker this many requests from its restart closes each connection after
+# answering, so clients have moved on before it exits and drops idle ones
+GUNICORN_DRAIN_REQUESTS = int(os.environ.get('GUNICORN_DRAIN_REQUESTS', 50))
+# ...or once the worker and its pool processes hold this much memory (0 = off)
+GUNICORN_WORKER_MAX_MEMORY_MB = int(os.environ.get('GUNICORN_WORKER_MAX_MEMORY_MB', 512))
+# Seconds between memory checks, per worker
+GUNICORN_MEMORY_CHECK_INTERVAL = float(os.environ.get('GUNICORN_MEMORY_CHECK_INTERVAL', 1.0))
+
+# `kill -HUP $(cat $GUNICORN_PIDFILE)` restarts workers with the new settings
+pidfile = os.environ.get('GUNICORN_PIDFILE') or None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_next_memory_check = 0.0
+
+
+def child_pids(pid):
+    """Children of every thread of pid: gthread workers start their pools from request threads"""
+    children = []
+    try:
+        tasks = os.listdir(f'/proc/{pid}/task')
+    except OSError:
+        return children
+    for task in tasks:
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return children
+
+
+def tree_rss_bytes(pid):
+    """Resident memory of pid and all its descendants"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, ValueError):
+            continue
+        pending.extend(child_pids(current))
+    return total
+
+
+def on_starting(server):
+    """Start each master with an empty metrics directory"""
+    private_dir(prometheus_dir)
+    if 'GUNICORN_PID' in os.environ:
+        # New master of a USR2 upgrade: the old master's workers still write here
+        return
+    # Only the metric files: an explicit PROMETHEUS_MULTIPROC_DIR may hold other things
+    for name in os.listdir(prometheus_dir):
+        if name.endswith('.db'):
+            os.unlink(os.path.join(prometheus_dir, name))
+
+
+def pre_exec(server):
+    """Hand the metrics directory to the new master of a USR2 upgrade"""
+    server.cfg.env_orig['PROMETHEUS_MULTIPROC_DIR'] = prometheus_dir
+
+
+def on_exit(server):
+    """Remove the default metrics directory once no other master uses it"""
+    if server.reexec_pid or server.master_pid:
+        return
+    if os.path.dirname(prometheus_dir) == PRIVATE_TMP and os.path.basename(prometheus_dir).startswith('prometheus-'):
+        shutil.rmtree(prometheus_dir, ignore_errors=True)
+
+
+def when_ready(server):
+    server.log.info("Serving with %d %s workers x %d threads (%d CPUs, %s workload, preload %s)",
+                    server.cfg.workers, server.cfg.worker_class_str, server.cfg.threads,
+                    cpus, GUNICORN_WORKLOAD, 'on' if server.cfg.preload_app else 'off')
+
+
+def pre_fork(server, worker):
+    """Move preloaded objects out of the collector's reach so it never writes to their pages"""
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    """Spawn the CPU pool processes now so the first heavy request does not pay for it"""
+    import execution
+    execution.cpu_executor.warm()
+
+
+def pre_request(worker, req):
+    """Answer with Connection: close while a worker drains before its restart"""
+    if worker.nr >= worker.max_requests - GUNICORN_DRAIN_REQUESTS:
+        # gunicorn closes after the response when the request asked it to
+        req.headers = [(name, value) for name, value in req.headers if name != 'CONNECTION']
+        req.headers.append(('CONNECTION', 'close'))
+
+
+def post_request(worker, req, environ, resp):
+    """Schedule the restart of a worker whose memory has grown past the ceiling"""
+    global _next_memory_check
+    if not GUNICORN_WORKER_MAX_MEMORY_MB or worker.max_requests <= worker.nr + GUNICORN_DRAIN_REQUESTS:
+        return
+    now = time.monotonic()
+    if now < _next_memory_check:
+        return
+    _next_memory_check = now + GUNICORN_MEMORY_CHECK_INTERVAL
+    rss = tree_rss_bytes(os.getpid())
+    if rss > GUNICORN_WORKER_MAX_MEMORY_MB * 1024 * 1024:
+        worker.log.info("Worker %s uses %.0fMB, over %dMB: restarting it",
+                        worker.pid, rss / 1024 / 1024, GUNICORN_WORKER_MAX_MEMORY_MB)
+        # Drains like a max_requests restart
+        worker.max_requests = worker.nr + GUNICORN_DRAIN_REQUESTS
+
+
+def child_exit(server, worker):
+    """Fold a dead worker's live gauges out of the aggregate"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,230 @@
+"""
+HTTP Encoding
+Content-coding negotiation (zstd, br, gzip) for /bfhl bodies and strong
+ETags for deterministic results. Buffered bodies are compressed above
+COMPRESSION_MIN_BYTES and streamed ones chunk by chunk as they are written.
+Math results are named by a hash of their request, so a client repeating a
+request with If-None-Match gets 304 and no body. brotli and zstandard are
+optional; without them only gzip is offered.
+"""
+
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configuration
+# Codings in server preference order, used when the client accepts them
+COMPRESSION_ENCODINGS = tuple(
+    coding for coding in os.environ.get('COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',') if coding
+)
+# Smaller buffered bodies are sent as they are (streams are always compressed)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+# Fast settings: digit strings compress well even at low levels
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 5))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+COMPRESSION_ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 3))
+# Strong ETags and If-None-Match for fibonacci/prime/lcm/hcf
+HTTP_ETAGS = os.environ.get('HTTP_ETAGS', '1') == '1'
+
+# Endpoints whose responses are negotiated
+ENCODED_ENDPOINTS = ('/bfhl', '/bfhl/batch')
+# Operations whose response depends only on the request
+ETAG_OPERATIONS = ('fibonacci', 'prime', 'lcm', 'hcf')
+
+
+def available_encodings():
+    """Configured codings whose library is installed"""
+    installed = {'gzip': True, 'br': brotli is not None, 'zstd': zstandard is not None}
+    return tuple(coding for coding in COMPRESSION_ENCODINGS if installed.get(coding))
+
+
+_AVAILABLE = available_encodings()
+
+
+def negotiate(accept_encoding, available=_AVAILABLE):
+    """Coding to use for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding or not available:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+    best = None
+    for coding in available:
+        quality = weights.get(coding, weights.get('*', 0.0))
+        # Equal weights keep the server's preference order
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best and best[0]
+
+
+# ==================== COMPRESSION ====================
+
+class _Zlib:
+    """gzip stream with the compress()/flush() interface of the others"""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def compressor(coding):
+    """Streaming compressor: compress(bytes) -> bytes, then flush() -> bytes"""
+    if coding == 'gzip':
+        return _Zlib()
+    if coding == 'br':
+        return _Brotli()
+    if coding == 'zstd':
+        return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+    raise ValueError(f"Unknown coding {coding!r}")
+
+
+def compress(coding, data):
+    """Whole body in one call"""
+    stream = compressor(coding)
+    return stream.compress(data) + stream.flush()
+
+
+def compress_chunks(coding, chunks):
+    """Compress an iterable of str/bytes chunks as it is consumed"""
+    stream = compressor(coding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.flush()
+
+
+# ==================== ETAGS ====================
+
+def etag(operation, key):
+    """Strong ETag for a deterministic result named by its request key, else None"""
+    if not HTTP_ETAGS or key is None or operation not in ETAG_OPERATIONS:
+        return None
+    return f'"{key.hex()}"'
+
+
+def coded_etag(tag, coding):
+    """Distinct strong tag for each content coding of the same representation"""
+    return f'{tag[:-1]}-{coding}"' if coding else tag
+
+
+def _opaque(tag):
+    """The tag without W/, quotes or a coding suffix, for weak comparison"""
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    base, _, coding = tag.rpartition('-')
+    return base if base and coding in ('gzip', 'br', 'zstd') else tag
+
+
+def not_modified(if_none_match, tag):
+    """ETag to answer 304 with when If-None-Match names tag (in any coding) or is *, else None"""
+    if not if_none_match or tag is None:
+        return None
+    if if_none_match.strip() == '*':
+        return tag
+    wanted = _opaque(tag)
+    for candidate in if_none_match.split(','):
+        if _opaque(candidate) == wanted:
+            # The client's own tag names the coding it holds
+            candidate = candidate.strip()
+            return candidate[2:] if candidate.startswith('W/') else candidate
+    return None
+
+
+# ==================== FRONT ENDS ====================
+
+def init_app(app):
+    """Add ETags and response compression for ENCODED_ENDPOINTS to a Flask app"""
+    from flask import g, request
+
+    @app.after_request
+    def _encode_response(response):
+        if request.path not in ENCODED_ENDPOINTS:
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.status_code != 200:
+            return response
+        tag = g.get('etag')
+        coding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if coding is not None and 'Content-Encoding' not in response.headers:
+            if response.is_streamed:
+                response.response = compress_chunks(coding, response.response)
+                response.headers.pop('Content-Length', None)
+            elif response.content_length is not None and response.content_length >= COMPRESSION_MIN_BYTES:
+                response.set_data(compress(coding, response.get_data()))
+            else:
+                coding = None
+            if coding is not None:
+                response.headers['Content-Encoding'] = coding
+        else:
+            coding = None
+        if tag is not None:
+            response.headers['ETag'] = coded_etag(tag, coding)
+        return response
+
+
+def asgi_send(send, accept_encoding):
+    """Wrap an ASGI send so a 200 response is compressed as negotiated, its ETag per coding"""
+    coding = negotiate(accept_encoding)
+    stream = None
+
+    async def encoding_send(message):
+        nonlocal stream
+        if message['type'] == 'http.response.start':
+            headers = list(message.get('headers', []))
+            headers.append((b'vary', b'Accept-Encoding'))
+            length = dict(headers).get(b'content-length')
+            if (message['status'] == 200 and coding is not None
+                    and (length is None or int(length) >= COMPRESSION_MIN_BYTES)):
+                stream = compressor(coding)
+                headers = [
+                    (name, coded_etag(value.decode(), coding).encode() if name == b'etag' else value)
+                    for name, value in headers if name != b'content-length'
+                ]
+                headers.append((b'content-encoding', coding.encode()))
+            message = dict(message, headers=headers)
+        elif message['type'] == 'http.response.body' and stream is not None:
+            data = stream.compress(message.get('body', b''))
+            if not message.get('more_body', False):
+                data += stream.flush()
+            message = dict(message, body=data)
+        await send(message)
+
+    return encoding_send
@@ -0,0 +1,276 @@
+"""
+Incremental Array Parser
+Push parser for large {"prime" | "lcm" | "hcf": [...]} bodies. Elements are
+parsed, validated and folded into the result batch by batch as the body
+arrives: prime survivors are collected, and the running HCF/LCM is folded
+in, so memory stays flat no matter how long the array is. Each batch runs on
+the executor (the expensive lane) while the next one is parsed, one at a
+time per request. Bodies of any other shape are buffered and handed back for
+the normal JSON path.
+"""
+
+from concurrent.futures import Future
+import math
+import os
+import re
+import admission
+import reduction
+from json_provider import decode
+from operations import VALID_KEYS, InvalidInput, compute, validate_input
+
+# Configuration
+# Bodies at least this large are parsed incrementally
+INCREMENTAL_MIN_BYTES = int(os.environ.get('INCREMENTAL_MIN_BYTES', 1024 * 1024))
+# Elements folded into the result at a time
+INCREMENTAL_BATCH_SIZE = int(os.environ.get('INCREMENTAL_BATCH_SIZE', 8192))
+# Request body read size for file-like streams
+READ_SIZE = 64 * 1024
+
+# '{"op": [' with the array first; anything else takes the normal path
+_HEAD = re.compile(rb'\s*\{\s*"(prime|lcm|hcf)"\s*:\s*\[')
+_HEAD_MAX_BYTES = 64
+# Integer arrays never contain these, so their presence means a non-int element
+_NON_INT = re.compile(rb'["\[{]')
+
+
+class NotStreamable(Exception):
+    """The body is not a single leading int array; body holds every byte read"""
+
+    def __init__(self, body):
+        super().__init__("Body is not an incrementally parsable array")
+        self.body = body
+
+
+def _fold(operation, running, batch):
+    """Pool task: the running HCF/LCM with one more batch folded in"""
+    if operation == 'hcf':
+        return math.gcd(running, *batch)
+    if 0 in batch:
+        return 0
+    # Duplicates do not change an LCM, and long arrays of small values repeat a lot
+    return math.lcm(running, reduction.lcm(list(set(batch))))
+
+
+class IncrementalParser:
+    """feed() body chunks, then close() for (operation, result, length, cost)"""
+
+    def __init__(self, executor=None, batch_size=INCREMENTAL_BATCH_SIZE, keys=None):
+        # Anything with submit(fn, *args), e.g. admission.expensive_lane, whose
+        # AdmissionRejected propagates from feed(); without one, batches run inline
+        self.executor = executor
+        # With a response_cache.InputKeys, the array is hashed as it is parsed
+        self.keys = keys
+        self.batch_size = batch_size
+        self.operation = None
+        self.length = 0
+        self.max_bits = 0
+        self._state = 'head'
+        self._pending = b''
+        self._chunks = []
+        self._batch = []
+        self._first = None
+        self._expect_element = False
+        self._limit_error = None
+        self._survivors = []
+        self._running = None
+        self._in_flight = None
+
+    # ==================== INPUT ====================
+
+    def feed(self, data):
+        if self._state == 'buffer':
+            self._chunks.append(data)
+        elif self._state == 'head':
+            self._pending += data
+            match = _HEAD.match(self._pending)
+            if match:
+                self.operation = match.group(1).decode()
+                self._running = 0 if self.operation == 'hcf' else 1
+                self._state = 'array'
+                self._pending = self._pending[match.end():]
+                self._scan()
+            elif len(self._pending) >= _HEAD_MAX_BYTES:
+                self._state = 'buffer'
+                self._chunks.append(self._pending)
+                self._pending = b''
+        elif self._state == 'array':
+            self._pending += data
+            self._scan()
+        else:
+            self._pending += data
+
+    def _scan(self):
+        """Parse every complete element in the pending bytes"""
+        end = self._pending.find(b']')
+        if end >= 0:
+            region, self._pending = self._pending[:end], self._pending[end + 1:]
+            if region.strip():
+                self._parse_region(region)
+            elif self._expect_element:
+                raise InvalidInput("JSON parse error: trailing comma")
+            self._state = 'tail'
+            return
+        cut = self._pending.rfind(b',')
+        if cut < 0:
+            return
+        region, self._pending = self._pending[:cut], self._pending[cut + 1:]
+        if not region.strip():
+            raise InvalidInput("JSON parse error: missing array element")
+        self._parse_region(region)
+        self._expect_element = True
+
+    def _parse_region(self, region):
+        if _NON_INT.search(region):
+            raise InvalidInput(f"{self.operation} expects an array of integers")
+        try:
+            values = decode(b'[' + region + b']')
+        except ValueError as e:
+            raise InvalidInput(f"JSON parse error: {e}")
+        if not all(isinstance(x, int) for x in values):
+            raise InvalidInput(f"{self.operation} expects an array of integers")
+        self._admit(values)
+        if self._limit_error is None:
+            if self.keys is not None:
+                self.keys.update(values)
+            self._batch.extend(values)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def _admit(self, values):
+        """Track length and cost; past a limit, keep validating but stop computing"""
+        if self._first is None and values:
+            self._first = values[0]
+        self.length += len(values)
+        if values:
+            self.max_bits = max(self.max_bits, max(max(values), -min(values)).bit_length())
+        if self._limit_error is not None:
+            return
+        cost = self.length * max(1, self.max_bits)
+        if self.length > admission.ARRAY_MAX_LENGTH:
+            self._limit_error = admission.LimitExceeded(
+                f"{self.operation} length {self.length} exceeds {admission.ARRAY_MAX_LENGTH}")
+        elif cost > admission.ARRAY_MAX_COST:
+            self._limit_error = admission.LimitExceeded(
+                f"{self.operation} cost {cost} exceeds {admission.ARRAY_MAX_COST}")
+        if self._limit_error is not None:
+            self._batch = []
+            self.abort()
+
+    def abort(self):
+        """Cancel the batch still queued on the executor"""
+        if self._in_flight is not None:
+            self._in_flight.cancel()
+            self._in_flight = None
+
+    # ==================== FOLDING ====================
+
+    def _submit(self, fn, *args):
+        if self.executor is not None:
+            return self.executor.submit(fn, *args)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def _settle(self):
+        """Wait for the batch in flight and take in its result"""
+        future, self._in_flight = self._in_flight, None
+        if future is None:
+            return
+        result = future.result()
+        if self.operation == 'prime':
+            # Batches run one at a time, so survivors stay in input order
+            self._survivors.extend(result)
+            return
+        self._running = result
+        if (self.operation == 'lcm' and result.bit_length() > admission.LCM_MAX_BITS
+                and self._limit_error is None):
+            self._limit_error = admission.LimitExceeded(
+                f"lcm result exceeds {admission.LCM_MAX_DIGITS} digits")
+
+    def _flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        self._settle()
+        if self._limit_error is not None:
+            return
+        if self.operation == 'prime':
+            self._in_flight = self._submit(compute, 'prime', batch)
+        elif self.operation == 'hcf':
+            # Once the HCF is 1 the rest is only validated
+            if self._running != 1:
+                self._in_flight = self._submit(_fold, 'hcf', self._running, batch)
+        elif self._running != 0:
+            self._in_flight = self._submit(_fold, 'lcm', self._running, batch)
+
+    def close(self):
+        """(operation, result, length, cost); raises InvalidInput, LimitExceeded or NotStreamable"""
+        try:
+            return self._close()
+        except Exception:
+            self.abort()
+            raise
+
+    def _close(self):
+        if self._state in ('head', 'buffer'):
+            raise NotStreamable(self._pending + b''.join(self._chunks))
+        if self._state == 'array':
+            raise InvalidInput("JSON parse error: unterminated array")
+
+        tail = self._pending.strip()
+        if tail != b'}':
+            if not tail.startswith(b','):
+                raise InvalidInput("JSON parse error: unexpected data after array")
+            if tail[1:].strip() == b'}':
+                raise InvalidInput("JSON parse error: trailing comma")
+            try:
+                rest = decode(b'{' + tail[1:])
+            except ValueError as e:
+                raise InvalidInput(f"JSON parse error: {e}")
+            others = [key for key in VALID_KEYS if key in rest and key != self.operation]
+            if others:
+                raise InvalidInput(f"Expected 1 key, got {len(others) + 1}")
+            if self.operation in rest:
+                # A repeated key replaces the streamed array, as in a JSON object
+                self.abort()
+                value = rest[self.operation]
+                validate_input(self.operation, value)
+                cost = admission.check(self.operation, value)
+                if self.keys is not None:
+                    self.keys.reset()
+                    self.keys.update(value)
+                result = self._submit(compute, self.operation, value).result()
+                return self.operation, result, len(value), cost
+
+        if self.operation in ('lcm', 'hcf') and self.length == 0:
+            raise InvalidInput(f"{self.operation} expects a non-empty array")
+        if self._limit_error is not None:
+            raise self._limit_error
+
+        self._flush()
+        self._settle()
+        if self._limit_error is not None:
+            raise self._limit_error
+        if self.operation == 'prime':
+            result = self._survivors
+        elif self.length == 1:
+            # Same as the batch path: a single value is returned as-is
+            result = self._first
+        else:
+            result = self._running
+        return self.operation, result, self.length, self.length * max(1, self.max_bits)
+
+
+def parse_stream(stream, executor=None, keys=None, read_size=READ_SIZE):
+    """Run a file-like request body through IncrementalParser"""
+    parser = IncrementalParser(executor, keys=keys)
+    try:
+        while True:
+            chunk = stream.read(read_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    except Exception:
+        parser.abort()
+        raise
+    return parser.close()
@@ -0,0 +1,82 @@
+"""
+Fast JSON Provider
+Flask JSON provider that encodes and decodes with orjson when it is
+installed. orjson cannot represent integers beyond 64 bits, so documents
+containing them transparently go through the stdlib encoder/decoder instead.
+encode/decode are the same codec without Flask, for the ASGI front end.
+"""
+
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; Flask's stdlib provider is used as-is
+    orjson = None
+
+
+def _contains_float(obj):
+    """Whether a decoded document holds any float, checking whole lists in C"""
+    if isinstance(obj, float):
+        return True
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if not isinstance(obj, list):
+        return False
+    types = set(map(type, obj))
+    if float in types:
+        return True
+    if list in types or dict in types:
+        return any(_contains_float(item) for item in obj if isinstance(item, (list, dict)))
+    return False
+
+
+def encode(obj, sort_keys=True, default=None):
+    """Compact JSON bytes, via orjson when it can represent obj"""
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # Integers beyond 64 bits, or types orjson does not know
+            pass
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys, default=default).encode()
+
+
+def decode(s):
+    """Parsed JSON document, via orjson unless that would lose precision"""
+    if orjson is None:
+        return json.loads(s)
+    try:
+        data = orjson.loads(s)
+    except orjson.JSONDecodeError:
+        # Let the stdlib decide, e.g. NaN/Infinity, which orjson rejects
+        return json.loads(s)
+    # orjson turns integers beyond 64 bits into floats; the stdlib keeps
+    # them exact, so any float means the body is parsed again
+    if _contains_float(data):
+        return json.loads(s)
+    return data
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with an orjson fast path for dumps, loads and responses"""
+
+    def _encode(self, obj):
+        return encode(obj, self.sort_keys, self.default)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return decode(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,245 @@
+"""
+HCF/LCM Memo
+Result table for hcf/lcm keyed by the canonical form of the input: sorted,
+deduplicated absolute values. Long lcm inputs are split into content-defined
+chunks whose results are stored too, so a superset of a known set only
+recomputes the chunks its new values fall into. Memory use is capped by an
+approximate byte budget; an optional SQLite file shares results between
+gunicorn workers.
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import metrics
+from reduction import tree_reduce
+
+# Configuration
+# Operations that go through the memo ('' disables it). hcf is left out by
+# default: its early exit at 1 is far cheaper than building the canonical key
+MEMO_OPERATIONS = tuple(op for op in os.environ.get('MEMO_OPERATIONS', 'lcm').split(',') if op)
+MEMO_MAX_BYTES = int(os.environ.get('MEMO_MAX_BYTES', 32 * 1024 * 1024))
+# Canonical inputs of at least this many values are chunked; chunks average
+# 2 ** MEMO_CHUNK_BITS values
+MEMO_CHUNK_MIN_LENGTH = int(os.environ.get('MEMO_CHUNK_MIN_LENGTH', 64))
+MEMO_CHUNK_BITS = int(os.environ.get('MEMO_CHUNK_BITS', 5))
+# SQLite file shared by all workers ('' = process memory only)
+MEMO_PATH = os.environ.get('MEMO_PATH', '')
+MEMO_DISK_MAX_ENTRIES = int(os.environ.get('MEMO_DISK_MAX_ENTRIES', 100_000))
+
+# Inserts between trims of the SQLite table, per process
+_EVICT_EVERY = 64
+
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+def canonical(numbers):
+    """Sorted, deduplicated absolute values; hcf/lcm of 2+ numbers depend on nothing else"""
+    return tuple(sorted(set(map(abs, numbers))))
+
+
+def chunk(values, bits=MEMO_CHUNK_BITS):
+    """Split sorted values where a value's mixed hash has its top bits clear
+
+    Boundaries depend only on the values themselves, so inserting a value
+    changes the chunk it lands in and leaves the others intact.
+    """
+    shift = 64 - bits
+    chunks = []
+    start = 0
+    for i, value in enumerate(values):
+        # hash() of an int is deterministic, so every worker agrees
+        if ((hash(value) * _MIX) & _MASK64) >> shift == 0:
+            chunks.append(values[start:i + 1])
+            start = i + 1
+    if start < len(values):
+        chunks.append(values[start:])
+    return chunks
+
+
+def make_key(operation, values):
+    return operation + ':' + hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+
+def _to_blob(n):
+    return n.to_bytes((n.bit_length() + 7) // 8, 'big')
+
+
+class DiskStore:
+    """SQLite table of key -> result, shareable between processes"""
+
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self.stores = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results '
+            '(key TEXT PRIMARY KEY, result BLOB NOT NULL, stored REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_stored ON results (stored)')
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+        return None if row is None else int.from_bytes(row[0], 'big')
+
+    def set(self, key, result):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (key, result, stored) VALUES (?, ?, ?)',
+                (key, _to_blob(result), time.time())
+            )
+            self.stores += 1
+            # The table may run past max_entries by a few batches between trims
+            if self.stores % _EVICT_EVERY == 0:
+                self._conn.execute(
+                    'DELETE FROM results WHERE key IN (SELECT key FROM results '
+                    'ORDER BY stored DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM results')
+
+
+class ReductionMemo:
+    """LRU of hcf/lcm results under a byte budget, with optional SQLite sharing"""
+
+    def __init__(self, max_bytes=MEMO_MAX_BYTES, path=MEMO_PATH,
+                 chunk_min_length=MEMO_CHUNK_MIN_LENGTH, chunk_bits=MEMO_CHUNK_BITS):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.chunk_min_length = chunk_min_length
+        self.chunk_bits = chunk_bits
+        self.size_bytes = 0
+        self.hits = 0
+        self.partial = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._disk = None
+        self._disk_pid = None
+        self._lock = threading.Lock()
+
+    def _get_disk(self):
+        # One connection per process: workers fork, pool processes spawn
+        if not self.path:
+            return None
+        pid = os.getpid()
+        with self._lock:
+            if self._disk_pid != pid:
+                self._disk = DiskStore(self.path, MEMO_DISK_MAX_ENTRIES)
+                self._disk_pid = pid
+            return self._disk
+
+    def get(self, key):
+        """Cached result for key, or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                return result
+        disk = self._get_disk()
+        if disk is None:
+            return None
+        result = disk.get(key)
+        if result is not None:
+            self._set_memory(key, result)
+        return result
+
+    def _set_memory(self, key, result):
+        size = len(key) + result.bit_length() // 8 + 128
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = result
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                old_key, old_result = self._entries.popitem(last=False)
+                self.size_bytes -= len(old_key) + old_result.bit_length() // 8 + 128
+
+    def set(self, key, result):
+        self._set_memory(key, result)
+        disk = self._get_disk()
+        if disk is not None:
+            disk.set(key, result)
+
+    def reduce(self, operation, numbers, compute, combine=None):
+        """hcf/lcm of numbers through the memo
+
+        compute(list) does the real work on a canonical (sub)list and
+        combine(a, b) merges two partial results (gcd or lcm of two).
+        Without combine only whole inputs are cached, for operations too
+        cheap for chunking to pay off.
+        """
+        if len(numbers) < 2:
+            # A single value is returned as-is, sign included
+            return compute(numbers)
+
+        values = canonical(numbers)
+        key = make_key(operation, values)
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            metrics.count_cache('memo', 'hit')
+            return result
+
+        if combine is None or len(values) < self.chunk_min_length:
+            self.misses += 1
+            metrics.count_cache('memo', 'miss')
+            result = compute(list(values))
+        else:
+            reused = False
+            results = []
+            for part in chunk(values, self.chunk_bits):
+                part_key = make_key(operation, part)
+                part_result = self.get(part_key)
+                if part_result is None:
+                    part_result = compute(list(part))
+                    self.set(part_key, part_result)
+                else:
+                    reused = True
+                results.append(part_result)
+            result = tree_reduce(combine, results)
+            if reused:
+                self.partial += 1
+            else:
+                self.misses += 1
+            metrics.count_cache('memo', 'partial' if reused else 'miss')
+
+        self.set(key, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+        disk = self._get_disk()
+        if disk is not None:
+            disk.clear()
+
+    def stats(self):
+        """Counters for tuning and metrics"""
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "partial": self.partial,
+            "misses": self.misses,
+        }
+
+
+_memo = ReductionMemo()
+
+
+def get_memo():
+    """The process-wide hcf/lcm memo"""
+    return _memo
@@ -0,0 +1,130 @@
+"""
+Metrics
+Prometheus metrics for the BFHL service, served at /metrics. When
+PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py does this), every worker
+writes to shared files there and /metrics aggregates all of them.
+"""
+
+import os
+import time
+import fibonacci
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+REQUESTS = Counter(
+    'bfhl_requests_total', 'HTTP requests by endpoint and status code',
+    ['endpoint', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'bfhl_request_seconds', 'HTTP request latency by endpoint',
+    ['endpoint'], buckets=LATENCY_BUCKETS
+)
+OPERATION_LATENCY = Histogram(
+    'bfhl_operation_seconds', 'Compute time per operation',
+    ['operation'], buckets=LATENCY_BUCKETS
+)
+INPUT_SIZE = Histogram(
+    'bfhl_input_size', 'Input size per operation (n, array length or characters)',
+    ['operation'], buckets=SIZE_BUCKETS
+)
+AI_UPSTREAM_LATENCY = Histogram(
+    'bfhl_ai_upstream_seconds', 'AI upstream call latency by outcome',
+    ['outcome'], buckets=LATENCY_BUCKETS
+)
+AI_CALLS = Counter(
+    'bfhl_ai_calls_total', 'AI upstream calls by outcome (ok, timeout, error, rejected)',
+    ['outcome']
+)
+CACHE_LOOKUPS = Counter(
+    'bfhl_cache_lookups_total', 'Cache lookups by cache and result (hit, miss, coalesced)',
+    ['cache', 'result']
+)
+
+
+def input_size(operation, input_value):
+    """Size of an operation's input for the input-size histogram"""
+    if operation == 'fibonacci':
+        # Terms up to the last one requested
+        offset, limit, _ = fibonacci.parse_query(input_value)
+        return offset + limit
+    return len(input_value)
+
+
+def observe_operation(operation, input_value, seconds=None, size=None):
+    """Record input size, and compute time when it is known"""
+    if size is None:
+        size = input_size(operation, input_value)
+    INPUT_SIZE.labels(operation).observe(size)
+    if seconds is not None:
+        OPERATION_LATENCY.labels(operation).observe(seconds)
+
+
+def observe_ai_call(outcome, seconds=None):
+    AI_CALLS.labels(outcome).inc()
+    if seconds is not None:
+        AI_UPSTREAM_LATENCY.labels(outcome).observe(seconds)
+
+
+def count_cache(cache, result):
+    CACHE_LOOKUPS.labels(cache, result).inc()
+
+
+def observe_request(endpoint, status, seconds=None):
+    """Count a finished request; endpoint is the route pattern, never the raw path"""
+    if endpoint == '/metrics':
+        return
+    REQUESTS.labels(endpoint, str(status)).inc()
+    if seconds is not None:
+        REQUEST_LATENCY.labels(endpoint).observe(seconds)
+
+
+def _registry():
+    """Registry to export: all workers' files in multiprocess mode"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render():
+    """(body, content type) of the Prometheus text exposition"""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+# ==================== FLASK INTEGRATION ====================
+
+
+def init_app(app):
+    """Add request counting hooks and the /metrics endpoint to a Flask app"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        # Route pattern, not raw path, to keep label cardinality bounded
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        start = g.get('metrics_start')
+        observe_request(endpoint, response.status_code,
+                        None if start is None else time.perf_counter() - start)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Prometheus text exposition"""
+        body, content_type = render()
+        return Response(body, mimetype=content_type)
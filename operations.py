@@ -0,0 +1,166 @@
+"""
+BFHL Operations
+Validation and computation for every /bfhl operation. Kept free of Flask and
+Gemini imports so worker processes can load it cheaply.
+"""
+
+from array import array
+from fibonacci import answer_query, generate_fibonacci  # noqa: F401
+from primes import filter_primes, is_prime  # noqa: F401
+import memo
+import reduction
+import vectorized
+
+VALID_KEYS = ['fibonacci', 'prime', 'lcm', 'hcf', 'AI']
+
+# Operations that are pure computation and can run in a worker process
+CPU_OPERATIONS = ('fibonacci', 'prime', 'lcm', 'hcf')
+
+
+class InvalidInput(ValueError):
+    """Raised when a request body or operation input fails validation"""
+
+
+# ==================== UTILITY FUNCTIONS ====================
+
+def is_packed(numbers):
+    """Buffer-backed int64 input (array('q') or NumPy), integers by construction"""
+    return (isinstance(numbers, array) and numbers.typecode == 'q') or vectorized.is_array(numbers)
+
+
+def calculate_gcd(a, b):
+    """Calculate GCD using Euclidean algorithm"""
+    while b:
+        a, b = b, a % b
+    return abs(a)
+
+
+def calculate_hcf(numbers):
+    """Calculate HCF of multiple numbers"""
+    return reduction.hcf(numbers)
+
+
+def calculate_lcm_two(a, b):
+    """Calculate LCM of two numbers"""
+    if a == 0 or b == 0:
+        return 0
+    return abs(a * b) // calculate_gcd(a, b)
+
+
+def calculate_lcm(numbers):
+    """Calculate LCM of multiple numbers"""
+    return reduction.lcm(numbers)
+
+
+# ==================== VALIDATION & DISPATCH ====================
+
+def extract_operation(data):
+    """Return (operation, input_value) from a body holding exactly one valid key"""
+    if not data:
+        raise InvalidInput("Empty data")
+
+    provided_keys = [key for key in VALID_KEYS if key in data]
+    if len(provided_keys) != 1:
+        raise InvalidInput(f"Expected 1 key, got {len(provided_keys)}")
+
+    operation = provided_keys[0]
+    return operation, data[operation]
+
+
+def _validate_fibonacci_range(query):
+    """{"index": k} for one term, or {"offset": k, "limit": n} for n terms from F(k)"""
+    keys = set(query)
+    if keys != {'index'} and keys not in ({'limit'}, {'offset', 'limit'}):
+        raise InvalidInput('fibonacci expects {"index": k} or {"offset": k, "limit": n}')
+    for key, value in query.items():
+        if not isinstance(value, int) or value < 0:
+            raise InvalidInput(f"fibonacci {key} must be a non-negative integer")
+
+
+def validate_input(operation, input_value):
+    """Raise InvalidInput if input_value is not acceptable for operation"""
+    if operation == 'fibonacci':
+        if isinstance(input_value, dict):
+            _validate_fibonacci_range(input_value)
+        elif not isinstance(input_value, int) or input_value < 0:
+            raise InvalidInput("fibonacci expects a non-negative integer")
+
+    elif operation == 'prime':
+        if is_packed(input_value):
+            return
+        if not isinstance(input_value, list):
+            raise InvalidInput("prime expects an array")
+        if not all(isinstance(x, int) for x in input_value):
+            raise InvalidInput("prime expects an array of integers")
+
+    elif operation in ('lcm', 'hcf'):
+        packed = is_packed(input_value)
+        if not (packed or isinstance(input_value, list)) or len(input_value) == 0:
+            raise InvalidInput(f"{operation} expects a non-empty array")
+        if not packed and not all(isinstance(x, int) for x in input_value):
+            raise InvalidInput(f"{operation} expects an array of integers")
+
+    elif operation == 'AI':
+        if not isinstance(input_value, str) or len(input_value.strip()) == 0:
+            raise InvalidInput("AI expects a non-empty string")
+
+    else:
+        raise InvalidInput(f"Unknown operation: {operation}")
+
+
+def _reduce(operation, numbers, executor=None):
+    """hcf/lcm: NumPy for large int64 arrays, big-int code otherwise"""
+    values = vectorized.as_int64(numbers)
+    if values is not None:
+        if operation == 'hcf':
+            return vectorized.calculate_hcf(values)
+        result = vectorized.calculate_lcm(values)
+        if result is not None:
+            return result
+    return reduction.reduce(operation, numbers, executor)
+
+
+def _compute_array(operation, values, executor=None):
+    """prime/lcm/hcf of a NumPy int64 array, read in place and not memoized"""
+    if vectorized.as_int64(values) is None:
+        # Single values, or the vectorized engine is off
+        return compute(operation, values.tolist(), executor)
+    if operation == 'prime':
+        return vectorized.filter_primes(values)
+    if operation == 'hcf':
+        return vectorized.calculate_hcf(values)
+    result = vectorized.calculate_lcm(values)
+    if result is None:
+        # Overflowed int64; duplicates and signs do not change an LCM
+        result = reduction.reduce('lcm', vectorized.distinct_magnitudes(values), executor)
+    return result
+
+
+def compute(operation, input_value, executor=None):
+    """Run a CPU-bound operation on already validated input
+
+    executor, if given, is a process pool very long hcf/lcm inputs may be
+    split across.
+    """
+    if operation == 'fibonacci':
+        return answer_query(input_value)
+
+    if operation in ('prime', 'lcm', 'hcf') and vectorized.is_array(input_value):
+        return _compute_array(operation, input_value, executor)
+
+    if operation in ('lcm', 'hcf'):
+        if operation not in memo.MEMO_OPERATIONS:
+            return _reduce(operation, input_value, executor)
+        # Intermediate LCMs grow, so only lcm is worth caching per chunk
+        combine = calculate_lcm_two if operation == 'lcm' else None
+        return memo.get_memo().reduce(
+            operation, input_value, lambda numbers: _reduce(operation, numbers, executor), combine
+        )
+
+    if operation == 'prime':
+        # Large int64 arrays go through NumPy; None means use the big-int code
+        values = vectorized.as_int64(input_value)
+        if values is not None:
+            return vectorized.filter_primes(values)
+        return filter_primes(input_value)
+    raise InvalidInput(f"Not a CPU operation: {operation}")
@@ -0,0 +1,369 @@
+"""
+Prime Engine
+Segmented Sieve of Eratosthenes kept as an odd-only bitmap in a memory-mapped
+file, so every gunicorn worker on the host shares one copy through the page
+cache. The sieve is built lazily and grows on demand. Values above its range
+go through a tiered test: a mod-30 wheel, one GCD against the primorial of
+the primes below 1000, then deterministic Miller-Rabin below 2^64 and
+Baillie-PSW (strong Lucas) above, so any integer takes microseconds.
+"""
+
+import math
+import mmap
+import os
+import stat
+import tempfile
+import threading
+from structured_logging import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process in-memory sieve
+    fcntl = None
+
+# Configuration
+# The default file sits in a directory only this user can open, never
+# directly in the world-writable temp directory
+SIEVE_PATH = os.environ.get('PRIME_SIEVE_PATH')
+if SIEVE_PATH is None:
+    SIEVE_PATH = os.path.join(tempfile.gettempdir(), f'bfhl-{os.geteuid()}', 'primes.sieve') if fcntl else ''
+SIEVE_INITIAL_LIMIT = int(os.environ.get('PRIME_SIEVE_INITIAL_LIMIT', 1 << 16))
+SIEVE_MAX_LIMIT = int(os.environ.get('PRIME_SIEVE_MAX_LIMIT', 1 << 26))
+
+# Odd numbers sieved per segment while growing
+SEGMENT_SIZE = 1 << 20
+
+_MAGIC = b'BFHLSIEV'
+HEADER_SIZE = 16
+
+# Bases making Miller-Rabin deterministic for every n < 2**64 (Sinclair)
+_MR_BASES_64 = (2, 325, 9375, 28178, 450775, 9780504, 1795265022)
+# Trial division bound: every composite has a factor below it up to its square
+TRIAL_LIMIT = 1000
+
+# byte 0/1 -> ASCII '0'/'1', used to pack a flag-per-byte segment into bits
+_TO_BINARY_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+
+logger = get_logger('primes')
+
+
+# ==================== SIEVE ====================
+
+def _round_limit(limit):
+    """Round up so the bitmap covers a whole number of bytes (16 numbers)"""
+    return (limit + 15) // 16 * 16
+
+
+def _small_primes(limit):
+    """Odd primes up to and including limit, by a plain sieve"""
+    if limit < 3:
+        return []
+    flags = bytearray([1]) * (limit + 1)
+    flags[0:2] = b'\x00\x00'
+    for p in range(2, math.isqrt(limit) + 1):
+        if flags[p]:
+            flags[p*p::p] = bytes(len(range(p*p, limit + 1, p)))
+    return [p for p in range(3, limit + 1, 2) if flags[p]]
+
+
+def _sieve_segment(start_index, end_index, base_primes):
+    """Bitmap bytes for odd numbers 2i+1 with start_index <= i < end_index"""
+    count = end_index - start_index
+    flags = bytearray([1]) * count
+    if start_index == 0:
+        flags[0] = 0  # 1 is not prime
+
+    low = 2 * start_index + 1
+    high = 2 * end_index - 1
+    for p in base_primes:
+        square = p * p
+        if square > high:
+            break
+        first = max(square, (low + p - 1) // p * p)
+        if first % 2 == 0:
+            first += p
+        offset = (first - 1) // 2 - start_index
+        flags[offset::p] = bytes(len(range(offset, count, p)))
+
+    # Pack one flag per byte into one flag per bit, least significant bit first
+    bits = int(flags.translate(_TO_BINARY_DIGITS)[::-1], 2)
+    return bits.to_bytes(count // 8, 'little')
+
+
+def _private_dir(path):
+    """Create the directory holding path (0700) and insist only this user can write to it"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.geteuid() or info.st_mode & 0o022:
+        raise PermissionError(f"{directory} is writable by other users")
+
+
+def _open_private(path, flags):
+    """os.open that refuses symlinks and anything but a regular file owned by this user"""
+    fd = os.open(path, flags | os.O_NOFOLLOW, 0o600)
+    info = os.fstat(fd)
+    if info.st_uid != os.geteuid() or not stat.S_ISREG(info.st_mode):
+        os.close(fd)
+        raise PermissionError(f"{path} is not a file owned by this user")
+    return fd
+
+
+class PrimeSieve:
+    """Odd-only sieve bitmap, optionally backed by a shared memory-mapped file"""
+
+    def __init__(self, path=SIEVE_PATH, initial_limit=SIEVE_INITIAL_LIMIT,
+                 max_limit=SIEVE_MAX_LIMIT):
+        self.path = path if fcntl is not None else ''
+        self.initial_limit = _round_limit(max(initial_limit, 16))
+        self.max_limit = _round_limit(max(max_limit, self.initial_limit))
+        self.limit = 0
+        self._bitmap = b''
+        self._lock = threading.Lock()
+
+    def covers(self, n):
+        """Whether n is within the range the sieve may grow to"""
+        return n < self.max_limit
+
+    def ensure(self, n):
+        """Grow the sieve until it covers n (capped at max_limit)"""
+        if n < self.limit:
+            return
+        with self._lock:
+            if n < self.limit:
+                return
+            target = min(self.max_limit,
+                         _round_limit(max(n + 1, 2 * self.limit, self.initial_limit)))
+            if self.path:
+                try:
+                    self._grow_file(target)
+                    return
+                except OSError as e:
+                    logger.warning("Shared prime sieve unavailable, using memory",
+                                   extra={"path": self.path, "error": str(e)})
+                    self.path = ''
+            self._grow_memory(target)
+
+    def seed(self, bitmap):
+        """Adopt a prebuilt bitmap (e.g. from the tables artifact) if it covers more"""
+        if bytes(bitmap[:8]) != _MAGIC:
+            raise ValueError("Not a prime sieve bitmap")
+        limit = int.from_bytes(bitmap[8:HEADER_SIZE], 'little')
+        with self._lock:
+            if limit > self.limit:
+                self._bitmap = bitmap
+                self.limit = limit
+
+    @property
+    def bitmap(self):
+        """Raw buffer: 16-byte header, then one bit per odd number below limit"""
+        return self._bitmap
+
+    def contains(self, n):
+        """Bitmap lookup; caller guarantees n is odd and below the limit"""
+        index = n >> 1
+        return bool(self._bitmap[HEADER_SIZE + (index >> 3)] >> (index & 7) & 1)
+
+    def is_prime(self, n):
+        """Primality via the bitmap, growing it first if needed"""
+        if n < 3:
+            return n == 2
+        if not n & 1:
+            return False
+        if n >= self.limit:
+            self.ensure(n)
+        return self.contains(n)
+
+    def _extend(self, bitmap_size, target):
+        """Yield bitmap bytes for the odd numbers between the current size and target"""
+        base_primes = _small_primes(math.isqrt(target) + 1)
+        start = (bitmap_size - HEADER_SIZE) * 8
+        end = target // 2
+        while start < end:
+            stop = min(start + SEGMENT_SIZE, end)
+            yield _sieve_segment(start, stop, base_primes)
+            start = stop
+
+    def _grow_memory(self, target):
+        """Grow a process-private bitmap"""
+        bitmap = bytearray(self._bitmap or _MAGIC + bytes(8))
+        for chunk in self._extend(len(bitmap), target):
+            bitmap += chunk
+        bitmap[8:16] = target.to_bytes(8, 'little')
+        self._bitmap = bitmap
+        self.limit = target
+
+    def _grow_file(self, target):
+        """Grow the shared file under an exclusive lock, then remap it"""
+        _private_dir(self.path)
+        with os.fdopen(_open_private(self.path + '.lock', os.O_RDWR | os.O_CREAT), 'r+b') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with os.fdopen(_open_private(self.path, os.O_RDWR | os.O_CREAT), 'r+b') as f:
+                    f.seek(0)
+                    header = f.read(HEADER_SIZE)
+                    disk_limit = 0
+                    if len(header) == HEADER_SIZE and header[:8] == _MAGIC:
+                        disk_limit = int.from_bytes(header[8:], 'little')
+
+                    if disk_limit < target:
+                        # Drop any tail left behind by an interrupted writer
+                        size = HEADER_SIZE + disk_limit // 16
+                        f.truncate(size)
+                        f.seek(size)
+                        # Bits already in memory (e.g. a seeded table) are copied, not recomputed
+                        known = HEADER_SIZE + self.limit // 16
+                        if known > size:
+                            f.write(self._bitmap[size:known])
+                            size = known
+                        for chunk in self._extend(size, target):
+                            f.write(chunk)
+                        f.flush()
+                        # Publish the new limit only once the bits are on disk
+                        f.seek(0)
+                        f.write(_MAGIC + target.to_bytes(8, 'little'))
+                        f.flush()
+                        disk_limit = target
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        with os.fdopen(_open_private(self.path, os.O_RDONLY), 'rb') as f:
+            bitmap = mmap.mmap(f.fileno(), HEADER_SIZE + disk_limit // 16,
+                               access=mmap.ACCESS_READ)
+        # The previous mapping is left to the garbage collector because
+        # concurrent lookups may still be reading it
+        self._bitmap = bitmap
+        self.limit = disk_limit
+
+
+# ==================== PRIMALITY TESTS ====================
+
+SMALL_PRIMES = [2] + _small_primes(TRIAL_LIMIT)
+_SMALL_PRIME_SET = frozenset(SMALL_PRIMES)
+PRIMORIAL = math.prod(SMALL_PRIMES)
+# n % 30 for n coprime to 2, 3 and 5
+_WHEEL_30 = tuple(math.gcd(r, 30) == 1 for r in range(30))
+
+
+def _strong_probable_prime(n, a, d, s):
+    """Miller-Rabin round for base a, where n - 1 = d * 2**s with d odd"""
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+def miller_rabin(n, bases=_MR_BASES_64):
+    """Strong probable-prime test of odd n > 2 to bases; deterministic for n < 2**64 by default"""
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for a in bases:
+        a %= n
+        if a and not _strong_probable_prime(n, a, d, s):
+            return False
+    return True
+
+
+def _jacobi(a, n):
+    """Jacobi symbol (a/n) for odd n > 0"""
+    a %= n
+    result = 1
+    while a:
+        while not a & 1:
+            a >>= 1
+            if n & 7 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a & 3 == 3 and n & 3 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def strong_lucas(n):
+    """Strong Lucas probable-prime test with Selfridge's parameters, for odd n without small factors"""
+    if math.isqrt(n) ** 2 == n:
+        # No D with (D/n) = -1 exists for a square
+        return False
+    D = 5
+    while _jacobi(D, n) != -1:
+        D = -D - 2 if D > 0 else -D + 2
+    Q = (1 - D) // 4
+
+    # n + 1 = d * 2**s; U, V, Qk = U_k, V_k, Q^k walking k up the bits of d
+    d = n + 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    U, V, Qk = 1, 1, Q % n
+    for bit in bin(d)[3:]:
+        U = U * V % n
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        if bit == '1':
+            # P = 1: U_{k+1} = (U + V) / 2, V_{k+1} = (D*U + V) / 2, mod n
+            U, V = U + V, D * U + V
+            U = (U + n if U & 1 else U) >> 1
+            V = (V + n if V & 1 else V) >> 1
+            U %= n
+            V %= n
+            Qk = Qk * Q % n
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % n
+        if V == 0:
+            return True
+        Qk = Qk * Qk % n
+    return False
+
+
+def probable_prime(n):
+    """Primality of any integer without the sieve: wheel, primorial GCD, then MR or BPSW"""
+    if n < TRIAL_LIMIT:
+        return n in _SMALL_PRIME_SET
+    if not _WHEEL_30[n % 30] or math.gcd(n, PRIMORIAL) != 1:
+        return False
+    if n < TRIAL_LIMIT * TRIAL_LIMIT:
+        return True
+    if n < 1 << 64:
+        return miller_rabin(n)
+    # Baillie-PSW: no counterexample is known
+    return miller_rabin(n, (2,)) and strong_lucas(n)
+
+
+# ==================== PUBLIC API ====================
+
+_sieve = None
+_sieve_lock = threading.Lock()
+
+
+def get_sieve():
+    """Process-wide sieve, created on first use (after gunicorn forks)"""
+    global _sieve
+    if _sieve is None:
+        with _sieve_lock:
+            if _sieve is None:
+                _sieve = PrimeSieve()
+    return _sieve
+
+
+def is_prime(num):
+    """Check if a number is prime"""
+    sieve = get_sieve()
+    if sieve.covers(num):
+        return sieve.is_prime(num)
+    return probable_prime(num)
+
+
+def filter_primes(numbers):
+    """Filter prime numbers from an array"""
+    sieve = get_sieve()
+    in_range = [num for num in numbers if sieve.covers(num)]
+    if in_range:
+        sieve.ensure(max(in_range))
+    return [num for num in numbers if is_prime(num)]
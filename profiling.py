@@ -0,0 +1,396 @@
+"""
+Request Profiling
+Opt-in profiler for /bfhl requests. A request is profiled when it carries
+`X-Profile-Token: <PROFILE_TOKEN>` or is picked by PROFILE_SAMPLE_RATE; its
+response then has an X-Profile-Id header. Each profile records the time spent
+in every phase (parse, validate, compute, serialize) plus either collapsed
+stacks from a sampling profiler (PROFILE_MODE=sample, for flamegraph.pl or
+speedscope) or a cProfile dump (PROFILE_MODE=cprofile, for pstats/snakeviz).
+Profiles are listed and downloaded under /debug/profiles with the token.
+With no token and no sample rate nothing is installed, so requests pay nothing.
+Both front ends are covered: init_app() hooks into Flask, asgi.py calls the
+asgi_* functions.
+"""
+
+from collections import Counter, deque
+import contextvars
+import cProfile
+import hmac
+import json
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from structured_logging import get_logger
+
+logger = get_logger('profiling')
+
+# Configuration
+# Enables the X-Profile-Token header and the /debug/profiles endpoints
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+# Fraction of requests profiled without the header (changeable at runtime)
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+# 'sample' (collapsed stacks) or 'cprofile' (pstats dump)
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sample')
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.001))
+# Profiles kept; PROFILE_DIR shares them between workers, memory is per process
+PROFILE_MAX_COUNT = int(os.environ.get('PROFILE_MAX_COUNT', 50))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+
+# Endpoints that can be profiled
+PROFILED_ENDPOINTS = ('/bfhl', '/bfhl/batch')
+
+_FILE_TYPES = {
+    'sample': ('folded', 'text/plain'),
+    'cprofile': ('prof', 'application/octet-stream'),
+}
+
+_current = contextvars.ContextVar('profile', default=None)
+
+
+def enabled():
+    """Whether profiling can ever trigger in this process"""
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def mark(phase, **info):
+    """End the current phase of the profiled request, if this one is profiled"""
+    profile = _current.get()
+    if profile is not None:
+        profile.mark(phase, **info)
+
+
+# ==================== PROFILERS ====================
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples one thread's stack every interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        """Collapsed stacks, one 'frame;frame;frame count' line each"""
+        self._stop.set()
+        self._thread.join()
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()).encode()
+
+
+class FunctionProfiler:
+    """cProfile over one request; stop() returns a file pstats.Stats can load"""
+
+    def __init__(self):
+        self._profiler = cProfile.Profile()
+
+    def start(self):
+        self._profiler.enable()
+
+    def stop(self):
+        self._profiler.disable()
+        self._profiler.create_stats()
+        return marshal.dumps(self._profiler.stats)
+
+
+class Profile:
+    """Phase timings and profiler output for one request"""
+
+    def __init__(self, endpoint, mode=PROFILE_MODE):
+        self.id = uuid.uuid4().hex[:16]
+        self.endpoint = endpoint
+        self.mode = mode
+        self.info = {}
+        self.phases = {}
+        self.data = b''
+        self._start = self._last = time.perf_counter()
+        if mode == 'cprofile':
+            self._profiler = FunctionProfiler()
+        else:
+            self._profiler = StackSampler(threading.get_ident())
+        self._profiler.start()
+
+    def mark(self, phase, **info):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+        self.info.update(info)
+
+    def finish(self, status, last_phase='serialize'):
+        self.mark(last_phase)
+        self.data = self._profiler.stop()
+        self._profiler = None
+        return {
+            "id": self.id,
+            "ts": round(time.time(), 3),
+            "pid": os.getpid(),
+            "endpoint": self.endpoint,
+            "status": status,
+            "mode": self.mode,
+            "total_ms": round((self._last - self._start) * 1000, 3),
+            "phases_ms": {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()},
+            **self.info,
+        }
+
+
+# ==================== STORAGE ====================
+
+class ProfileStore:
+    """The most recent profiles, in memory or in a directory shared by workers"""
+
+    def __init__(self, max_count=PROFILE_MAX_COUNT, directory=PROFILE_DIR):
+        self.max_count = max_count
+        self.directory = directory
+        self._entries = deque(maxlen=max_count)
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def add(self, summary, data):
+        if not self.directory:
+            with self._lock:
+                self._entries.append((summary, data))
+            return
+        extension = _FILE_TYPES[summary["mode"]][0]
+        with open(os.path.join(self.directory, f"{summary['id']}.{extension}"), 'wb') as f:
+            f.write(data)
+        # Metadata last: a profile is listed only once its data is complete
+        with open(os.path.join(self.directory, f"{summary['id']}.json"), 'w') as f:
+            json.dump(summary, f)
+        self._prune()
+
+    def _summary_files(self):
+        """Summary file names, oldest first; other workers may delete them meanwhile"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.name))
+                except OSError:
+                    continue
+        return [name for _, name in sorted(entries)]
+
+    def _prune(self):
+        for name in self._summary_files()[:-self.max_count]:
+            profile_id = name[:-len('.json')]
+            for extension in ('json', 'folded', 'prof'):
+                try:
+                    os.remove(os.path.join(self.directory, f"{profile_id}.{extension}"))
+                except OSError:
+                    pass
+
+    def list(self):
+        """Summaries, newest first"""
+        if not self.directory:
+            with self._lock:
+                return [summary for summary, _ in reversed(self._entries)]
+        summaries = []
+        for name in reversed(self._summary_files()):
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return summaries
+
+    def get(self, profile_id):
+        """(summary, data) or None"""
+        if not self.directory:
+            with self._lock:
+                for summary, data in self._entries:
+                    if summary["id"] == profile_id:
+                        return summary, data
+            return None
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                summary = json.load(f)
+            extension = _FILE_TYPES[summary["mode"]][0]
+            with open(os.path.join(self.directory, f"{profile_id}.{extension}"), 'rb') as f:
+                return summary, f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+store = ProfileStore()
+
+
+# ==================== REQUESTS ====================
+
+def authorized(token):
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token or '', PROFILE_TOKEN)
+
+
+def wanted(path, token):
+    """Whether a request to path carrying this X-Profile-Token is profiled"""
+    if path not in PROFILED_ENDPOINTS:
+        return False
+    return authorized(token) or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+def begin(path):
+    """Profile the rest of the current request; None if no profiler could start"""
+    try:
+        profile = Profile(path, PROFILE_MODE)
+    except ValueError as e:
+        # Python 3.12+ allows one cProfile at a time per process
+        logger.debug("profile skipped", extra={"error": str(e)})
+        return None
+    _current.set(profile)
+    return profile
+
+
+def end(profile, status):
+    """Stop profiling the current request and keep its profile"""
+    _current.set(None)
+    summary = profile.finish(status)
+    store.add(summary, profile.data)
+    logger.info("profile", extra=summary)
+
+
+def drop(profile):
+    """Stop profiling a request that failed before it had a response"""
+    _current.set(None)
+    profile.finish(500)
+
+
+def file_type(summary):
+    """(extension, mimetype) of a profile's data"""
+    return _FILE_TYPES[summary["mode"]]
+
+
+def update_sample_rate(rate):
+    """Change this process's sample rate; False if rate is not in [0, 1]"""
+    global PROFILE_SAMPLE_RATE
+    if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate <= 1:
+        return False
+    PROFILE_SAMPLE_RATE = float(rate)
+    return True
+
+
+# ==================== FLASK ====================
+
+def init_app(app):
+    """Add profiling hooks and /debug/profiles to a Flask app, if profiling is configured"""
+    if not enabled():
+        return
+    from flask import Response, abort, jsonify, request
+
+    @app.before_request
+    def _start_profile():
+        if wanted(request.path, request.headers.get('X-Profile-Token')):
+            begin(request.path)
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = _current.get()
+        if profile is None:
+            return response
+        end(profile, response.status_code)
+        response.headers['X-Profile-Id'] = profile.id
+        return response
+
+    @app.teardown_request
+    def _drop_profile(error=None):
+        # after_request did not run (the request failed), so just stop profiling
+        profile = _current.get()
+        if profile is not None:
+            drop(profile)
+
+    def require_token():
+        if not authorized(request.headers.get('X-Profile-Token')):
+            abort(404)
+
+    @app.route('/debug/profiles', methods=['GET'])
+    def list_profiles():
+        """Recent profile summaries with phase timings"""
+        require_token()
+        return jsonify({"sample_rate": PROFILE_SAMPLE_RATE, "profiles": store.list()})
+
+    @app.route('/debug/profiles/<profile_id>', methods=['GET'])
+    def download_profile(profile_id):
+        """Collapsed stacks or pstats dump of one profile"""
+        require_token()
+        entry = store.get(profile_id)
+        if entry is None:
+            abort(404)
+        summary, data = entry
+        extension, mimetype = file_type(summary)
+        return Response(data, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{profile_id}.{extension}"'
+        })
+
+    @app.route('/debug/profiling', methods=['POST'])
+    def set_sample_rate():
+        """Change this worker's sample rate: {"sample_rate": 0.01}"""
+        require_token()
+        if not update_sample_rate((request.get_json(silent=True) or {}).get('sample_rate')):
+            return jsonify({"is_success": False}), 400
+        return jsonify({"is_success": True, "sample_rate": PROFILE_SAMPLE_RATE})
+
+
+# ==================== ASGI ====================
+
+# The profile running on this process's event loop, if any
+_loop_profile = None
+
+
+def asgi_start(scope):
+    """Profile an ASGI request if it asks to be or is sampled; returns the Profile or None
+
+    Requests share the event loop's thread, so only one is profiled at a
+    time per process, and its stacks or cProfile data include whatever
+    else the loop ran meanwhile. Phase timings are the request's own.
+    """
+    global _loop_profile
+    if not enabled() or _loop_profile is not None or scope['path'] not in PROFILED_ENDPOINTS:
+        return None
+    token = next((value.decode('latin-1') for key, value in scope['headers']
+                  if key == b'x-profile-token'), None)
+    if wanted(scope['path'], token):
+        _loop_profile = begin(scope['path'])
+    return _loop_profile
+
+
+def asgi_finish(profile, status=None):
+    """End the loop's profile; without a status (no response went out) it is dropped"""
+    global _loop_profile
+    _loop_profile = None
+    if status is None:
+        drop(profile)
+    else:
+        end(profile, status)
+
+
+def asgi_send(send, profile):
+    """ASGI send that adds X-Profile-Id to the response headers"""
+    async def send_with_id(message):
+        if message['type'] == 'http.response.start':
+            message = dict(message, headers=list(message.get('headers', []))
+                           + [(b'x-profile-id', profile.id.encode())])
+        await send(message)
+    return send_with_id
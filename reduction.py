@@ -0,0 +1,70 @@
+"""
+Reduction Engine
+Balanced (tree) reduction for big-int LCM and an early-exit GCD for HCF. A
+left fold multiplies one ever-growing accumulator by small values, which is
+quadratic in the total bit length; pairing values level by level keeps both
+operands of each step about the same size. Very long inputs can be split
+into chunks that run in a process pool and are combined the same way.
+"""
+
+import math
+import os
+
+# Configuration
+# Inputs at least this long are split across the executor when one is given
+REDUCE_PARALLEL_MIN_LENGTH = int(os.environ.get('REDUCE_PARALLEL_MIN_LENGTH', 50_000))
+REDUCE_PARALLEL_CHUNKS = int(os.environ.get('REDUCE_PARALLEL_CHUNKS', os.cpu_count() or 1))
+# Values per math.gcd call between checks for an HCF of 1
+HCF_BLOCK_SIZE = 1024
+
+def tree_reduce(pair, values):
+    """Combine values with pair() level by level instead of left to right"""
+    values = list(values)
+    while len(values) > 1:
+        reduced = [pair(values[i], values[i + 1]) for i in range(0, len(values) - 1, 2)]
+        if len(values) % 2:
+            reduced.append(values[-1])
+        values = reduced
+    return values[0]
+
+
+def hcf(numbers):
+    """HCF of numbers, stopping as soon as the running GCD is 1"""
+    if len(numbers) < 2:
+        return numbers[0] if numbers else 0
+    result = 0
+    for start in range(0, len(numbers), HCF_BLOCK_SIZE):
+        result = math.gcd(result, *numbers[start:start + HCF_BLOCK_SIZE])
+        if result == 1:
+            break
+    return result
+
+
+def lcm(numbers):
+    """LCM of numbers: 0 if any value is 0, otherwise a tree of pairwise LCMs"""
+    if len(numbers) < 2:
+        return numbers[0] if numbers else 0
+    if 0 in numbers:
+        return 0
+    return tree_reduce(math.lcm, numbers)
+
+
+def _reduce_chunk(operation, numbers):
+    """Pool task: hcf/lcm of one chunk"""
+    return hcf(numbers) if operation == 'hcf' else lcm(numbers)
+
+
+def reduce(operation, numbers, executor=None):
+    """hcf/lcm of numbers, fanned out to executor (e.g. a process pool) for very long inputs"""
+    if (executor is None or len(numbers) < REDUCE_PARALLEL_MIN_LENGTH
+            or REDUCE_PARALLEL_CHUNKS < 2):
+        return _reduce_chunk(operation, numbers)
+    if operation == 'lcm' and 0 in numbers:
+        return 0
+
+    size = -(-len(numbers) // REDUCE_PARALLEL_CHUNKS)
+    chunks = [numbers[i:i + size] for i in range(0, len(numbers), size)]
+    futures = [executor.submit(_reduce_chunk, operation, chunk) for chunk in chunks]
+    parts = [future.result() for future in futures]
+    # A one-value chunk keeps its sign, which math.gcd/math.lcm then drop
+    return hcf(parts) if operation == 'hcf' else tree_reduce(math.lcm, parts)
@@ -0,0 +1,307 @@
+"""
+Response Cache
+Whole /bfhl success bodies, already serialized, in a SQLite file every
+gunicorn worker shares. Keys are content hashes of the response format,
+operation and canonical input, so a repeated request in any worker skips
+compute and serialization. Entries expire per operation (long for the pure
+math, short for AI) and the oldest are evicted past a byte budget.
+Set RESPONSE_CACHE_PATH to enable it.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import binary_format
+import fibonacci
+import memo
+import metrics
+from ai_cache import normalize_question
+from json_provider import encode
+from responses import OFFICIAL_EMAIL, success
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configuration
+# SQLite file shared by all workers ('' disables the cache)
+RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH', '')
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Larger bodies are not stored
+RESPONSE_CACHE_MAX_ITEM_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_ITEM_BYTES', 1024 * 1024))
+# Seconds an entry lives: fibonacci/prime/lcm/hcf never change, AI answers may
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 7 * 24 * 3600))
+RESPONSE_CACHE_AI_TTL = float(os.environ.get('RESPONSE_CACHE_AI_TTL', 600))
+
+# Bumped whenever a response body for the same input changes
+_KEY_VERSION = b'2'
+# Stores between eviction passes, per process
+_EVICT_EVERY = 64
+
+
+def ttl(operation):
+    return RESPONSE_CACHE_AI_TTL if operation == 'AI' else RESPONSE_CACHE_TTL
+
+
+def _dump(values):
+    """Compact JSON of a list of ints, quickly"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(values)
+        except TypeError:
+            # Integers beyond 64 bits
+            pass
+    # The same bytes orjson writes, so a key does not depend on the values' size
+    return ('[' + ','.join(map(str, values)) + ']').encode()
+
+
+def canonical_input(operation, input_value):
+    """Bytes that are equal for any two inputs with the same response
+
+    A packed int64 array is returned as a memoryview of its own buffer,
+    which _digest hashes in place.
+    """
+    if operation == 'fibonacci':
+        # n and {"offset": 0, "limit": n} are the same request
+        return repr(fibonacci.parse_query(input_value)).encode()
+    if operation == 'AI':
+        return normalize_question(input_value).encode()
+    if hasattr(input_value, 'dtype'):
+        # Packed int64 array, hashed as it arrived
+        if input_value.flags.c_contiguous:
+            return memoryview(input_value)
+        return memoryview(input_value.tobytes())
+    if operation in ('lcm', 'hcf') and len(input_value) >= 2:
+        # Only the set of magnitudes matters, like the hcf/lcm memo
+        return _dump(list(memo.canonical(input_value)))
+    # prime keeps order and duplicates; a single hcf/lcm value keeps its sign
+    return _dump(input_value)
+
+
+def sent_input(operation, input_value):
+    """Bytes identifying an input as sent: no sorting, so cheap even for long hcf/lcm arrays"""
+    if operation in ('lcm', 'hcf') and not hasattr(input_value, 'dtype'):
+        return _dump(input_value)
+    return canonical_input(operation, input_value)
+
+
+def response_body(response_format, operation, result):
+    """(body, content type) of a success response, as both front ends send it"""
+    if response_format == binary_format.JSON:
+        return encode(success(result)) + b'\n', response_format
+    return binary_format.encode_response(response_format, operation, result), response_format
+
+
+def cacheable(operation, result):
+    """Upstream AI failures are answered "Error" and must not stick"""
+    return not (operation == 'AI' and result == "Error")
+
+
+class ResponseStore:
+    """SQLite table of key -> serialized body with expiry, shared between processes"""
+
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key BLOB PRIMARY KEY, body BLOB NOT NULL, '
+            'content_type TEXT NOT NULL, expires REAL NOT NULL, stored REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_stored ON responses (stored)')
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, content_type FROM responses WHERE key = ? AND expires > ?', (key, now)
+            ).fetchone()
+        return row
+
+    def set(self, key, body, content_type, expires, now):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, body, content_type, expires, stored) '
+                'VALUES (?, ?, ?, ?, ?)', (key, body, content_type, expires, now)
+            )
+
+    def evict(self, now):
+        """Drop expired entries, then the oldest until under max_bytes; returns rows removed"""
+        with self._lock:
+            removed = self._conn.execute('DELETE FROM responses WHERE expires <= ?', (now,)).rowcount
+            while True:
+                total, count = self._conn.execute(
+                    'SELECT COALESCE(SUM(LENGTH(body)), 0), COUNT(*) FROM responses'
+                ).fetchone()
+                if total <= self.max_bytes or not count:
+                    return removed
+                # Remove about as many rows as the excess (plus 10%) is worth
+                excess = total - self.max_bytes * 0.9
+                batch = max(1, int(count * excess / total))
+                removed += self._conn.execute(
+                    'DELETE FROM responses WHERE key IN '
+                    '(SELECT key FROM responses ORDER BY stored LIMIT ?)', (batch,)
+                ).rowcount
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses'
+            ).fetchone()
+        return entries, size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+
+def _finish(digest, response_format, operation):
+    """Key from a blake2b that has hashed the input; the input comes first so it can be streamed"""
+    for part in (_KEY_VERSION, OFFICIAL_EMAIL.encode(), response_format.encode(), operation.encode()):
+        digest.update(b'\0')
+        digest.update(part)
+    return digest.digest()
+
+
+def _digest(response_format, operation, data):
+    if isinstance(data, memoryview):
+        # A packed array, tagged so it never collides with a JSON dump
+        digest = hashlib.blake2b(b'i8:', digest_size=16)
+        digest.update(data)
+    else:
+        digest = hashlib.blake2b(data, digest_size=16)
+    return _finish(digest, response_format, operation)
+
+
+def request_key(response_format, operation, input_value):
+    """Content hash naming the response to a validated request, from the input as sent"""
+    return _digest(response_format, operation, sent_input(operation, input_value))
+
+
+class InputKeys:
+    """request_key() and ResponseCache.key() of a prime/lcm/hcf array fed in pieces as it arrives"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Start over, e.g. when a repeated key replaces the streamed array"""
+        self._sent = hashlib.blake2b(b'[', digest_size=16)
+        self._length = 0
+        # Whether a prime result could be sent packed
+        self.fits_int64 = True
+        # Only the cache key needs the distinct magnitudes of an hcf/lcm input
+        self._magnitudes = set() if cache.enabled else None
+
+    def update(self, values):
+        if not values:
+            return
+        if self._length:
+            self._sent.update(b',')
+        self._sent.update(_dump(values)[1:-1])
+        self._length += len(values)
+        self.fits_int64 = self.fits_int64 and binary_format.fits_int64(values)
+        if self._magnitudes is not None:
+            self._magnitudes.update(map(abs, values))
+
+    def request_key(self, response_format, operation):
+        digest = self._sent.copy()
+        digest.update(b']')
+        return _finish(digest, response_format, operation)
+
+    def cache_key(self, response_format, operation):
+        """Same as cache.key() on the whole array, or None when the cache is off"""
+        if self._magnitudes is None:
+            return None
+        if operation in ('lcm', 'hcf') and self._length >= 2:
+            return _digest(response_format, operation, _dump(sorted(self._magnitudes)))
+        return self.request_key(response_format, operation)
+
+
+class ResponseCache:
+    """Serialized /bfhl responses by content hash, with hit/miss counters"""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_bytes=RESPONSE_CACHE_MAX_BYTES,
+                 max_item_bytes=RESPONSE_CACHE_MAX_ITEM_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._store = None
+        self._store_pid = None
+        self._lock = threading.Lock()
+
+    def _get_store(self):
+        # One connection per process: workers fork, pool processes spawn
+        pid = os.getpid()
+        with self._lock:
+            if self._store_pid != pid:
+                self._store = ResponseStore(self.path, self.max_bytes)
+                self._store_pid = pid
+            return self._store
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def key(self, response_format, operation, input_value):
+        """Hash of the canonical input, shared by every request with the same response; None when off"""
+        if not self.path:
+            return None
+        return _digest(response_format, operation, canonical_input(operation, input_value))
+
+    def get(self, key):
+        """(body, content type) for key, or None"""
+        try:
+            row = self._get_store().get(key, time.time())
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            self.misses += 1
+            metrics.count_cache('response', 'miss')
+            return None
+        self.hits += 1
+        metrics.count_cache('response', 'hit')
+        return row[0], row[1]
+
+    def set(self, key, operation, body, content_type):
+        if len(body) > self.max_item_bytes:
+            return
+        now = time.time()
+        try:
+            store = self._get_store()
+            store.set(key, body, content_type, now + ttl(operation), now)
+            self.stores += 1
+            if self.stores % _EVICT_EVERY == 0:
+                self.evictions += store.evict(now)
+        except sqlite3.Error:
+            # Another worker holds the write lock past the timeout; skip this one
+            pass
+
+    def clear(self):
+        self._get_store().clear()
+
+    def stats(self):
+        """Counters for tuning; entries and bytes are for all workers"""
+        entries, size_bytes = self._get_store().stats() if self.path else (0, 0)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size_bytes,
+        }
+
+
+cache = ResponseCache()
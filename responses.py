@@ -0,0 +1,77 @@
+"""
+Response Envelopes
+JSON bodies shared by both front ends (Flask in app.py, ASGI in asgi.py),
+including the incrementally written fibonacci stream.
+"""
+
+import os
+import fibonacci
+from json_provider import encode
+from structured_logging import get_logger
+
+# Configuration
+OFFICIAL_EMAIL = "saksham2200.be23@chitkara.edu.in"
+# Fibonacci responses with at least this many terms are streamed (0 = only on ?stream=1)
+FIB_STREAM_MIN_TERMS = int(os.environ.get('FIB_STREAM_MIN_TERMS', 10000))
+# Approximate size of each streamed chunk
+STREAM_CHUNK_BYTES = 64 * 1024
+
+logger = get_logger('responses')
+
+
+def success(data=None):
+    """Success envelope; health checks carry no data"""
+    body = {"is_success": True, "official_email": OFFICIAL_EMAIL}
+    if data is not None:
+        body["data"] = data
+    return body
+
+
+def failure():
+    """Failure envelope; reasons are logged, never returned"""
+    return {"is_success": False}
+
+
+def batch_body(results):
+    """Success envelope around batch results; an item that cannot be encoded fails on its own"""
+    items = []
+    for result in results:
+        try:
+            items.append(encode(result))
+        except (TypeError, ValueError):
+            logger.exception("Batch item could not be encoded")
+            items.append(encode(failure()))
+    # Same key order as jsonify, which sorts keys
+    return (b'{"data":[' + b','.join(items) + b'],"is_success":true,"official_email":'
+            + encode(OFFICIAL_EMAIL) + b'}\n')
+
+
+def wants_stream(query, stream_arg=''):
+    """Whether the fibonacci response to query (n, or a range of terms) should be streamed"""
+    _, limit, single = fibonacci.parse_query(query)
+    if single:
+        return False
+    if stream_arg.lower() in ('1', 'true', 'yes'):
+        return True
+    return FIB_STREAM_MIN_TERMS > 0 and limit >= FIB_STREAM_MIN_TERMS
+
+
+def stream_data_list(items):
+    """Yield a success envelope whose data array is written incrementally"""
+    # Same key order as jsonify, which sorts keys
+    yield '{"data":['
+    separator = ''
+    chunk = []
+    size = 0
+    for item in items:
+        text = str(item)
+        chunk.append(text)
+        size += len(text) + 1
+        if size >= STREAM_CHUNK_BYTES:
+            yield separator + ','.join(chunk)
+            separator = ','
+            chunk = []
+            size = 0
+    if chunk:
+        yield separator + ','.join(chunk)
+    yield f'],"is_success":true,"official_email":"{OFFICIAL_EMAIL}"}}'
@@ -0,0 +1,99 @@
+"""
+Structured Logging
+JSON-lines logging with levels, request sampling and field truncation.
+Full request/response capture is logged at DEBUG only, so at the default
+level the /bfhl hot path pays a single isEnabledFor check.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# Configuration
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# Fraction of requests whose payloads are captured when DEBUG is enabled
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+# Longest string kept for any captured field
+LOG_MAX_FIELD_CHARS = int(os.environ.get('LOG_MAX_FIELD_CHARS', 512))
+
+# Longest list rendered in full before truncation
+_MAX_ITEMS = 64
+
+# LogRecord attributes that are not user-supplied fields
+_RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message'}
+
+
+def truncate(value, limit=None):
+    """str(value) cut to limit characters, noting how much was dropped"""
+    limit = LOG_MAX_FIELD_CHARS if limit is None else limit
+    if isinstance(value, list) and len(value) > _MAX_ITEMS:
+        # Avoid building the repr of a huge result just to cut it
+        value = value[:_MAX_ITEMS] + [f"...(+{len(value) - _MAX_ITEMS} items)"]
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=truncate)
+
+
+def configure_logging(level=LOG_LEVEL, stream=None):
+    """Install the JSON handler on the 'bfhl' logger tree (idempotent)"""
+    logger = logging.getLogger('bfhl')
+    logger.setLevel(level)
+    if not any(getattr(h, '_bfhl', False) for h in logger.handlers):
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        handler._bfhl = True
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+def get_logger(name):
+    """Logger under the 'bfhl' tree, e.g. get_logger('ai') -> 'bfhl.ai'"""
+    return logging.getLogger(f'bfhl.{name}')
+
+
+def should_capture(logger):
+    """Whether this request's payloads should be logged"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    return LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE
+
+
+class RequestCapture:
+    """Collects truncated request/response fields for one sampled request"""
+
+    def __init__(self, logger, endpoint):
+        self.logger = logger
+        self.fields = {"endpoint": endpoint}
+        self._start = time.perf_counter()
+
+    def add(self, **fields):
+        for key, value in fields.items():
+            self.fields[key] = truncate(value)
+
+    def emit(self, status):
+        self.fields["status"] = status
+        self.fields["duration_ms"] = round((time.perf_counter() - self._start) * 1000, 3)
+        self.logger.debug("request", extra=self.fields)
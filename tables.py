@@ -0,0 +1,116 @@
+"""
+Precomputed Tables
+Build-time artifact holding the prime sieve bitmap for small numbers and the
+first Fibonacci terms, so a fresh process starts warm instead of computing
+them on its first requests. `python tables.py` writes it during the build;
+load() runs at import. The sieve is a read-only mapping of the file, shared
+through the page cache; under `gunicorn --preload` the Fibonacci prefix is
+decoded once in the master and forked workers share it copy-on-write.
+
+Usage: python tables.py [--output PATH] [--sieve-limit N] [--fib-terms N]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import fibonacci
+import primes
+from structured_logging import get_logger
+
+logger = get_logger('tables')
+
+# Configuration
+TABLES_PATH = os.environ.get(
+    'TABLES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bfhl_tables.bin')
+)
+TABLES_SIEVE_LIMIT = int(os.environ.get('TABLES_SIEVE_LIMIT', 1 << 24))
+TABLES_FIB_TERMS = int(os.environ.get('TABLES_FIB_TERMS', 5000))
+
+# magic, version, Fibonacci term count, Fibonacci section bytes; then the
+# terms (uint32 length + little-endian bytes each), then a primes sieve bitmap
+_HEADER = struct.Struct('<8sIIQ')
+_MAGIC = b'BFHLTABL'
+VERSION = 1
+_LENGTH = struct.Struct('<I')
+
+
+def _encode_terms(terms):
+    parts = []
+    for term in terms:
+        data = term.to_bytes((term.bit_length() + 7) // 8, 'little')
+        parts.append(_LENGTH.pack(len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def _decode_terms(view, count):
+    terms = []
+    offset = 0
+    for _ in range(count):
+        size, = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        terms.append(int.from_bytes(view[offset:offset + size], 'little'))
+        offset += size
+    return terms
+
+
+def build(path=TABLES_PATH, sieve_limit=TABLES_SIEVE_LIMIT, fib_terms=TABLES_FIB_TERMS):
+    """Compute the tables and write them to path atomically; returns its size"""
+    sieve = primes.PrimeSieve(path='', initial_limit=sieve_limit, max_limit=sieve_limit)
+    sieve.ensure(sieve_limit - 1)
+    terms = _encode_terms(fibonacci.generate_fibonacci(fib_terms))
+    header = _HEADER.pack(_MAGIC, VERSION, fib_terms, len(terms))
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(terms)
+        f.write(sieve.bitmap)
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+def load(path=TABLES_PATH):
+    """Seed the prime sieve and Fibonacci cache from the artifact; False if it is absent"""
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Missing or empty: everything is computed on demand as before
+        return False
+    header = data[:_HEADER.size]
+    if len(header) < _HEADER.size or _HEADER.unpack(header)[:2] != (_MAGIC, VERSION):
+        logger.warning("Ignoring tables artifact with another format", extra={"path": path})
+        return False
+
+    _, _, count, terms_size = _HEADER.unpack(header)
+    view = memoryview(data)
+    fibonacci.get_cache().seed(_decode_terms(view[_HEADER.size:_HEADER.size + terms_size], count))
+    primes.get_sieve().seed(view[_HEADER.size + terms_size:])
+    logger.info("Loaded precomputed tables", extra={
+        "path": path, "fib_terms": count, "sieve_limit": primes.get_sieve().limit,
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    })
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed tables artifact")
+    parser.add_argument('--output', default=TABLES_PATH)
+    parser.add_argument('--sieve-limit', type=int, default=TABLES_SIEVE_LIMIT)
+    parser.add_argument('--fib-terms', type=int, default=TABLES_FIB_TERMS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    size = build(args.output, args.sieve_limit, args.fib_terms)
+    print(f"Wrote {args.output}: {size / 2**20:.1f} MB in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Admission limits
+The cost model's hard limits, checked before any work: what is admitted,
+what gets a 413, and that the LCM size check agrees with the real LCM.
+"""
+
+import math
+import random
+
+import pytest
+
+import admission
+import primes
+from app import app
+
+PRIMES_20_BITS = [n for n in range(1 << 20, 1 << 21) if primes.is_prime(n)][:5000]
+
+
+def post(body):
+    return app.test_client().post('/bfhl', json=body).status_code
+
+
+def test_lcm_of_a_long_range_is_admitted():
+    """lcm(1..10000) has about 4.3k digits: the loose summed-bits bound must not reject it"""
+    values = list(range(1, 10001))
+    admission.check('lcm', values)
+    assert len(str(math.lcm(*values))) < admission.LCM_MAX_DIGITS
+    assert post({"lcm": values}) == 200
+
+
+def test_lcm_past_the_digit_limit_is_rejected():
+    """5000 distinct 20-bit primes multiply to about 30k digits"""
+    with pytest.raises(admission.LimitExceeded):
+        admission.check('lcm', PRIMES_20_BITS)
+    assert post({"lcm": PRIMES_20_BITS}) == 413
+    # hcf of the same values is tiny and admitted
+    assert post({"hcf": PRIMES_20_BITS}) == 200
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_lcm_exceeds_matches_the_lcm(seed):
+    rng = random.Random(seed)
+    values = [rng.randrange(-10 ** 6, 10 ** 6) or 1 for _ in range(rng.randrange(2, 3000))]
+    bits = math.lcm(*values).bit_length()
+    for max_bits in (bits - 1, bits, bits + 1):
+        assert admission.lcm_exceeds(values, max_bits) == (bits > max_bits)
+
+
+def test_lcm_exceeds_with_zero():
+    """An LCM with a 0 is 0, however large the other values"""
+    assert not admission.lcm_exceeds([0] + PRIMES_20_BITS)
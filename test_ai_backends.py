@@ -0,0 +1,182 @@
+"""
+AI backends
+The offline stand-ins for Gemini: the fake model's error rate and rate
+limit, a recording played back, and the HTTP client against ai_standin.py
+over a real socket.
+"""
+
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import ai_backends
+from ai import build_prompt
+from ai_backends import FakeModel, HTTPModel, RateLimited, RateLimiter, RecordingModel, ReplayModel
+from ai_standin import StandInServer
+
+
+def ask(model, question):
+    return model.generate_content(build_prompt(question)).text
+
+
+def outcomes(model, calls):
+    """True for each call that answered, False for each that raised"""
+    results = []
+    for _ in range(calls):
+        try:
+            ask(model, 'Capital of France?')
+            results.append(True)
+        except RuntimeError:
+            results.append(False)
+    return results
+
+
+# ==================== FAKE MODEL ====================
+
+def test_answers_normalized_questions():
+    model = FakeModel(answers={'Capital of France?': 'Paris'}, default='Unknown')
+    assert ask(model, '  capital of FRANCE? ') == 'Paris'
+    assert ask(model, 'Capital of Peru?') == 'Unknown'
+    assert model.calls == 2
+
+
+@pytest.mark.parametrize('error_rate', [0.0, 0.1, 0.5, 1.0])
+def test_error_rate(error_rate):
+    results = outcomes(FakeModel(error_rate=error_rate, seed=5), 4000)
+    assert results.count(False) / len(results) == pytest.approx(error_rate, abs=0.03)
+
+
+def test_errors_repeat_with_the_seed():
+    assert outcomes(FakeModel(error_rate=0.3, seed=9), 200) == outcomes(FakeModel(error_rate=0.3, seed=9), 200)
+
+
+def test_rate_limit_allows_a_burst():
+    model = FakeModel(rate_limit=1, burst=3)
+    for _ in range(3):
+        ask(model, 'q')
+    with pytest.raises(RateLimited):
+        ask(model, 'q')
+    assert (model.calls, model.rate_limited) == (4, 1)
+
+
+def test_rate_limiter_refills():
+    limiter = RateLimiter(rate=10, burst=2)
+    assert [limiter.acquire() for _ in range(3)] == [True, True, False]
+    # A quarter of a second later: 2.5 tokens, capped at the burst
+    limiter._updated -= 0.25
+    assert [limiter.acquire() for _ in range(3)] == [True, True, False]
+    limiter._updated -= 0.1
+    assert limiter.acquire()
+    assert RateLimiter(rate=0).acquire()
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert ai_backends.Latency.parse('fixed:0.25').sample(rng) == 0.25
+    assert all(0.1 <= ai_backends.Latency.parse('uniform:0.1,0.2').sample(rng) <= 0.2 for _ in range(100))
+    # Samples are clamped at zero
+    assert min(ai_backends.Latency('normal', 0.0, 1.0).sample(rng) for _ in range(100)) == 0.0
+    with pytest.raises(ValueError):
+        ai_backends.Latency.parse('gamma:1,2')
+
+
+# ==================== RECORD & REPLAY ====================
+
+class Scripted:
+    """Answers from a script, taking a set time per call"""
+
+    def __init__(self, script, delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+
+    def generate_content(self, prompt):
+        time.sleep(self.delay)
+        return SimpleNamespace(text=self.script.pop(0))
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / 'recording.jsonl')
+    recorder = RecordingModel(Scripted(['Paris', 'Lima', 'Rome', 'Lutetia'], delay=0.02), path)
+    questions = ['Capital of France?', 'Capital of Peru?', 'Capital of Italy?', 'Capital of France?']
+    assert [ask(recorder, q) for q in questions] == ['Paris', 'Lima', 'Rome', 'Lutetia']
+
+    entries = ai_backends.read_recording(path)
+    assert [entry['question'] for entry in entries] == questions
+    assert all(entry['latency'] >= 0.02 for entry in entries)
+
+    replay = ReplayModel(path, timing=True)
+    # A question recorded twice cycles through its answers
+    assert [ask(replay, q) for q in questions + questions[:1]] == ['Paris', 'Lima', 'Rome', 'Lutetia', 'Paris']
+    start = time.perf_counter()
+    ask(replay, 'Capital of Peru?')
+    assert time.perf_counter() - start >= 0.02
+
+    # Unrecorded questions fail without a default
+    with pytest.raises(RuntimeError):
+        ask(replay, 'Capital of Chad?')
+    assert ask(ReplayModel(path, default='Unknown', timing=False), 'Capital of Chad?') == 'Unknown'
+
+
+def test_replay_without_timing_uses_the_given_latency(tmp_path):
+    path = tmp_path / 'recording.jsonl'
+    path.write_text(json.dumps({'question': 'Slow?', 'text': 'Yes', 'latency': 5.0}) + '\n')
+    replay = ReplayModel(str(path), timing=False)
+    start = time.perf_counter()
+    assert ask(replay, 'Slow?') == 'Yes'
+    assert time.perf_counter() - start < 1.0
+
+
+# ==================== HTTP STAND-IN ====================
+
+@pytest.fixture
+def standin():
+    """Start an ai_standin server on a free port around a model; yields (server, HTTPModel)"""
+    servers = []
+
+    def start(model):
+        server = StandInServer(('127.0.0.1', 0), model)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, HTTPModel(f'http://127.0.0.1:{server.server_port}', timeout=5.0)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_model_against_standin(standin):
+    server, client = standin(FakeModel(answers={'Capital of France?': 'Paris'}, default='Unknown'))
+    assert ask(client, 'Capital of France?') == 'Paris'
+    connection = client._local.connection
+    assert ask(client, 'Capital of Peru?') == 'Unknown'
+    # Same keep-alive connection for the second call
+    assert client._local.connection is connection
+    assert server.stats()['ok'] == 2
+
+
+def test_http_model_errors(standin):
+    server, client = standin(FakeModel(error_rate=1.0))
+    with pytest.raises(RuntimeError, match='500'):
+        ask(client, 'q')
+    assert server.stats()['error'] == 1
+
+    server, client = standin(FakeModel(rate_limit=1, burst=1))
+    ask(client, 'q')
+    with pytest.raises(RateLimited):
+        ask(client, 'q')
+    assert server.stats()['rate_limited'] == 1
+
+
+def test_http_model_reconnects_after_a_broken_connection(standin):
+    server, client = standin(FakeModel(default='Paris'))
+    assert ask(client, 'q') == 'Paris'
+    # The failing call drops the dead keep-alive connection, the next one reconnects
+    client._local.connection.sock.close()
+    with pytest.raises(OSError):
+        ask(client, 'q')
+    assert ask(client, 'q') == 'Paris'
@@ -0,0 +1,208 @@
+"""
+AI client
+Circuit breaker, in-flight limit and deadline of the AI client, driven by
+the fake backend and a model that answers only when told to.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ai_backends import FakeModel
+from ai_client import AIClient, AITimeout, AIUnavailable, AIUpstreamError, CircuitBreaker
+
+
+class Gate:
+    """Model whose calls block until open() is called"""
+
+    def __init__(self):
+        self.calls = 0
+        self.entered = threading.Semaphore(0)
+        self._open = threading.Event()
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        self.entered.release()
+        self._open.wait(5)
+        return SimpleNamespace(text='Paris')
+
+    def wait_entered(self, calls=1):
+        for _ in range(calls):
+            assert self.entered.acquire(timeout=5)
+
+    def open(self):
+        self._open.set()
+
+
+@pytest.fixture
+def make_client():
+    """AIClient around a model; the pools are shut down after the test"""
+    clients = []
+
+    def make(model, **kwargs):
+        client = AIClient(lambda: model, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client._executor.shutdown(wait=True)
+
+
+def in_thread(function, *args):
+    """Run function(*args) on a thread; returns a dict filled with its result or error"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = function(*args)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    outcome['thread'] = thread
+    return outcome
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+def test_breaker_opens_after_consecutive_failures(make_client):
+    model = FakeModel(error_rate=1.0, seed=1)
+    client = make_client(model, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30))
+    for _ in range(3):
+        with pytest.raises(AIUpstreamError):
+            client.generate('q')
+    assert client.breaker.state == CircuitBreaker.OPEN
+    # Fails fast without reaching upstream
+    with pytest.raises(AIUnavailable, match='breaker'):
+        client.generate('q')
+    assert model.calls == 3
+
+
+def test_success_resets_the_failure_count(make_client):
+    model = FakeModel(error_rate=1.0, seed=1)
+    client = make_client(model, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30))
+    for _ in range(2):
+        with pytest.raises(AIUpstreamError):
+            client.generate('q')
+    model.error_rate = 0.0
+    client.generate('q')
+    model.error_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(AIUpstreamError):
+            client.generate('q')
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_opens_after_the_reset_timeout(make_client):
+    model = FakeModel(error_rate=1.0, seed=1)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    client = make_client(model, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(AIUpstreamError):
+            client.generate('q')
+    with pytest.raises(AIUnavailable):
+        client.generate('q')
+
+    # Reset period over: one trial, which fails and reopens at once
+    breaker._opened_at -= 30
+    with pytest.raises(AIUpstreamError):
+        client.generate('q')
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(AIUnavailable):
+        client.generate('q')
+
+    # The next trial succeeds and closes it
+    breaker._opened_at -= 30
+    model.error_rate = 0.0
+    assert client.generate('q') == 'Unknown'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert model.calls == 4
+
+
+def test_half_open_lets_one_trial_through(make_client):
+    gate = Gate()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    breaker._opened_at -= 30
+    client = make_client(gate, queue_wait=0, breaker=breaker)
+
+    trial = in_thread(client.generate, 'q')
+    gate.wait_entered()
+    with pytest.raises(AIUnavailable, match='breaker'):
+        client.generate('q')
+    gate.open()
+    trial['thread'].join(5)
+    assert trial['result'] == 'Paris'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+# ==================== IN-FLIGHT LIMIT ====================
+
+def test_in_flight_limit(make_client):
+    gate = Gate()
+    client = make_client(gate, max_in_flight=2, queue_wait=0)
+    calls = [in_thread(client.generate, 'q') for _ in range(2)]
+    gate.wait_entered(2)
+
+    with pytest.raises(AIUnavailable, match='in flight'):
+        client.generate('q')
+    with pytest.raises(AIUnavailable, match='in flight'):
+        asyncio.run(client.generate_async('q'))
+    assert gate.calls == 2
+
+    gate.open()
+    for call in calls:
+        call['thread'].join(5)
+        assert call['result'] == 'Paris'
+    # Slots are back
+    assert client.generate('q') == 'Paris'
+
+
+def test_sync_callers_wait_for_a_slot(make_client):
+    gate = Gate()
+    client = make_client(gate, max_in_flight=1, queue_wait=5)
+    first = in_thread(client.generate, 'q')
+    gate.wait_entered()
+    second = in_thread(client.generate, 'q')
+    gate.open()
+    for call in (first, second):
+        call['thread'].join(5)
+        assert call['result'] == 'Paris'
+    assert gate.calls == 2
+
+
+# ==================== DEADLINE ====================
+
+def test_deadline(make_client):
+    gate = Gate()
+    client = make_client(gate, timeout=0.05, max_in_flight=1, queue_wait=0)
+    start = time.perf_counter()
+    with pytest.raises(AITimeout):
+        client.generate('q')
+    assert time.perf_counter() - start < 1
+    assert client.breaker.failures == 1
+
+    # The timed-out call still holds its slot until upstream returns
+    with pytest.raises(AIUnavailable, match='in flight'):
+        client.generate('q')
+    gate.open()
+    client._executor.submit(lambda: None).result(5)
+    assert client.generate('q') == 'Paris'
+
+
+def test_async_deadline(make_client):
+    client = make_client(FakeModel(delay=0.5), timeout=0.05)
+    start = time.perf_counter()
+    with pytest.raises(AITimeout):
+        asyncio.run(client.generate_async('q'))
+    assert time.perf_counter() - start < 0.4
+
+
+def test_no_model(make_client):
+    with pytest.raises(AIUnavailable, match='No model'):
+        make_client(None).generate('q')
@@ -0,0 +1,120 @@
+"""
+ASGI app
+Behaviour specific to the asyncio front end, driven through asgi.app with
+in-memory receive and send callables.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import admission
+import ai
+import asgi
+import profiling
+
+
+async def request(method, path, body=None, headers=()):
+    """(status, headers, body) of one request"""
+    payload = b'' if body is None else json.dumps(body).encode()
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(b'content-type', b'application/json'),
+                         (b'content-length', str(len(payload)).encode())] + list(headers)}
+    messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app(scope, receive, send)
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+async def post(path, body):
+    status, _, payload = await request('POST', path, body)
+    return status, json.loads(payload)
+
+
+def test_batch_over_budget_keeps_ai_calls_running(monkeypatch):
+    """A 413 cancels the batch's CPU work; its AI calls run on, for callers coalesced onto them"""
+    calls = []
+
+    async def ask(question):
+        calls.append(question)
+        await asyncio.sleep(0.05)
+        return 'Paris'
+
+    monkeypatch.setattr(ai, 'ask_model_async', ask)
+    question = 'Capital of France? (asgi batch 413)'
+    # Two of these together are over the batch fibonacci budget
+    n = int(admission.FIB_MAX_N * 0.8)
+
+    async def scenario():
+        status, _ = await post('/bfhl/batch', {'operations': [
+            {'AI': question}, {'fibonacci': n}, {'fibonacci': n}]})
+        assert status == 413
+        await asyncio.sleep(0.2)
+        assert calls == [question]
+        # Answered from the cache the batch's call filled, or joins it if still running
+        return await ai.get_ai_response_async(question)
+
+    assert asyncio.run(scenario()) == 'Paris'
+    assert calls == [question]
+
+
+# ==================== PROFILING ====================
+
+TOKEN = [(b'x-profile-token', b'secret')]
+
+
+@pytest.fixture
+def profiled(monkeypatch):
+    """Profiling on with token 'secret', into a fresh in-memory store"""
+    monkeypatch.setattr(profiling, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 0.0)
+    monkeypatch.setattr(profiling, 'PROFILE_MODE', 'sample')
+    monkeypatch.setattr(profiling, 'store', profiling.ProfileStore(directory=''))
+
+
+def test_profiles_a_request_with_the_token(profiled):
+    status, headers, _ = asyncio.run(request('POST', '/bfhl', {'hcf': [12, 18]}, TOKEN))
+    assert status == 200
+    profile_id = headers[b'x-profile-id'].decode()
+
+    status, _, body = asyncio.run(request('GET', '/debug/profiles', headers=TOKEN))
+    assert status == 200
+    (summary,) = json.loads(body)['profiles']
+    assert summary['id'] == profile_id
+    assert (summary['endpoint'], summary['status'], summary['operation']) == ('/bfhl', 200, 'hcf')
+    assert set(summary['phases_ms']) == {'parse', 'validate', 'compute', 'serialize'}
+
+    status, headers, _ = asyncio.run(request('GET', f'/debug/profiles/{profile_id}', headers=TOKEN))
+    assert (status, headers[b'content-type']) == (200, b'text/plain')
+    assert profiling._loop_profile is None
+
+
+def test_profiles_only_with_the_token(profiled):
+    status, headers, _ = asyncio.run(request('POST', '/bfhl', {'hcf': [12, 18]}))
+    assert status == 200 and b'x-profile-id' not in headers
+    assert asyncio.run(request('GET', '/debug/profiles'))[0] == 404
+    assert asyncio.run(request('GET', '/debug/profiles/x', headers=[(b'x-profile-token', b'wrong')]))[0] == 404
+    assert profiling.store.list() == []
+
+
+def test_sets_the_sample_rate(profiled):
+    assert asyncio.run(request('POST', '/debug/profiling', {'sample_rate': 2}, TOKEN))[0] == 400
+    status, _, body = asyncio.run(request('POST', '/debug/profiling', {'sample_rate': 1}, TOKEN))
+    assert (status, json.loads(body)['sample_rate']) == (200, 1.0)
+    # Every request is now profiled, token or not
+    status, headers, _ = asyncio.run(request('POST', '/bfhl/batch', {'operations': [{'lcm': [4, 6]}]}))
+    assert status == 200 and b'x-profile-id' in headers
+    assert profiling.store.list()[0]['operations'] == 1
+
+
+def test_debug_routes_are_absent_without_profiling():
+    assert not profiling.enabled()
+    assert asyncio.run(request('GET', '/debug/profiles', headers=TOKEN))[0] == 404
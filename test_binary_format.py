@@ -0,0 +1,95 @@
+"""
+Binary formats
+Negotiation and round trips for MessagePack and packed int64 responses,
+through the Flask test client and the ASGI app.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import asgi
+import binary_format
+from app import app
+
+# 2^63 + 29 is prime, so it survives into the result
+BIG_PRIME = 2 ** 63 + 29
+PACKED_FIRST = 'application/x-bfhl-int64, application/msgpack'
+
+
+def post_flask(body, accept):
+    response = app.test_client().post('/bfhl', data=json.dumps(body), content_type='application/json',
+                                      headers={'Accept': accept})
+    return response.status_code, response.content_type, response.data
+
+
+def post_asgi(body, accept):
+    payload = json.dumps(body).encode()
+    scope = {'type': 'http', 'method': 'POST', 'path': '/bfhl', 'query_string': b'',
+             'headers': [(b'content-type', b'application/json'), (b'accept', accept.encode()),
+                         (b'content-length', str(len(payload)).encode())]}
+    messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    headers = dict(sent[0]['headers'])
+    return sent[0]['status'], headers[b'content-type'].decode(), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+@pytest.mark.parametrize('post', [post_flask, post_asgi])
+def test_packed_prime_list_beyond_int64(post):
+    """A prime list that has no packed form falls back to the next acceptable format"""
+    status, content_type, body = post({"prime": [2, 9, BIG_PRIME]}, binary_format.PACKED)
+    assert (status, content_type) == (200, binary_format.JSON)
+    assert json.loads(body)['data'] == [2, BIG_PRIME]
+
+    status, content_type, _ = post({"prime": [2, 9, BIG_PRIME]}, PACKED_FIRST)
+    assert (status, content_type) == (200, binary_format.MSGPACK)
+
+
+@pytest.mark.parametrize('post', [post_flask, post_asgi])
+def test_packed_round_trip(post):
+    status, content_type, body = post({"prime": [2, 9, 2 ** 63 - 25]}, binary_format.PACKED)
+    assert (status, content_type) == (200, binary_format.PACKED)
+    assert binary_format.unpack_response(body) == ('prime', [2, 2 ** 63 - 25])
+
+    # An LCM beyond int64 is still packed, as one big integer
+    status, _, body = post({"lcm": [2 ** 62, 3 ** 39]}, binary_format.PACKED)
+    assert status == 200
+    assert binary_format.unpack_response(body) == ('lcm', 2 ** 62 * 3 ** 39)
+
+
+def test_fits_int64():
+    assert binary_format.fits_int64([])
+    assert binary_format.fits_int64([-2 ** 63, 2 ** 63 - 1])
+    assert not binary_format.fits_int64([2 ** 63])
+    assert not binary_format.fits_int64([-2 ** 63 - 1])
+
+
+def test_packed_input_is_hashed_in_place():
+    """The cache key of a packed body reads the array's buffer instead of copying it"""
+    np = pytest.importorskip('numpy')
+    import tracemalloc
+    import response_cache
+
+    values = np.arange(1 << 20, dtype=np.int64)
+    key = response_cache.request_key(binary_format.JSON, 'prime', values)
+    assert key == response_cache._digest(binary_format.JSON, 'prime', b'i8:' + values.tobytes())
+    assert key != response_cache.request_key(binary_format.JSON, 'prime', values.tolist())
+    assert response_cache.request_key(binary_format.JSON, 'prime', values[::2]) == \
+        response_cache.request_key(binary_format.JSON, 'prime', values[::2].copy())
+
+    tracemalloc.start()
+    try:
+        response_cache.request_key(binary_format.JSON, 'prime', values)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < values.nbytes // 8
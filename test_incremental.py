@@ -0,0 +1,125 @@
+"""
+Incremental vs buffered parsing
+Every body is posted twice through the Flask test client: once below
+INCREMENTAL_MIN_BYTES (parsed whole) and once above it (parsed as it
+arrives). Both paths must answer with the same status, headers and body.
+"""
+
+import math
+from concurrent.futures import Future
+
+import pytest
+
+import admission
+import incremental
+from app import app
+
+BODIES = [
+    b'{"prime": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]}',
+    b'{"lcm": [12, 18, 24]}',
+    b'{"hcf": [48, 64, 80]}',
+    b'{"hcf": [7]}',
+    b' { "prime" : [ 2 , 3 ] } ',
+    b'{"prime": [2, 3], "prime": [5, 7, 9]}',
+    # Malformed or invalid: both paths answer 400
+    b'{"prime": [1, 2, 3], }',
+    b'{"prime": [1, 2, 3],}',
+    b'{"prime": [1, 2, 3,]}',
+    b'{"prime": [1, , 3]}',
+    b'{"prime": [1, 2, 3]',
+    b'{"prime": [1, 2, 3]} x',
+    b'{"prime": [1, 2.5, 3]}',
+    b'{"prime": [1, "2", 3]}',
+    b'{"prime": [1, 2], "lcm": [3]}',
+    b'{"prime": [1, 2], "other": 1}',
+    b'{"lcm": []}',
+    b'{"hcf": [0, 0]}',
+]
+
+
+def post(body, min_bytes, headers=None):
+    """(status, content type, ETag, body) of a /bfhl request with the given incremental threshold"""
+    saved = incremental.INCREMENTAL_MIN_BYTES
+    incremental.INCREMENTAL_MIN_BYTES = min_bytes
+    try:
+        response = app.test_client().post('/bfhl', data=body, content_type='application/json',
+                                          headers=headers)
+        return response.status_code, response.content_type, response.headers.get('ETag'), response.data
+    finally:
+        incremental.INCREMENTAL_MIN_BYTES = saved
+
+
+@pytest.mark.parametrize('body', BODIES)
+def test_same_response_as_buffered(body):
+    """The incremental parser agrees with the buffered path"""
+    assert post(body, 1) == post(body, 1 << 30)
+
+
+def test_trailing_comma_after_array():
+    """A comma followed only by the closing brace is a parse error"""
+    assert post(b'{"prime": [2, 3], }', 1)[0] == 400
+
+
+@pytest.mark.parametrize('accept', ['application/msgpack', 'application/x-bfhl-int64'])
+@pytest.mark.parametrize('body', BODIES[:6] + [b'{"prime": [2, 9, 9223372036854775837]}'])
+def test_same_format_as_buffered(body, accept):
+    """Accept is honoured, and the ETag matches, whichever way the body was parsed"""
+    assert post(body, 1, {'Accept': accept}) == post(body, 1 << 30, {'Accept': accept})
+
+
+def test_not_modified():
+    """A large body repeated with its ETag gets 304"""
+    _, _, etag, _ = post(BODIES[0], 1)
+    assert etag is not None
+    assert post(BODIES[0], 1, {'If-None-Match': etag})[0] == 304
+
+
+class RecordingExecutor:
+    """Runs submitted work at once, recording what it was and how much overlapped"""
+
+    def __init__(self):
+        self.calls = []
+        self.pending = []
+
+    def submit(self, fn, *args):
+        # The parser settles the previous batch before it submits the next
+        assert all(future.done() and future.observed for future in self.pending)
+        self.calls.append(fn.__name__)
+        future = Future()
+        future.observed = False
+        future.set_result(fn(*args))
+        original = future.result
+
+        def result(timeout=None):
+            future.observed = True
+            return original(timeout)
+        future.result = result
+        self.pending.append(future)
+        return future
+
+
+@pytest.mark.parametrize('operation, fold', [('prime', None), ('lcm', math.lcm), ('hcf', math.gcd)])
+def test_batches_run_on_the_executor(operation, fold):
+    """Every batch, folds included, goes through the executor, one at a time"""
+    values = [6 * i + 6 for i in range(1, 50)]
+    executor = RecordingExecutor()
+    parser = incremental.IncrementalParser(executor, batch_size=8)
+    body = ('{"%s": [%s]}' % (operation, ', '.join(map(str, values)))).encode()
+    for i in range(0, len(body), 16):
+        parser.feed(body[i:i + 16])
+    _, result, length, _ = parser.close()
+    assert length == len(values)
+    # Batches are about batch_size values each, whatever the chunking of the body
+    assert len(executor.calls) >= 4
+    assert set(executor.calls) == {'compute' if fold is None else '_fold'}
+    if fold is None:
+        assert result == []
+    else:
+        assert result == fold(*values)
+
+
+def test_full_expensive_lane_rejects_the_compute(monkeypatch):
+    """The upload holds no slot, but its batches need one: a full lane answers 503"""
+    monkeypatch.setattr(admission.expensive_lane, 'in_flight', admission.expensive_lane.capacity)
+    assert post(BODIES[0], 1)[0] == 503
+    assert admission.expensive_lane.in_flight == admission.expensive_lane.capacity
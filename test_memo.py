@@ -0,0 +1,171 @@
+"""
+HCF/LCM memo
+Canonical keys, chunk reuse for supersets, the byte budget, and the SQLite
+table shared between processes and trimmed every _EVICT_EVERY inserts.
+"""
+
+import contextlib
+import itertools
+import math
+import multiprocessing
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import memo
+from memo import DiskStore, ReductionMemo
+
+
+class Counting:
+    """compute() for the memo that records every list it is asked for"""
+
+    def __init__(self, operation='lcm'):
+        self.fold = math.lcm if operation == 'lcm' else math.gcd
+        self.calls = []
+
+    def __call__(self, numbers):
+        self.calls.append(list(numbers))
+        return self.fold(*numbers) if numbers else 0
+
+    @property
+    def values_computed(self):
+        return sum(len(numbers) for numbers in self.calls)
+
+
+# ==================== KEYS ====================
+
+def test_canonical_ignores_order_sign_and_duplicates():
+    assert memo.canonical([12, -4, 6, 4, -12]) == (4, 6, 12)
+    assert memo.make_key('lcm', memo.canonical([3, 5])) == memo.make_key('lcm', memo.canonical([-5, 3, 3]))
+    assert memo.make_key('lcm', (3, 5)) != memo.make_key('hcf', (3, 5))
+
+
+@pytest.mark.parametrize('operation', ['lcm', 'hcf'])
+def test_permuted_and_negated_inputs_hit(operation):
+    table = ReductionMemo()
+    compute = Counting(operation)
+    assert table.reduce(operation, [4, 6, 10], compute) == compute.fold(4, 6, 10)
+    for variant in ([10, 6, 4], [-4, 6, -10], [6, 4, 10, 10, -6]):
+        assert table.reduce(operation, variant, compute) == compute.fold(4, 6, 10)
+    assert len(compute.calls) == 1
+    assert (table.hits, table.misses) == (3, 1)
+
+
+def test_single_value_is_not_memoized():
+    """One value is returned as-is, sign included, like the original fold"""
+    table = ReductionMemo()
+    compute = Counting()
+    assert table.reduce('lcm', [-7], lambda numbers: numbers[0]) == -7
+    table.reduce('lcm', [-7], compute)
+    assert compute.calls == [[-7]]
+    assert table.stats()['entries'] == 0
+
+
+# ==================== CHUNKS ====================
+
+def test_chunks_are_content_defined():
+    values = tuple(range(1, 2000))
+    chunks = memo.chunk(values, bits=3)
+    assert sum(chunks, ()) == values
+    assert len(chunks) > 50
+    # Adding a value leaves every chunk it does not fall into intact
+    grown = memo.chunk(tuple(sorted(values + (5000,))), bits=3)
+    assert len(set(chunks) - set(grown)) <= 1
+
+
+def test_superset_reuses_chunks():
+    table = ReductionMemo(chunk_min_length=64, chunk_bits=3)
+    compute = Counting()
+    values = list(range(2, 600, 3))
+    assert table.reduce('lcm', values, compute, math.lcm) == math.lcm(*values)
+    first = compute.values_computed
+    assert first == len(values)
+
+    superset = values + [1001, -4]
+    assert table.reduce('lcm', superset, compute, math.lcm) == math.lcm(*superset)
+    # Only the chunks the two new values landed in were computed again
+    assert compute.values_computed - first < len(values) // 4
+    assert table.partial == 1
+
+    # The whole superset is now memoized too
+    calls = len(compute.calls)
+    assert table.reduce('lcm', list(reversed(superset)), compute, math.lcm) == math.lcm(*superset)
+    assert len(compute.calls) == calls
+
+
+def test_short_inputs_are_not_chunked():
+    table = ReductionMemo(chunk_min_length=64, chunk_bits=3)
+    compute = Counting()
+    table.reduce('lcm', list(range(1, 40)), compute, math.lcm)
+    assert compute.calls == [list(range(1, 40))]
+
+
+def test_byte_budget_evicts_least_recently_used():
+    table = ReductionMemo(max_bytes=1000)
+    for i in range(50):
+        table.set(f'key{i}', 1 << 64)
+    assert table.size_bytes <= 1000
+    assert table.get('key0') is None
+    assert table.get('key49') == 1 << 64
+
+
+# ==================== SQLITE ====================
+
+def test_sqlite_is_shared_between_memos(tmp_path):
+    path = str(tmp_path / 'memo.sqlite')
+    values = list(range(2, 300, 7))
+    compute = Counting()
+    ReductionMemo(path=path, chunk_min_length=16).reduce('lcm', values, compute, math.lcm)
+    calls = len(compute.calls)
+
+    other = ReductionMemo(path=path)
+    assert other.reduce('lcm', list(reversed(values)), compute, math.lcm) == math.lcm(*values)
+    assert len(compute.calls) == calls
+    assert other.hits == 1
+
+
+def _lookup(key):
+    """Pool task: a forked process reads the process-wide memo"""
+    table = memo.get_memo()
+    return table.get(key), table._disk_pid
+
+
+def test_sqlite_is_shared_with_forked_processes(tmp_path, monkeypatch):
+    table = ReductionMemo(path=str(tmp_path / 'memo.sqlite'))
+    monkeypatch.setattr(memo, '_memo', table)
+    table.set('lcm:shared', 2 ** 100 + 1)
+    parent_pid = table._disk_pid
+    # The child's copy of the memo only sees the value through SQLite
+    table._entries.clear()
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork')) as pool:
+        result, child_pid = pool.submit(_lookup, 'lcm:shared').result(30)
+    assert result == 2 ** 100 + 1
+    # The child opened its own connection rather than using the parent's
+    assert child_pid != parent_pid
+
+
+def test_disk_table_is_trimmed_every_evict_every_inserts(tmp_path, monkeypatch):
+    # Strictly increasing timestamps, so "newest" is well defined
+    monkeypatch.setattr(memo, 'time', SimpleNamespace(time=itertools.count().__next__))
+    path = str(tmp_path / 'memo.sqlite')
+    store = DiskStore(path, max_entries=10)
+
+    def rows():
+        with contextlib.closing(sqlite3.connect(path)) as conn:
+            return conn.execute('SELECT key FROM results ORDER BY stored').fetchall()
+
+    for i in range(memo._EVICT_EVERY - 1):
+        store.set(f'k{i}', i)
+    # Over max_entries until the next trim
+    assert len(rows()) == memo._EVICT_EVERY - 1
+
+    store.set(f'k{memo._EVICT_EVERY - 1}', 0)
+    assert rows() == [(f'k{i}',) for i in range(memo._EVICT_EVERY - 10, memo._EVICT_EVERY)]
+
+    for i in range(memo._EVICT_EVERY, 2 * memo._EVICT_EVERY):
+        store.set(f'k{i}', i)
+        # Never more than max_entries plus one batch
+        assert len(rows()) <= 10 + memo._EVICT_EVERY
+    assert len(rows()) == 10
@@ -0,0 +1,155 @@
+"""
+Primality tests
+Checks the prime engine against inputs that fool weaker tests: strong
+pseudoprimes to small bases, strong Lucas pseudoprimes, Carmichael numbers,
+and Mersenne primes with their squares. The sieve segments and the NumPy
+Miller-Rabin are compared with trial division and the scalar code.
+"""
+
+import random
+
+import pytest
+
+import primes
+
+# Composite, but strong probable primes to base 2 (OEIS A001262)
+STRONG_PSEUDOPRIMES_2 = [2047, 3277, 4033, 4681, 8321, 15841, 29341, 42799, 49141, 52633]
+# Composite, but strong probable primes to every prime base up to 23 (OEIS A014233)
+STRONG_PSEUDOPRIMES_23 = [3825123056546413051]
+# Same up to 37, and beyond 2^64, so only the Lucas half of Baillie-PSW catches it
+STRONG_PSEUDOPRIMES_37 = [318665857834031151167461]
+# Composite, but strong Lucas probable primes with Selfridge's parameters (OEIS A217255)
+STRONG_LUCAS_PSEUDOPRIMES = [5459, 5777, 10877, 16109, 18971, 22499, 24569, 25199, 40309, 58519]
+# Composite, but Fermat probable primes to every coprime base (OEIS A002997)
+CARMICHAEL_NUMBERS = [561, 1105, 1729, 2465, 2821, 6601, 8911, 41041, 825265, 321197185,
+                      5394826801, 232250619601, 9746347772161]
+MERSENNE_EXPONENTS = [2, 3, 5, 7, 13, 17, 19, 31, 61, 89, 107, 127, 521, 607, 1279]
+MERSENNE_PRIMES = [(1 << p) - 1 for p in MERSENNE_EXPONENTS]
+
+
+def trial_division(n):
+    """Reference primality for small n"""
+    if n < 2:
+        return False
+    return all(n % d for d in range(2, int(n ** 0.5) + 1))
+
+
+# ==================== SCALAR TESTS ====================
+
+@pytest.mark.parametrize('n', STRONG_PSEUDOPRIMES_2)
+def test_strong_pseudoprimes_to_base_2(n):
+    """Base 2 alone is fooled; the deterministic bases and is_prime are not"""
+    assert primes.miller_rabin(n, (2,))
+    assert not primes.miller_rabin(n)
+    assert not primes.probable_prime(n)
+    assert not primes.is_prime(n)
+
+
+@pytest.mark.parametrize('n', STRONG_PSEUDOPRIMES_23)
+def test_strong_pseudoprimes_to_many_bases(n):
+    """Prime bases up to 23 are fooled below 2^64; the deterministic set is not"""
+    assert primes.miller_rabin(n, (2, 3, 5, 7, 11, 13, 17, 19, 23))
+    assert not primes.miller_rabin(n)
+    assert not primes.is_prime(n)
+
+
+@pytest.mark.parametrize('n', STRONG_PSEUDOPRIMES_37)
+def test_baillie_psw_beyond_64_bits(n):
+    """Miller-Rabin passes, the strong Lucas test does not"""
+    assert primes.miller_rabin(n, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37))
+    assert not primes.strong_lucas(n)
+    assert not primes.is_prime(n)
+
+
+@pytest.mark.parametrize('n', STRONG_LUCAS_PSEUDOPRIMES)
+def test_strong_lucas_pseudoprimes(n):
+    """The Lucas test alone is fooled; the Miller-Rabin half of Baillie-PSW is not"""
+    assert primes.strong_lucas(n)
+    assert not primes.miller_rabin(n, (2,))
+    assert not primes.probable_prime(n)
+    assert not primes.is_prime(n)
+
+
+@pytest.mark.parametrize('n', CARMICHAEL_NUMBERS)
+def test_carmichael_numbers(n):
+    assert not primes.probable_prime(n)
+    assert not primes.is_prime(n)
+
+
+@pytest.mark.parametrize('n', MERSENNE_PRIMES, ids=[f'M{p}' for p in MERSENNE_EXPONENTS])
+def test_mersenne_primes_and_squares(n):
+    assert primes.is_prime(n)
+    assert not primes.is_prime(n * n)
+    if n > primes.TRIAL_LIMIT:
+        assert primes.strong_lucas(n)
+        assert not primes.strong_lucas(n * n)
+
+
+def test_composite_mersenne_numbers():
+    """2^p - 1 with p prime is not always prime"""
+    for p in (11, 23, 29, 37, 41, 43, 47, 53, 59, 67):
+        assert not primes.is_prime((1 << p) - 1)
+
+
+def test_products_of_large_primes():
+    """Semiprimes of two Mersenne primes, on both sides of 2^64"""
+    for a, b in [(MERSENNE_PRIMES[7], MERSENNE_PRIMES[7]), (MERSENNE_PRIMES[7], MERSENNE_PRIMES[8]),
+                 (MERSENNE_PRIMES[8], MERSENNE_PRIMES[11])]:
+        assert not primes.is_prime(a * b)
+
+
+def test_probable_prime_matches_trial_division():
+    for n in range(-5, 20000):
+        assert primes.probable_prime(n) == trial_division(n), n
+
+
+# ==================== SIEVE ====================
+
+@pytest.mark.parametrize('start, end', [(0, 8), (0, 4096), (8, 16), (1000, 5096), (123456, 131648)])
+def test_sieve_segment(start, end):
+    """Bit i of a segment says whether 2 * (start + i) + 1 is prime"""
+    base_primes = primes._small_primes(int((2 * end) ** 0.5) + 1)
+    segment = primes._sieve_segment(start, end, base_primes)
+    assert len(segment) == (end - start) // 8
+    bits = int.from_bytes(segment, 'little')
+    for i in range(end - start):
+        assert bool(bits >> i & 1) == trial_division(2 * (start + i) + 1), 2 * (start + i) + 1
+
+
+def test_in_memory_sieve():
+    """A sieve grown in several steps agrees with trial division"""
+    sieve = primes.PrimeSieve(path='', initial_limit=1 << 10, max_limit=1 << 17)
+    for n in (1 << 9, 1 << 12, (1 << 17) - 1):
+        sieve.ensure(n)
+    assert sieve.limit == 1 << 17
+    assert [n for n in range(1 << 17) if sieve.is_prime(n)] == \
+        [n for n in range(1 << 17) if trial_division(n)]
+
+
+# ==================== VECTORIZED ====================
+
+def test_vectorized_miller_rabin_32():
+    """The NumPy rounds agree with the scalar ones on odd values in (TRIAL_LIMIT, 2^32)"""
+    np = pytest.importorskip('numpy')
+    import vectorized
+    rng = random.Random(22)
+    values = [n for n in STRONG_PSEUDOPRIMES_2 + STRONG_LUCAS_PSEUDOPRIMES + CARMICHAEL_NUMBERS
+              if n < 1 << 32]
+    values += [MERSENNE_PRIMES[7], 4294967291, 4294967295, 4294967279, 1001, 1009]
+    values += [rng.randrange(primes.TRIAL_LIMIT + 1, 1 << 32) | 1 for _ in range(20000)]
+    result = vectorized._miller_rabin_32(np.array(values, dtype=np.uint64))
+    assert result.tolist() == [primes.miller_rabin(n) for n in values]
+
+
+def test_vectorized_filter_primes():
+    """filter_primes on an int64 array matches is_prime one value at a time"""
+    np = pytest.importorskip('numpy')
+    import vectorized
+    rng = random.Random(2)
+    values = [rng.randrange(-100, 1 << 20) for _ in range(5000)]
+    values += [rng.randrange(1 << 26, 1 << 40) for _ in range(5000)]
+    values += [n for n in STRONG_PSEUDOPRIMES_2 + STRONG_LUCAS_PSEUDOPRIMES + CARMICHAEL_NUMBERS
+               + STRONG_PSEUDOPRIMES_23 + MERSENNE_PRIMES if n < 1 << 63]
+    values += [0, 1, 2, 3, (1 << 63) - 1, -(1 << 63)]
+    assert vectorized.filter_primes(np.array(values, dtype=np.int64)) == \
+        [n for n in values if primes.is_prime(n)]
@@ -0,0 +1,88 @@
+"""
+Reduction engine
+Tree LCM and early-exit HCF against plain left folds of math.lcm and
+math.gcd, on one process and fanned out to a process pool.
+"""
+
+import functools
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import reduction
+
+rng = random.Random(13)
+
+CASES = {
+    'empty': [],
+    'single': [12],
+    'single_negative': [-12],
+    'single_zero': [0],
+    'zeros': [0, 0, 0],
+    'zero_among_values': [4, 0, 6, 9],
+    'negatives': [-4, 6, -10, 15],
+    'all_negative': [-6, -9, -15],
+    'ones': [1, 1, 1, 1],
+    'duplicates': [6, 6, 6, 4, 4],
+    'coprime_first': [7, 11, 22, 44, 88],
+    'beyond_64_bits': [2 ** 70 * 3, 2 ** 65 * 9, 2 ** 80 * 27, (2 ** 89 - 1) * 6],
+    'block_boundary': [6] * reduction.HCF_BLOCK_SIZE + [4],
+    'random': [rng.randrange(-10 ** 6, 10 ** 6) for _ in range(5000)],
+    'random_multiples': [210 * rng.randrange(1, 10 ** 4) for _ in range(5000)],
+}
+
+
+def fold(operation, numbers):
+    """The original left fold: one value is returned as is, no values give 0"""
+    if not numbers:
+        return 0
+    return functools.reduce(math.gcd if operation == 'hcf' else math.lcm, numbers)
+
+
+@pytest.mark.parametrize('operation', ['hcf', 'lcm'])
+@pytest.mark.parametrize('case', list(CASES))
+def test_matches_left_fold(operation, case):
+    numbers = CASES[case]
+    assert reduction.reduce(operation, numbers) == fold(operation, numbers)
+
+
+def test_hcf_stops_at_one():
+    """A block that brings the HCF to 1 is the last one read"""
+    numbers = [6, 10, 15] + [30] * reduction.HCF_BLOCK_SIZE + ['never read']
+    assert reduction.hcf(numbers) == 1
+
+
+def test_tree_reduce_order():
+    """Pairs neighbours level by level, carrying an odd value up"""
+    assert reduction.tree_reduce(lambda a, b: f'({a}{b})', 'abcde') == '(((ab)(cd))e)'
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with ProcessPoolExecutor(2) as executor:
+        yield executor
+
+
+@pytest.mark.parametrize('operation', ['hcf', 'lcm'])
+@pytest.mark.parametrize('case', ['zeros', 'zero_among_values', 'negatives', 'all_negative',
+                                  'duplicates', 'beyond_64_bits', 'random', 'random_multiples'])
+def test_process_fan_out(operation, case, pool, monkeypatch):
+    """Chunks reduced in other processes combine to the same answer, one-value chunks included"""
+    monkeypatch.setattr(reduction, 'REDUCE_PARALLEL_MIN_LENGTH', 2)
+    monkeypatch.setattr(reduction, 'REDUCE_PARALLEL_CHUNKS', 3)
+    numbers = CASES[case]
+    assert reduction.reduce(operation, numbers, pool) == fold(operation, numbers)
+
+
+def test_fan_out_only_for_long_inputs(monkeypatch):
+    """Short inputs never touch the executor"""
+    class Refuse:
+        def submit(self, *args):
+            raise AssertionError("submitted a short input")
+
+    monkeypatch.setattr(reduction, 'REDUCE_PARALLEL_CHUNKS', 4)
+    numbers = CASES['random']
+    assert len(numbers) < reduction.REDUCE_PARALLEL_MIN_LENGTH
+    assert reduction.reduce('lcm', numbers, Refuse()) == fold('lcm', numbers)
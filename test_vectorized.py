@@ -0,0 +1,82 @@
+"""
+Vectorized engine
+The NumPy paths of operations.compute must give exactly what the pure-Python
+engine gives, including on the edges of int64 where they fall back to it.
+"""
+
+import math
+import random
+
+import pytest
+
+import memo
+import operations
+import primes
+
+np = pytest.importorskip('numpy')
+import vectorized  # noqa: E402
+
+rng = random.Random(3)
+
+CASES = {
+    'small': [0, 1, 2, 3, 4, 5],
+    'ones': [1, 1, 1],
+    'zeros': [0, 0],
+    'negatives': [-12, 18, -30, 7, -7, -1],
+    'duplicates': [6, 6, 10, 10, -6, 15, 15],
+    'near_2_31': [2 ** 31 - 1, 2 ** 31, 2 ** 31 + 11, 2 ** 31 - 2, -(2 ** 31)],
+    'near_2_32': [2 ** 32 - 5, 2 ** 32 - 1, 2 ** 32, 2 ** 32 + 15, -(2 ** 32 - 5)],
+    'near_2_63': [2 ** 63 - 25, 2 ** 63 - 1, 2 ** 62, -(2 ** 63 - 1), 2 ** 63 - 25],
+    # abs() of the most negative int64 does not exist, so NumPy steps aside
+    'int64_min': [-2 ** 63, 6, 9],
+    'random_small': [rng.randrange(-1000, 1000) for _ in range(3000)],
+    'random_32': [rng.choice([1, -1]) * rng.randrange(2 ** 31 - 5000, 2 ** 32 + 5000) for _ in range(3000)],
+    'random_63': [rng.randrange(-2 ** 63 + 1, 2 ** 63) for _ in range(300)],
+    # Divisors of 2^10 3^6 5^4 7^3 11^2 13, so the LCM fits int64
+    'random_divisors': [2 ** rng.randrange(11) * 3 ** rng.randrange(7) * 5 ** rng.randrange(5)
+                        * 7 ** rng.randrange(4) * 11 ** rng.randrange(3) * 13 ** rng.randrange(2)
+                        for _ in range(3000)],
+}
+
+
+def reference(operation, values):
+    """Plain math on Python ints"""
+    if operation == 'prime':
+        return [n for n in values if primes.is_prime(n)]
+    if operation == 'hcf':
+        return math.gcd(*values)
+    return math.lcm(*values)
+
+
+@pytest.fixture
+def no_memo(monkeypatch):
+    """Every compute call does the work instead of reusing an earlier answer"""
+    monkeypatch.setattr(memo, 'MEMO_OPERATIONS', ())
+
+
+@pytest.mark.parametrize('operation', ['prime', 'hcf', 'lcm'])
+@pytest.mark.parametrize('case', list(CASES))
+def test_numpy_matches_python_engine(operation, case, monkeypatch, no_memo):
+    values = CASES[case]
+    expected = reference(operation, values)
+
+    monkeypatch.setattr(vectorized, 'MATH_ENGINE', 'python')
+    assert operations.compute(operation, list(values)) == expected
+
+    monkeypatch.setattr(vectorized, 'MATH_ENGINE', 'auto')
+    monkeypatch.setattr(vectorized, 'VECTORIZE_MIN_SIZE', 2)
+    # A JSON list converted to int64, and a packed body used in place
+    assert operations.compute(operation, list(values)) == expected
+    assert operations.compute(operation, np.array(values, dtype=np.int64)) == expected
+
+
+@pytest.mark.parametrize('case', ['small', 'negatives', 'duplicates', 'random_divisors'])
+def test_lcm_without_overflow_stays_in_numpy(case):
+    """The cases small enough for int64 really are answered by NumPy, not the fallback"""
+    values = np.array(CASES[case], dtype=np.int64)
+    assert vectorized.calculate_lcm(values) == math.lcm(*CASES[case])
+
+
+@pytest.mark.parametrize('case', ['near_2_31', 'near_2_32', 'near_2_63'])
+def test_lcm_overflow_is_detected(case):
+    assert vectorized.calculate_lcm(np.array(CASES[case], dtype=np.int64)) is None
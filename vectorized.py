@@ -0,0 +1,168 @@
+"""
+Vectorized Math Engine
+NumPy batch versions of prime filtering, HCF and LCM for large arrays whose
+values fit in int64. Every function returns None when it cannot guarantee a
+result identical to the pure-Python code, and the caller falls back to it.
+"""
+
+import os
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python engine still works
+    np = None
+
+from primes import HEADER_SIZE, SMALL_PRIMES, TRIAL_LIMIT, get_sieve, is_prime
+from reduction import HCF_BLOCK_SIZE
+
+# Configuration
+# 'auto' uses NumPy for large int64 arrays, 'python' disables it
+MATH_ENGINE = os.environ.get('MATH_ENGINE', 'auto')
+VECTORIZE_MIN_SIZE = int(os.environ.get('VECTORIZE_MIN_SIZE', 1024))
+
+# Products at or above this are treated as int64 overflow (float64 keeps margin)
+_OVERFLOW_GUARD = float(2 ** 62)
+
+# Bases making Miller-Rabin deterministic for n < 4,759,123,141
+_MR_BASES_32 = (2, 7, 61)
+
+
+def is_array(numbers):
+    """Whether numbers is already a NumPy int64 array, e.g. a packed request body"""
+    return np is not None and isinstance(numbers, np.ndarray) and numbers.dtype == np.int64
+
+
+def as_int64(numbers, min_size=None):
+    """Array view of numbers if the vectorized engine should handle them"""
+    if np is None or MATH_ENGINE == 'python':
+        return None
+    if is_array(numbers):
+        # Nothing to convert, so used in place at any size
+        values = numbers
+        if len(values) < 2:
+            return None
+    else:
+        if min_size is None:
+            min_size = VECTORIZE_MIN_SIZE
+        if len(numbers) < max(min_size, 2):
+            return None
+        try:
+            values = np.array(numbers, dtype=np.int64)
+        except (OverflowError, TypeError, ValueError):
+            return None
+    # abs() of the most negative int64 does not exist
+    if values.min() == np.iinfo(np.int64).min:
+        return None
+    return values
+
+
+def filter_primes(values):
+    """Prime members of an int64 array, in input order"""
+    sieve = get_sieve()
+    in_range = values < sieve.max_limit
+    if in_range.any():
+        sieve.ensure(int(values[in_range].max()))
+
+    # Odd candidates inside the sieve: one gathered bit per element
+    bitmap = np.frombuffer(sieve.bitmap, dtype=np.uint8)
+    odd = in_range & (values >= 3) & (values & 1 == 1)
+    index = values[odd] >> 1
+    bits = (bitmap[HEADER_SIZE + (index >> 3)] >> (index & 7).astype(np.uint8)) & 1
+
+    mask = values == 2
+    mask[odd] = bits.astype(bool)
+
+    # Values beyond the sieve: trial division by the small primes rules out
+    # most composites, Miller-Rabin runs on the whole array below 2^32 and
+    # one value at a time above
+    beyond = np.flatnonzero(~in_range & (values > TRIAL_LIMIT))
+    beyond = beyond[_coprime_to_small_primes(values[beyond])]
+    below_32 = values[beyond] < 2 ** 32
+    mask[beyond[below_32]] = _miller_rabin_32(values[beyond[below_32]].astype(np.uint64))
+    for i in beyond[~below_32]:
+        mask[i] = is_prime(int(values[i]))
+    for i in np.flatnonzero(~in_range & (values <= TRIAL_LIMIT)):
+        mask[i] = is_prime(int(values[i]))
+
+    return values[mask].tolist()
+
+
+def _coprime_to_small_primes(values):
+    """Positions of values (all above TRIAL_LIMIT) with no prime factor below it"""
+    index = np.arange(len(values))
+    for start in range(0, len(SMALL_PRIMES), 8):
+        # Shrink the arrays every few primes; most values go in the first ones
+        keep = np.ones(len(values), dtype=bool)
+        for p in SMALL_PRIMES[start:start + 8]:
+            keep &= values % p != 0
+        values, index = values[keep], index[keep]
+    return index
+
+
+def _pow_mod(base, exponents, moduli):
+    """base ** exponents % moduli elementwise, for uint64 moduli below 2^32"""
+    result = np.ones_like(moduli)
+    power = np.full_like(moduli, base) % moduli
+    exponents = exponents.copy()
+    while exponents.any():
+        odd = (exponents & 1).astype(bool)
+        result[odd] = result[odd] * power[odd] % moduli[odd]
+        power = power * power % moduli
+        exponents >>= np.uint64(1)
+    return result
+
+
+def _miller_rabin_32(n):
+    """Primality of odd uint64 values in (TRIAL_LIMIT, 2^32): products stay below 2^64"""
+    minus_one = n - np.uint64(1)
+    d = minus_one.copy()
+    s = np.zeros_like(n)
+    while True:
+        even = (d & 1) == 0
+        if not even.any():
+            break
+        d[even] >>= np.uint64(1)
+        s += even
+    prime = np.ones(len(n), dtype=bool)
+    for a in _MR_BASES_32:
+        x = _pow_mod(a, d, n)
+        passed = (x == 1) | (x == minus_one)
+        for k in range(1, int(s.max(initial=1))):
+            x = x * x % n
+            passed |= (x == minus_one) & (k < s)
+        prime &= passed
+    return prime
+
+
+def calculate_hcf(values):
+    """HCF of an int64 array, stopping at the first block that brings it to 1"""
+    result = 0
+    for start in range(0, len(values), HCF_BLOCK_SIZE):
+        result = int(np.gcd(result, np.gcd.reduce(values[start:start + HCF_BLOCK_SIZE])))
+        if result == 1:
+            break
+    return result
+
+
+def distinct_magnitudes(values):
+    """Sorted distinct absolute values of an int64 array, as Python ints"""
+    return np.unique(np.abs(values)).tolist()
+
+
+def calculate_lcm(values):
+    """LCM of an int64 array, or None if an intermediate would overflow"""
+    values = np.unique(np.abs(values))
+    if values[0] == 0:
+        return 0
+
+    # Pairwise tree reduction so every step is one vectorized operation
+    while len(values) > 1:
+        if len(values) % 2:
+            values = np.append(values, 1)
+        left, right = values[0::2], values[1::2]
+        reduced = left // np.gcd(left, right)
+        if (reduced.astype(np.float64) * right.astype(np.float64) >= _OVERFLOW_GUARD).any():
+            return None
+        values = reduced * right
+
+    return int(values[0])